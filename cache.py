@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+מטמון בזיכרון עם תפוגה לפי זמן ופינוי LRU
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class TTLCache:
+    """מטמון מוגבל בגודל - הרשומה שלא נעשה בה שימוש הכי הרבה זמן מפונה ראשונה"""
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic,
+                 on_evict: Optional[Callable[[Hashable], None]] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._on_evict = on_evict  # נקרא עם המפתח כשרשומה מפונה בגלל מגבלת הגודל
+        self._data: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """קבלת ערך מהמטמון (או default אם חסר או פג תוקף)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """שמירת ערך במטמון (ttl - תפוגה שונה מברירת המחדל)"""
+        evicted = []
+        with self._lock:
+            self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                evicted.append(self._data.popitem(last=False)[0])
+                self.evictions += 1
+
+        if self._on_evict is not None:
+            for evicted_key in evicted:
+                self._on_evict(evicted_key)
+
+    def invalidate(self, key: Hashable):
+        """מחיקת ערך מהמטמון"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """כל הערכים שבתוקף, מהישן לחדש (בלי לעדכן את סדר ה-LRU)"""
+        now = self._clock()
+        with self._lock:
+            return [(key, value) for key, (expires_at, value) in self._data.items() if expires_at > now]
+
+    def clear(self):
+        """ריקון המטמון"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def hit_rate(self) -> float:
+        """אחוז הפגיעות במטמון"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """מוני פגיעות/החטאות לניטור"""
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate
+        }
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ציור גרפי הפרודוקטיביות בתהליכים נפרדים, מחוץ ללולאת האירועים
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from typing import Dict, Hashable, List, Optional, Tuple, Union
+
+from cache import TTLCache
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class ChartQueueFull(Exception):
+    """יותר מדי גרפים ממתינים לציור"""
+
+
+def _load_pyplot():
+    """טעינת matplotlib רק בגרף הראשון - עם backend ללא תצוגה (Agg)"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+    return plt, mdates
+
+
+def render_productivity_chart(data: List[tuple], dpi: int, figsize: Tuple[float, float]) -> bytes:
+    """ציור הגרף מהשורות (תאריך, נוצרו, בוצעו, ציון) - רץ בתהליך העבודה"""
+    plt, mdates = _load_pyplot()
+    plt.style.use('seaborn-v0_8')
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=figsize)
+    fig.suptitle('📊 הסטטיסטיקות שלך', fontsize=16, fontweight='bold')
+
+    dates = [datetime.strptime(row[0], '%Y-%m-%d') for row in data]
+    created = [row[1] for row in data]
+    completed = [row[2] for row in data]
+    productivity = [row[3] for row in data]
+
+    # גרף עליון - משימות שנוצרו ובוצעו
+    ax1.plot(dates, created, marker='o', label='משימות שנוצרו', color='skyblue', linewidth=2)
+    ax1.plot(dates, completed, marker='s', label='משימות שבוצעו', color='lightgreen', linewidth=2)
+    ax1.set_title('פעילות יומית', fontweight='bold')
+    ax1.set_ylabel('מספר משימות')
+    ax1.legend()
+    ax1.grid(True, alpha=0.3)
+
+    # גרף תחתון - ציון פרודוקטיביות
+    ax2.bar(dates, productivity, color='orange', alpha=0.7, label='ציון פרודוקטיביות')
+    ax2.set_title('ציון פrודoקטיביות יומי', fontweight='bold')
+    ax2.set_ylabel('ציון')
+    ax2.set_xlabel('תאריך')
+    ax2.legend()
+    ax2.grid(True, alpha=0.3)
+
+    # עיצוב התאריכים
+    for ax in [ax1, ax2]:
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
+        ax.xaxis.set_major_locator(mdates.DayLocator(interval=2))
+        plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
+
+    fig.tight_layout()
+
+    # שמירה לזיכרון
+    img_buffer = BytesIO()
+    fig.savefig(img_buffer, format='PNG', dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+
+    return img_buffer.getvalue()
+
+
+class ChartRenderer:
+    """מאגר תהליכים לציור גרפים עם תור מוגבל ומטמון תוצאות"""
+
+    def __init__(self, workers: int = None, max_pending: int = None,
+                 cache_size: int = None, ttl: float = None):
+        advanced = config.Advanced
+        self.workers = workers or advanced.CHART_WORKERS
+        self.max_pending = max_pending or advanced.CHART_QUEUE_SIZE
+        self.dpi = advanced.CHART_DPI
+        self.figsize = advanced.CHART_FIGSIZE
+        # ערך במטמון הוא PNG, או file_id של טלגרם אחרי שהגרף נשלח פעם אחת
+        self.cache = TTLCache(cache_size or advanced.CHART_CACHE_SIZE, ttl or advanced.CACHE_TIMEOUT)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+
+        self.rendered = 0
+        self.rejected = 0
+
+    @staticmethod
+    def cache_key(user_id: int, days: int, data: List[tuple]) -> tuple:
+        """מפתח המטמון - משתנה כשהנתונים היומיים של המשתמש מתעדכנים"""
+        return user_id, days, hash(tuple(data))
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn - תהליך נקי, בלי להעתיק את ה-threads ואת חיבורי המסד של הבוט
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    async def render(self, key: Hashable, data: List[tuple]) -> Union[bytes, str]:
+        """הגרף מהמטמון, או ציור שלו במאגר התהליכים"""
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        # לחיצות חוזרות בזמן שהגרף עדיין מצויר ממתינות לאותה תוצאה
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        if len(self._pending) >= self.max_pending:
+            self.rejected += 1
+            raise ChartQueueFull()
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._get_executor(), render_productivity_chart, data, self.dpi, self.figsize
+        )
+        self._pending[key] = future
+        try:
+            image = await asyncio.shield(future)
+        finally:
+            self._pending.pop(key, None)
+
+        self.rendered += 1
+        self.cache.set(key, image)
+        return image
+
+    def remember_file_id(self, key: Hashable, file_id: str):
+        """שמירת ה-file_id של תמונה שנשלחה - שליחה חוזרת ללא העלאה"""
+        self.cache.set(key, file_id)
+
+    def close(self):
+        """עצירת מאגר התהליכים"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """מונים לניטור"""
+        return {
+            'pending': len(self._pending),
+            'rendered': self.rendered,
+            'rejected': self.rejected,
+            'cache_hit_rate': self.cache.hit_rate
+        }
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+עיבוד עדכונים במקביל - סדר נשמר בתוך כל צ'אט, עם תקרה גלובלית ודחיית עומס
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """עד max_concurrent_updates עדכונים במקביל, אבל רק אחד בכל פעם לכל צ'אט
+
+    process_update של PTB (סופית) תופסת את הסמפור של המחלקה הבסיסית לפני do_process_update.
+    לכן max_concurrent_updates של המחלקה הבסיסית הוא max_pending_updates + 1 ומגביל רק את
+    הכניסה - עדכון שמעבר למכסה מגיע ל-do_process_update ונדחה שם. התקרה על העיבוד בפועל
+    (max_active_updates) היא סמפור נפרד שנתפס אחרי מנעול הצ'אט.
+    """
+
+    def __init__(self, max_concurrent_updates: int, max_pending_updates: int,
+                 observer: Optional[Callable[[object, float], None]] = None):
+        super().__init__(max_pending_updates + 1)
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        self.max_active_updates = max_concurrent_updates
+        self.max_pending_updates = max_pending_updates
+        self._active = asyncio.BoundedSemaphore(max_concurrent_updates)
+        # observer(עדכון, שניות) - משך הטיפול בכל עדכון, בלי זמן ההמתנה בתור
+        self.observer = observer
+        # צ'אט -> [מנעול, מספר העדכונים שמחזיקים או ממתינים לו]
+        self._chat_locks: Dict[int, List] = {}
+        self._pending = 0
+
+        self.processed = 0
+        self.shed = 0
+
+    @staticmethod
+    def _ordering_key(update: object) -> Optional[int]:
+        if isinstance(update, Update):
+            if update.effective_chat is not None:
+                return update.effective_chat.id
+            if update.effective_user is not None:
+                return update.effective_user.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable):
+        if self._pending >= self.max_pending_updates:
+            # עומס יתר - עדיף לוותר על עדכון מאשר לצבור תור שלא ייגמר
+            self.shed += 1
+            if self.shed % 100 == 1:
+                logger.warning(f"Update queue saturated ({self._pending} pending), {self.shed} updates shed so far")
+            coroutine.close()
+            return
+
+        self._pending += 1
+        key = self._ordering_key(update)
+        try:
+            if key is None:
+                async with self._active:
+                    await self._run(update, coroutine)
+                return
+
+            entry = self._chat_locks.get(key)
+            if entry is None:
+                entry = self._chat_locks[key] = [asyncio.Lock(), 0]
+            entry[1] += 1
+            try:
+                # מנעול הצ'אט לפני הסמפור - צ'אט עם הרבה עדכונים לא תופס מקומות של אחרים
+                async with entry[0]:
+                    async with self._active:
+                        await self._run(update, coroutine)
+            finally:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._chat_locks[key]
+        finally:
+            self._pending -= 1
+            self.processed += 1
+
+    async def _run(self, update: object, coroutine: Awaitable):
+        start = time.perf_counter()
+        try:
+            await coroutine
+        finally:
+            if self.observer is not None:
+                self.observer(update, time.perf_counter() - start)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        """מונים לניטור"""
+        return {
+            'pending': self._pending,
+            'active_chats': len(self._chat_locks),
+            'processed': self.processed,
+            'shed': self.shed
+        }
@@ -94,23 +94,71 @@ class Config:
         ENABLE_STATISTICS = True
         ENABLE_REMINDERS = True
         ENABLE_CATEGORIES_EMOJI = True
-        ENABLE_TASK_PRIORITIES = False  # לעתיד
-        ENABLE_DUE_DATES = False  # לעתיד
-        ENABLE_RECURRING_TASKS = False  # לעתיד
+        ENABLE_TASK_PRIORITIES = True
+        ENABLE_DUE_DATES = True
+        ENABLE_RECURRING_TASKS = True
         
         # הגדרות ביצועים
         DATABASE_TIMEOUT = 30  # שניות
-        MAX_CONCURRENT_USERS = 100
+        DATABASE_READ_THREADS = 4  # threads לקריאות מהמסד (הכתיבה תמיד ב-thread יחיד)
+        MAX_CONCURRENT_USERS = 100  # עדכונים שמעובדים במקביל (עדכון אחד בכל פעם לכל צ'אט)
+        MAX_PENDING_UPDATES = 1000  # מעבר לכך עדכונים חדשים נדחים
         CACHE_TIMEOUT = 300  # 5 דקות
+        CATEGORY_CACHE_MAX_USERS = 10000  # מספר משתמשים מקסימלי במטמון הקטגוריות
+        TASK_VIEW_CACHE_SIZE = 10000  # מספר הודעות רשימה שהעמוד המוצג בהן נשמר
+        TASK_VIEW_TTL = 3600  # שעה
+        STATE_BACKEND = 'sqlite'  # 'sqlite' - שומר שיחות פתוחות בין הפעלות, 'memory' - בזיכרון בלבד
+        STATE_MAX_USERS = 10000  # משתמשים עם שיחה פתוחה (הישנה ביותר מפונה)
+        STATE_TTL = 3600  # שיחה שננטשה נמחקת אחרי שעה
+        
+        # הגדרות שליחה יזומה (תזכורות) - לפי מגבלות Bot API
+        SEND_GLOBAL_RATE = 30  # הודעות לשנייה לכל הבוט
+        SEND_PER_CHAT_INTERVAL = 1.0  # שניות בין הודעות לאותו צ'אט
+        SEND_WORKERS = 8
+        SEND_QUEUE_SIZE = 1000
+        SEND_DRAIN_TIMEOUT = 10  # שניות לשליחת מה שנשאר בתור בסגירת הבוט
+        REMINDER_BATCH_USERS = 500  # משתמשים בכל שאילתת תזכורות
+        
+        # צבירת סטטיסטיקות פעילות לפני כתיבה למסד
+        ACTIVITY_FLUSH_INTERVAL = 5  # שניות
+        ACTIVITY_FLUSH_EVENTS = 500  # כתיבה מיידית כשמצטברים כך הרבה אירועים
+        
+        # מועדי יעד
+        DUE_SOON_MINUTES = 60  # התראה כך וכך דקות לפני המועד
+        DUE_LOAD_WINDOW_HOURS = 24  # טווח המועדים שנטען לזיכרון בכל פעם
+        DUE_DEFAULT_TIME = '18:00'  # שעת היעד כשנקבע רק תאריך
+        NEXT_TASKS_LIMIT = 10  # משימות שמוצגות ב-/next
+        
+        # תגיות
+        TAG_CLOUD_SIZE = 30  # תגיות שמוצגות ב-/tags
+        
+        # יצירת משימות ממשימות חוזרות
+        RECURRING_INTERVAL = 300  # שניות בין בדיקות
+        RECURRING_BATCH_SIZE = 1000  # חוקים בכל טרנזקציה
+        RECURRING_MAX_CATCH_UP = 7  # מופעים שנוצרים לכל חוק אחרי השבתה ארוכה
+        
+        # ציור גרפים (בתהליכים נפרדים)
+        CHART_DPI = 100
+        CHART_FIGSIZE = (8, 5)  # אינצ'ים
+        CHART_WORKERS = 1
+        CHART_QUEUE_SIZE = 4  # גרפים שמצוירים במקביל לפני דחיית בקשות חדשות
+        CHART_CACHE_SIZE = 1000
         
         # הגדרות אבטחה
         RATE_LIMIT_PER_MINUTE = 30  # מספר בקשות מקסימלי לדקה למשתמש
+        RATE_LIMIT_BURST = 10  # בקשות ברצף לפני שההגבלה נכנסת לתוקף
         ADMIN_USER_IDS = []  # רשימת מזהי מנהלים
         
         # הגדרות גיבוי
         BACKUP_ENABLED = True
         BACKUP_INTERVAL_HOURS = 24
         BACKUP_KEEP_DAYS = 7
+        BACKUP_SPOOL_MAX_BYTES = 1024 * 1024  # גיבוי משתמש גדול יותר נכתב לקובץ זמני
+        BACKUP_DIR = 'backups/db'  # גיבויי מסד הנתונים המלאים
+        BACKUP_PAGES_PER_STEP = 256  # עמודים שמועתקים בכל צעד של Backup API
+        BACKUP_STEP_SLEEP = 0.005  # שניות הפסקה אחרי כל צעד (מגביל את קצב ההעתקה)
+        RESTORE_CHUNK_SIZE = 5000  # שורות בכל טרנזקציה בשחזור מגיבוי
+        RESTORE_MAX_FILE_BYTES = 20 * 1024 * 1024  # מגבלת ההורדה של Bot API
 
     @classmethod
     def validate(cls):
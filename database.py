@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+שכבת גישה למסד הנתונים - חיבורי SQLite קבועים ומשותפים
+"""
+
+import re
+import sqlite3
+import asyncio
+import threading
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# ניקוד וטעמים (ללא סימני פיסוק כמו מקף)
+_HEBREW_MARKS_RE = re.compile('[\u0591-\u05BD\u05BF\u05C1\u05C2\u05C4\u05C5\u05C7]')
+_HEBREW_FINAL_LETTERS = str.maketrans('ךםןףץ', 'כמנפצ')
+_SEARCH_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def hebrew_fold(text: Optional[str]) -> Optional[str]:
+    """נרמול טקסט עברי לחיפוש - הסרת ניקוד והמרת אותיות סופיות"""
+    if text is None:
+        return None
+    return _HEBREW_MARKS_RE.sub('', text).translate(_HEBREW_FINAL_LETTERS)
+
+
+def search_words(text: Optional[str]) -> List[str]:
+    """המילים המנורמלות של טקסט, כפי שהן נשמרות באינדקס החיפוש"""
+    if not text:
+        return []
+    return _SEARCH_WORD_RE.findall(hebrew_fold(text).lower())
+
+
+def search_tokens(user_id: int, text: Optional[str]) -> str:
+    """מילות הטקסט עם קידומת המשתמש - כך לכל משתמש רשימות מופעים משלו באינדקס"""
+    return ' '.join(f'{user_id}_{word}' for word in search_words(text))
+
+
+def next_task_id(cursor: sqlite3.Cursor) -> int:
+    """המזהה הפנוי הבא ב-tasks לשריון טווח מזהים (בתוך טרנזקציית כתיבה)
+
+    כמו AUTOINCREMENT - אף פעם לא מזהה של משימה שנמחקה.
+    """
+    cursor.execute('''
+        SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'tasks'), 0),
+                   COALESCE((SELECT MAX(id) FROM tasks), 0))
+    ''')
+    return cursor.fetchone()[0] + 1
+
+
+def insert_task_tags(cursor: sqlite3.Cursor, rows: Sequence[Tuple[int, str]]):
+    """קישור משימות לתגיות [(task_id, שם תגית)] - תגיות חדשות נוספות למילון tags"""
+    if not rows:
+        return
+    cursor.executemany('INSERT OR IGNORE INTO tags (name) VALUES (?)', [(tag,) for tag in {tag for _, tag in rows}])
+    cursor.executemany('''
+        INSERT OR IGNORE INTO task_tags (tag_id, task_id)
+        SELECT id, ? FROM tags WHERE name = ?
+    ''', rows)
+
+
+class DatabaseManager:
+    """מנהל חיבורים למסד הנתונים - חיבור קבוע אחד לכל thread"""
+
+    # מספר השאילתות המוכנות שנשמרות בזיכרון לכל חיבור
+    STATEMENT_CACHE_SIZE = 256
+
+    def __init__(self, db_name: str, timeout: Optional[float] = None):
+        self.db_name = db_name
+        self.timeout = config.Advanced.DATABASE_TIMEOUT if timeout is None else timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self.connect_count = 0  # מספר החיבורים שנפתחו בפועל (למדידה)
+        self._read_executor: Optional[ThreadPoolExecutor] = None
+        self._write_executor: Optional[ThreadPoolExecutor] = None
+        # observer(סוג, שם הפונקציה, שניות) - נקרא אחרי כל פעולה שרצה ב-read/write
+        self.observer: Optional[Callable[[str, str, float], None]] = None
+        # פעולות שנשלחו ל-threads ועוד לא הסתיימו (ממתינות + רצות)
+        self.in_flight = {'read': 0, 'write': 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        """פתיחת חיבור חדש עם הגדרות הביצועים"""
+        if self.db_name == ':memory:':
+            # מסד נתונים בזיכרון שמשותף לכל החיבורים של המנהל
+            database = f'file:todo_memdb_{id(self)}?mode=memory&cache=shared'
+            uri = True
+        else:
+            database = self.db_name
+            uri = False
+
+        conn = sqlite3.connect(
+            database,
+            timeout=self.timeout,
+            isolation_level=None,  # טרנזקציות מנוהלות ידנית ב-transaction()
+            check_same_thread=False,
+            cached_statements=self.STATEMENT_CACHE_SIZE,
+            uri=uri
+        )
+        conn.execute(f'PRAGMA busy_timeout = {int(self.timeout * 1000)}')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute('PRAGMA foreign_keys = ON')
+        # בשימוש הטריגרים של אינדקס החיפוש - חייב להיות רשום בכל חיבור שכותב משימות
+        conn.create_function('search_tokens', 2, search_tokens, deterministic=True)
+
+        with self._lock:
+            self._connections.append(conn)
+            self.connect_count += 1
+
+        return conn
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """החיבור הקבוע של ה-thread הנוכחי"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        """הרצת פקודה בודדת (autocommit)"""
+        return self.connection.execute(sql, params)
+
+    def fetchone(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        """שאילתה שמחזירה שורה אחת"""
+        return self.connection.execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """שאילתה שמחזירה את כל השורות"""
+        return self.connection.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self):
+        """טרנזקציית כתיבה - commit בסיום או rollback בשגיאה"""
+        conn = self.connection
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            yield cursor
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def read_transaction(self):
+        """טרנזקציית קריאה - כל השאילתות בה רואות את אותה תמונת מצב"""
+        conn = self.connection
+        cursor = conn.cursor()
+        cursor.execute('BEGIN')
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            conn.execute('COMMIT')
+
+    def _executors(self):
+        """יצירת מאגרי ה-threads בשימוש הראשון"""
+        with self._lock:
+            if self._read_executor is None:
+                self._read_executor = ThreadPoolExecutor(
+                    max_workers=config.Advanced.DATABASE_READ_THREADS,
+                    thread_name_prefix='db-read'
+                )
+                # כותב יחיד - SQLite מאפשר כותב אחד בכל רגע, כך שאין המתנה על נעילות
+                self._write_executor = ThreadPoolExecutor(
+                    max_workers=1,
+                    thread_name_prefix='db-write'
+                )
+            return self._read_executor, self._write_executor
+
+    def _run_observed(self, kind: str, func, *args, **kwargs):
+        """הרצת הפעולה ב-thread ודיווח משך הביצוע ל-observer"""
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.in_flight[kind] -= 1
+            observer = self.observer
+            if observer is not None:
+                observer(kind, getattr(func, '__name__', type(func).__name__), elapsed)
+
+    def _track(self, kind: str):
+        with self._lock:
+            self.in_flight[kind] += 1
+
+    async def read(self, func, *args, **kwargs):
+        """הרצת פעולת קריאה סינכרונית מחוץ ללולאת האירועים"""
+        read_executor, _ = self._executors()
+        loop = asyncio.get_running_loop()
+        self._track('read')
+        return await loop.run_in_executor(read_executor, partial(self._run_observed, 'read', func, *args, **kwargs))
+
+    async def write(self, func, *args, **kwargs):
+        """הרצת פעולת כתיבה סינכרונית ב-thread הכתיבה היחיד"""
+        _, write_executor = self._executors()
+        loop = asyncio.get_running_loop()
+        self._track('write')
+        return await loop.run_in_executor(write_executor, partial(self._run_observed, 'write', func, *args, **kwargs))
+
+    def submit_write(self, func, *args, **kwargs) -> Future:
+        """שליחת פעולת כתיבה ל-thread הכתיבה בלי להמתין לסיומה"""
+        _, write_executor = self._executors()
+        self._track('write')
+        future = write_executor.submit(self._run_observed, 'write', func, *args, **kwargs)
+        future.add_done_callback(self._log_write_error)
+        return future
+
+    @staticmethod
+    def _log_write_error(future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Background database write failed: {future.exception()}")
+
+    def close(self):
+        """סגירת כל החיבורים הפתוחים"""
+        with self._lock:
+            executors = (self._read_executor, self._write_executor)
+            self._read_executor = self._write_executor = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to close database connection: {e}")
+        self._local = threading.local()
+
+
+_databases: Dict[str, DatabaseManager] = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(db_name: str) -> DatabaseManager:
+    """קבלת מנהל החיבורים המשותף עבור קובץ מסד נתונים"""
+    with _databases_lock:
+        db = _databases.get(db_name)
+        if db is None:
+            db = DatabaseManager(db_name)
+            _databases[db_name] = db
+        return db
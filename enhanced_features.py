@@ -4,148 +4,168 @@
 תכונות מתקדמות לבוט ניהול המשימות
 """
 
-import sqlite3
 import asyncio
+import gzip
 import json
-import os
+import logging
+import sqlite3
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from io import BytesIO
-import seaborn as sns
+from charts import ChartQueueFull, ChartRenderer
+from config import config
+from database import get_database, insert_task_tags, next_task_id, search_words
+from migrations import run_migrations
+from recurring import RecurringTaskMaterializer
+
+logger = logging.getLogger(__name__)
+
+# גרסת מבנה קובץ הגיבוי (שורת הכותרת הראשונה בקובץ)
+BACKUP_FORMAT_VERSION = 1
+
+# (סוג שורה, שאילתה) - כל השורות של משתמש אחד לפי user_id
+BACKUP_QUERIES = [
+    ('category', 'SELECT * FROM categories WHERE user_id = ? ORDER BY id'),
+    ('task', 'SELECT * FROM tasks WHERE user_id = ? ORDER BY id'),
+    ('task_tag', '''
+        SELECT tt.task_id, g.name AS tag_name
+        FROM tasks t
+        JOIN task_tags tt ON tt.task_id = t.id
+        JOIN tags g ON g.id = tt.tag_id
+        WHERE t.user_id = ?
+        ORDER BY t.id
+    '''),
+    ('recurring_task', 'SELECT * FROM recurring_tasks WHERE user_id = ? ORDER BY id'),
+    ('stats', 'SELECT * FROM daily_stats WHERE user_id = ? ORDER BY date'),
+]
+
+# סוג שורה -> הטבלה שהשחזור מוסיף אליה שורות עם מזהה משלהן (task_tag נמחק עם המשימה)
+RESTORE_TABLES = {
+    'category': 'categories',
+    'task': 'tasks',
+    'recurring_task': 'recurring_tasks',
+    'stats': 'daily_stats',
+}
+
+
+class ActivityBuffer:
+    """צבירת אירועי פעילות לפי (משתמש, תאריך) וכתיבתם ב-UPSERT אחד"""
+    
+    # סוג פעילות -> מיקום המונה (נוצרו, הושלמו, נמחקו)
+    ACTIVITY_COLUMNS = {'task_created': 0, 'task_completed': 1, 'task_deleted': 2}
+    
+    # ציון הפרודוקטיביות מחושב ב-SQL מהמונים המצטברים
+    UPSERT_SQL = '''
+        INSERT INTO daily_stats (user_id, date, tasks_created, tasks_completed, tasks_deleted, productivity_score)
+        VALUES (?1, ?2, ?3, ?4, ?5, MAX(0, ?4 * 2 + ?3 - ?5 * 0.5))
+        ON CONFLICT (user_id, date) DO UPDATE SET
+            tasks_created = tasks_created + excluded.tasks_created,
+            tasks_completed = tasks_completed + excluded.tasks_completed,
+            tasks_deleted = tasks_deleted + excluded.tasks_deleted,
+            productivity_score = MAX(0,
+                (tasks_completed + excluded.tasks_completed) * 2
+                + tasks_created + excluded.tasks_created
+                - (tasks_deleted + excluded.tasks_deleted) * 0.5)
+    '''
+    
+    def __init__(self, db, max_events: int):
+        self.db = db
+        self.max_events = max_events
+        self._pending: Dict[Tuple[int, str], List[int]] = {}
+        self._events = 0
+        # כתיבה כבר נשלחה לתור ועוד לא רצה - אין צורך בעוד אחת
+        self._flush_scheduled = False
+        self._lock = threading.Lock()
+        self.flushed_rows = 0
+    
+    def add(self, user_id: int, activity_type: str, count: int = 1) -> bool:
+        """צבירת אירוע - מחזיר True כשהגיע הזמן לכתוב למסד (פעם אחת עד שהכתיבה רצה)"""
+        column = self.ACTIVITY_COLUMNS.get(activity_type)
+        if column is None:
+            return False
+        
+        today = datetime.now().strftime('%Y-%m-%d')
+        with self._lock:
+            counters = self._pending.get((user_id, today))
+            if counters is None:
+                counters = self._pending[(user_id, today)] = [0, 0, 0]
+            counters[column] += count
+            self._events += count
+            if self._events < self.max_events or self._flush_scheduled:
+                return False
+            self._flush_scheduled = True
+            return True
+    
+    def flush(self) -> int:
+        """כתיבת כל המונים שנצברו בטרנזקציה אחת"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._events = 0
+            self._flush_scheduled = False
+        if not pending:
+            return 0
+        
+        rows = [(user_id, date, *counters) for (user_id, date), counters in pending.items()]
+        try:
+            with self.db.transaction() as cursor:
+                cursor.executemany(self.UPSERT_SQL, rows)
+        except Exception:
+            # החזרת המונים לצבירה כדי שלא יאבדו - ינסו שוב בכתיבה הבאה
+            with self._lock:
+                for key, counters in pending.items():
+                    merged = self._pending.setdefault(key, [0, 0, 0])
+                    for i, value in enumerate(counters):
+                        merged[i] += value
+                    self._events += sum(counters)
+            raise
+        
+        self.flushed_rows += len(rows)
+        return len(rows)
+    
+    def __len__(self) -> int:
+        return len(self._pending)
+
 
 class EnhancedTodoBot:
     """תכונות מתקדמות לבוט המשימות"""
     
     def __init__(self, db_name: str = 'todo_tasks.db'):
         self.db_name = db_name
+        self.db = get_database(db_name)
+        self.activity = ActivityBuffer(self.db, config.Advanced.ACTIVITY_FLUSH_EVENTS)
+        self.chart_renderer = ChartRenderer()
+        self.recurring = RecurringTaskMaterializer(
+            self.db,
+            config.Advanced.RECURRING_BATCH_SIZE,
+            config.Advanced.RECURRING_MAX_CATCH_UP
+        )
         
     def init_enhanced_database(self):
         """יצירת טבלאות מתקדמות"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        # טבלת סטטיסטיקות יומיות
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS daily_stats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                date TEXT NOT NULL,
-                tasks_created INTEGER DEFAULT 0,
-                tasks_completed INTEGER DEFAULT 0,
-                tasks_deleted INTEGER DEFAULT 0,
-                productivity_score REAL DEFAULT 0.0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, date)
-            )
-        ''')
-        
-        # טבלת הגדרות משתמש
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_preferences (
-                user_id INTEGER PRIMARY KEY,
-                reminder_time TEXT DEFAULT '09:00',
-                timezone TEXT DEFAULT 'Asia/Jerusalem',
-                notifications_enabled BOOLEAN DEFAULT TRUE,
-                preferred_language TEXT DEFAULT 'he',
-                theme_color TEXT DEFAULT 'blue',
-                daily_goal INTEGER DEFAULT 3,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # טבלת תגיות למשימות
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS task_tags (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                task_id INTEGER NOT NULL,
-                tag_name TEXT NOT NULL,
-                FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE,
-                UNIQUE(task_id, tag_name)
-            )
-        ''')
-        
-        # טבלת משימות חוזרות
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS recurring_tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                content TEXT NOT NULL,
-                category TEXT DEFAULT 'כללי',
-                frequency TEXT NOT NULL, -- daily, weekly, monthly
-                next_due_date TEXT NOT NULL,
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        # הטבלאות המתקדמות מוגדרות במיגרציות יחד עם הטבלאות הבסיסיות
+        run_migrations(self.db)
     
-    def record_user_activity(self, user_id: int, activity_type: str):
-        """רישום פעילות משתמש לסטטיסטיקות"""
-        today = datetime.now().strftime('%Y-%m-%d')
-        
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        # יצירת רשומה אם לא קיימת
-        cursor.execute('''
-            INSERT OR IGNORE INTO daily_stats (user_id, date) 
-            VALUES (?, ?)
-        ''', (user_id, today))
-        
-        # עדכון הסטטיסטיקה המתאימה
-        if activity_type == 'task_created':
-            cursor.execute('''
-                UPDATE daily_stats 
-                SET tasks_created = tasks_created + 1 
-                WHERE user_id = ? AND date = ?
-            ''', (user_id, today))
-        elif activity_type == 'task_completed':
-            cursor.execute('''
-                UPDATE daily_stats 
-                SET tasks_completed = tasks_completed + 1 
-                WHERE user_id = ? AND date = ?
-            ''', (user_id, today))
-        elif activity_type == 'task_deleted':
-            cursor.execute('''
-                UPDATE daily_stats 
-                SET tasks_deleted = tasks_deleted + 1 
-                WHERE user_id = ? AND date = ?
-            ''', (user_id, today))
-        
-        # חישוב ציון פרודוקטיביות
-        cursor.execute('''
-            SELECT tasks_created, tasks_completed, tasks_deleted 
-            FROM daily_stats 
-            WHERE user_id = ? AND date = ?
-        ''', (user_id, today))
-        
-        result = cursor.fetchone()
-        if result:
-            created, completed, deleted = result
-            # פורמולה פשוטה לציון פרודוקטיביות
-            productivity = (completed * 2) + created - (deleted * 0.5)
-            productivity = max(0, productivity)  # לא יכול להיות שלילי
-            
-            cursor.execute('''
-                UPDATE daily_stats 
-                SET productivity_score = ? 
-                WHERE user_id = ? AND date = ?
-            ''', (productivity, user_id, today))
-        
-        conn.commit()
-        conn.close()
+    async def materialize_recurring_tasks(self) -> int:
+        """יצירת המשימות מכל החוזרות שהגיע מועדן - מנה בכל פעם, כדי לא לעכב כתיבות אחרות"""
+        today = datetime.now(config.TIMEZONE).date()
+        total = 0
+        while True:
+            handled = await self.db.write(self.recurring.run_batch, today)
+            total += handled
+            if handled < self.recurring.batch_size:
+                return total
+    
+    def record_user_activity(self, user_id: int, activity_type: str, count: int = 1):
+        """רישום פעילות משתמש לסטטיסטיקות (נצבר בזיכרון ונכתב במנות)"""
+        if self.activity.add(user_id, activity_type, count):
+            self.db.submit_write(self.activity.flush)
     
     def get_user_statistics(self, user_id: int, days: int = 30) -> Dict:
         """קבלת סטטיסטיקות משתמש"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        cursor = self.db.connection.cursor()
         
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
@@ -183,8 +203,7 @@ class EnhancedTodoBot:
         ''', (user_id,))
         
         top_categories = cursor.fetchall()
-        
-        conn.close()
+        cursor.close()
         
         stats = {
             'total_created': result[0] or 0,
@@ -199,68 +218,26 @@ class EnhancedTodoBot:
         
         return stats
     
-    def create_productivity_chart(self, user_id: int, days: int = 14) -> BytesIO:
-        """יצירת גרף פרודוקטיביות"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
+    def get_chart_data(self, user_id: int, days: int = 14) -> List[tuple]:
+        """הנתונים היומיים לגרף הפרודוקטיביות"""
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        cursor.execute('''
+        return self.db.fetchall('''
             SELECT date, tasks_created, tasks_completed, productivity_score
             FROM daily_stats 
             WHERE user_id = ? AND date >= ? AND date <= ?
             ORDER BY date
         ''', (user_id, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')))
-        
-        data = cursor.fetchall()
-        conn.close()
-        
+    
+    async def create_productivity_chart(self, user_id: int, days: int = 14) -> Tuple[Optional[tuple], Union[bytes, str, None]]:
+        """יצירת גרף פרודוקטיביות - מחזיר (מפתח מטמון, PNG או file_id)"""
+        data = await self.db.read(self.get_chart_data, user_id, days)
         if not data:
-            return None
-        
-        # הכנת הגרף
-        plt.style.use('seaborn-v0_8')
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
-        fig.suptitle('📊 הסטטיסטיקות שלך', fontsize=16, fontweight='bold')
-        
-        dates = [datetime.strptime(row[0], '%Y-%m-%d') for row in data]
-        created = [row[1] for row in data]
-        completed = [row[2] for row in data]
-        productivity = [row[3] for row in data]
+            return None, None
         
-        # גרף עליון - משימות שנוצרו ובוצעו
-        ax1.plot(dates, created, marker='o', label='משימות שנוצרו', color='skyblue', linewidth=2)
-        ax1.plot(dates, completed, marker='s', label='משימות שבוצעו', color='lightgreen', linewidth=2)
-        ax1.set_title('פעילות יומית', fontweight='bold')
-        ax1.set_ylabel('מספר משימות')
-        ax1.legend()
-        ax1.grid(True, alpha=0.3)
-        
-        # גרף תחתון - ציון פרודוקטיביות
-        ax2.bar(dates, productivity, color='orange', alpha=0.7, label='ציון פרודוקטיביות')
-        ax2.set_title('ציון פrודoקטיביות יומי', fontweight='bold')
-        ax2.set_ylabel('ציון')
-        ax2.set_xlabel('תאריך')
-        ax2.legend()
-        ax2.grid(True, alpha=0.3)
-        
-        # עיצוב התאריכים
-        for ax in [ax1, ax2]:
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
-            ax.xaxis.set_major_locator(mdates.DayLocator(interval=2))
-            plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
-        
-        plt.tight_layout()
-        
-        # שמירה לזיכרון
-        img_buffer = BytesIO()
-        plt.savefig(img_buffer, format='PNG', dpi=300, bbox_inches='tight')
-        img_buffer.seek(0)
-        plt.close()
-        
-        return img_buffer
+        key = self.chart_renderer.cache_key(user_id, days, data)
+        return key, await self.chart_renderer.render(key, data)
     
     def get_motivational_message(self, user_id: int) -> str:
         """יצירת הודעת מוטיבציה מותאמת אישית"""
@@ -284,7 +261,7 @@ class EnhancedTodoBot:
     async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """הצגת סטטיסטיקות מתקדמות"""
         user_id = update.effective_user.id
-        stats = self.get_user_statistics(user_id)
+        stats = await self.db.read(self.get_user_statistics, user_id)
         
         message = f"""
 📊 **הסטטיסטיקות שלך (30 ימים אחרונים)**
@@ -311,7 +288,7 @@ class EnhancedTodoBot:
             message += f"{medal} {category}: {count} משימות\n"
         
         # הוספת הודעת מוטיבציה
-        motivation = self.get_motivational_message(user_id)
+        motivation = await self.db.read(self.get_motivational_message, user_id)
         message += f"\n💪 **המוטיבציה שלך:** {motivation}"
         
         keyboard = [
@@ -323,110 +300,266 @@ class EnhancedTodoBot:
         await update.message.reply_text(message, reply_markup=reply_markup, parse_mode='Markdown')
 
     async def show_productivity_chart(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """הצגת גרף פרודוקטיביות"""
+        """הצגת גרף פרודוקטיביות (מפקודת /chart או מכפתור)"""
         query = update.callback_query
-        await query.answer()
+        if query:
+            await query.answer()
         
-        user_id = query.from_user.id
+        user_id = update.effective_user.id
+        message = update.effective_message
         
         try:
-            chart_buffer = self.create_productivity_chart(user_id)
+            key, chart = await self.create_productivity_chart(user_id)
             
-            if chart_buffer:
-                await query.message.reply_photo(
-                    photo=chart_buffer,
+            if chart:
+                sent = await message.reply_photo(
+                    photo=chart,
                     caption="📊 **הגרף שלך מוכן!**\n\nכאן תוכל לראות את ההתקדמות שלך בשבועיים האחרונים."
                 )
+                if isinstance(chart, bytes) and sent.photo:
+                    self.chart_renderer.remember_file_id(key, sent.photo[-1].file_id)
             else:
-                await query.edit_message_text("📊 אין מספיק נתונים ליצירת גרף. המשך לעבוד ובקרוב יהיה לך גרף מרשים!")
-                
+                await message.reply_text("📊 אין מספיק נתונים ליצירת גרף. המשך לעבוד ובקרוב יהיה לך גרף מרשים!")
+        
+        except ChartQueueFull:
+            await message.reply_text("⏳ יש כרגע עומס ביצירת גרפים. אנא נסה שוב בעוד מספר שניות.")
         except Exception as e:
-            await query.edit_message_text("❌ שגיאה ביצירת הגרף. אנא נסה שוב מאוחר יותר.")
+            logger.error(f"Chart error for user {user_id}: {e}")
+            await message.reply_text("❌ שגיאה ביצירת הגרף. אנא נסה שוב מאוחר יותר.")
 
-    def add_task_with_tags(self, user_id: int, content: str, category: str, tags: List[str] = None):
-        """הוספת משימה עם תגיות"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        # הוספת המשימה
-        cursor.execute('''
-            INSERT INTO tasks (user_id, content, category) 
-            VALUES (?, ?, ?)
-        ''', (user_id, content, category))
-        
-        task_id = cursor.lastrowid
-        
-        # הוספת תגיות אם יש
-        if tags:
-            for tag in tags:
-                tag = tag.strip().lower()
-                if tag:
-                    cursor.execute('''
-                        INSERT OR IGNORE INTO task_tags (task_id, tag_name) 
-                        VALUES (?, ?)
-                    ''', (task_id, tag))
-        
-        conn.commit()
-        conn.close()
-        
-        # רישום פעילות
-        self.record_user_activity(user_id, 'task_created')
-        
-        return task_id
+    def get_tag_counts(self, user_id: int, limit: int) -> List[Tuple[str, int]]:
+        """ענן התגיות - (תגית, מספר משימות פתוחות), מהנפוצה ביותר"""
+        return self.db.fetchall('''
+            SELECT g.name, COUNT(*) AS uses
+            FROM tasks t
+            JOIN task_tags tt ON tt.task_id = t.id
+            JOIN tags g ON g.id = tt.tag_id
+            WHERE t.user_id = ? AND t.status = 'open'
+            GROUP BY g.id
+            ORDER BY uses DESC, g.name
+            LIMIT ?
+        ''', (user_id, limit))
+    
+    def get_tasks_by_tag(self, user_id: int, tag: str, limit: int) -> List[tuple]:
+        """המשימות הפתוחות עם תגית - לפי המפתח (tag_id, task_id)"""
+        return self.db.fetchall('''
+            SELECT t.id, t.content, t.category, t.created_at
+            FROM tags g
+            JOIN task_tags tt ON tt.tag_id = g.id
+            JOIN tasks t ON t.id = tt.task_id
+            WHERE g.name = ? AND t.user_id = ? AND t.status = 'open'
+            ORDER BY t.id DESC
+            LIMIT ?
+        ''', (tag.lower(), user_id, limit))
 
-    def search_tasks(self, user_id: int, query: str) -> List[tuple]:
-        """חיפוש משימות לפי תוכן או תגיות"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+    def search_tasks(self, user_id: int, query: str, limit: int = 50) -> List[tuple]:
+        """חיפוש משימות לפי תוכן, קטגוריה או תגיות - מהתוצאה הרלוונטית ביותר"""
+        words = search_words(query)
+        if not words:
+            return []
+        
+        # כל מילה כתחילית - "פגיש" מוצא את "פגישה" ו"פגישות"
+        match = ' '.join(f'"{user_id}_{word}"*' for word in words)
+        try:
+            return self.db.fetchall('''
+                SELECT t.id, t.content, t.category, t.created_at
+                FROM tasks_fts
+                JOIN tasks t ON t.id = tasks_fts.rowid
+                WHERE tasks_fts MATCH ?
+                ORDER BY bm25(tasks_fts, 10.0, 5.0, 5.0), t.created_at DESC
+                LIMIT ?
+            ''', (match, limit))
+        except sqlite3.OperationalError as e:
+            if 'no such table' not in str(e):
+                raise
+            return self._search_tasks_like(user_id, query, limit)
+    
+    def _search_tasks_like(self, user_id: int, query: str, limit: int) -> List[tuple]:
+        """חיפוש ללא אינדקס (כש-FTS5 לא זמין)"""
+        return self.db.fetchall('''
             SELECT DISTINCT t.id, t.content, t.category, t.created_at
             FROM tasks t
             LEFT JOIN task_tags tt ON t.id = tt.task_id
+            LEFT JOIN tags g ON g.id = tt.tag_id
             WHERE t.user_id = ? 
             AND t.status = 'open'
             AND (
                 t.content LIKE ? 
                 OR t.category LIKE ?
-                OR tt.tag_name LIKE ?
+                OR g.name LIKE ?
             )
             ORDER BY t.created_at DESC
-        ''', (user_id, f'%{query}%', f'%{query}%', f'%{query}%'))
-        
-        results = cursor.fetchall()
-        conn.close()
-        
-        return results
+            LIMIT ?
+        ''', (user_id, f'%{query}%', f'%{query}%', f'%{query}%', limit))
 
-    async def backup_user_data(self, user_id: int) -> str:
-        """יצירת גיבוי של נתוני המשתמש"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        # קבלת כל הנתונים של המשתמש
-        cursor.execute('SELECT * FROM tasks WHERE user_id = ?', (user_id,))
-        tasks = cursor.fetchall()
-        
-        cursor.execute('SELECT * FROM categories WHERE user_id = ?', (user_id,))
-        categories = cursor.fetchall()
-        
-        cursor.execute('SELECT * FROM daily_stats WHERE user_id = ?', (user_id,))
-        stats = cursor.fetchall()
-        
-        conn.close()
-        
-        backup_data = {
-            'user_id': user_id,
-            'backup_date': datetime.now().isoformat(),
-            'tasks': tasks,
-            'categories': categories,
-            'stats': stats
-        }
-        
-        # שמירת הגיבוי לקובץ
-        backup_filename = f'backup_user_{user_id}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-        
-        with open(backup_filename, 'w', encoding='utf-8') as f:
-            json.dump(backup_data, f, ensure_ascii=False, indent=2, default=str)
+    async def backup_user_data(self, user_id: int) -> SpooledTemporaryFile:
+        """יצירת גיבוי של נתוני המשתמש (JSON Lines דחוס ב-gzip)"""
+        return await self.db.read(self._write_user_backup, user_id)
+
+    def _write_user_backup(self, user_id: int) -> SpooledTemporaryFile:
+        """כתיבת הגיבוי שורה אחר שורה (רץ ב-thread של מסד הנתונים)"""
+        # בזיכרון עד הגודל המוגדר, ומעבר לו בקובץ זמני
+        backup = SpooledTemporaryFile(max_size=config.Advanced.BACKUP_SPOOL_MAX_BYTES)
+        try:
+            with gzip.GzipFile(fileobj=backup, mode='wb', compresslevel=6) as out:
+                self._write_backup_line(out, {
+                    'type': 'backup',
+                    'version': BACKUP_FORMAT_VERSION,
+                    'user_id': user_id,
+                    'backup_date': datetime.now().isoformat()
+                })
+                
+                # כל הטבלאות נקראות מאותה תמונת מצב של המסד
+                with self.db.read_transaction() as cursor:
+                    for row_type, sql in BACKUP_QUERIES:
+                        self._write_backup_rows(out, cursor, row_type, sql, (user_id,))
+        except BaseException:
+            backup.close()
+            raise
+        
+        backup.seek(0)
+        return backup
+
+    def _write_backup_rows(self, out, cursor, row_type: str, sql: str, params: tuple):
+        """כתיבת תוצאות שאילתה בלי לטעון את כולן לזיכרון"""
+        cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        for row in cursor:
+            self._write_backup_line(out, {'type': row_type, **dict(zip(columns, row))})
+
+    @staticmethod
+    def _write_backup_line(out, record: Dict):
+        out.write(json.dumps(record, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+
+    async def restore_user_backup(self, user_id: int, backup_file: BinaryIO) -> Dict[str, int]:
+        """טעינת קובץ גיבוי לחשבון המשתמש
+
+        הקובץ נקרא מחוץ ל-thread הכתיבה, וכל מנה נכתבת בכתיבה נפרדת - שחזור גדול
+        לא מעכב את הכתיבות של שאר המשתמשים. אם הקובץ פגום באמצע, השורות מהמנות
+        שכבר נכתבו נמחקות - שחזור שנכשל לא משאיר חצי גיבוי.
+        """
+        counts = {row_type: 0 for row_type, _ in BACKUP_QUERIES}
+        task_ids: Dict[int, int] = {}  # מזהה בגיבוי -> מזהה חדש
+        inserted: Dict[str, List[int]] = {table: [] for table in RESTORE_TABLES.values()}
+        chunks = self._read_backup_chunks(backup_file, config.Advanced.RESTORE_CHUNK_SIZE, counts)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    return counts
+                row_type, records = chunk
+                counts[row_type] += await self.db.write(
+                    self._restore_chunk, user_id, row_type, records, task_ids, inserted
+                )
+        except Exception:
+            await self.db.write(self._undo_restore, user_id, inserted)
+            raise
+        finally:
+            chunks.close()
+
+    @staticmethod
+    def _read_backup_chunks(backup_file: BinaryIO, chunk_size: int, row_types):
+        """מנות של (סוג שורה, שורות) מקובץ הגיבוי - סוגים לא מוכרים מדולגים"""
+        chunk: List[Dict] = []
+        chunk_type = None
+        
+        with gzip.open(backup_file, 'rt', encoding='utf-8') as lines:
+            header = json.loads(next(lines, 'null'))
+            if not isinstance(header, dict) or header.get('type') != 'backup':
+                raise ValueError("Not a backup file")
+            if header.get('version', 0) > BACKUP_FORMAT_VERSION:
+                raise ValueError(f"Unsupported backup version {header.get('version')}")
+            
+            for line in lines:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                row_type = record.get('type')
+                if row_type not in row_types:
+                    continue
+                
+                if chunk and (row_type != chunk_type or len(chunk) >= chunk_size):
+                    yield chunk_type, chunk
+                    chunk = []
+                chunk_type = row_type
+                chunk.append(record)
+            
+            if chunk:
+                yield chunk_type, chunk
+
+    def _restore_chunk(self, user_id: int, row_type: str, records: List[Dict], task_ids: Dict[int, int],
+                       inserted: Dict[str, List[int]]) -> int:
+        """הכנסת קבוצת שורות מאותו סוג בטרנזקציה אחת - המזהים החדשים נרשמים ב-inserted"""
+        table = RESTORE_TABLES.get(row_type)
+        with self.db.transaction() as cursor:
+            if table is not None:
+                # AUTOINCREMENT - כל שורה שנכנסת בטרנזקציה הזו מקבלת מזהה גדול מהמקסימום הנוכחי
+                last_id = cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+            
+            if row_type == 'task':
+                # שריון טווח מזהים חדש - אף פעם לא מזהה של משימה שנמחקה
+                next_id = next_task_id(cursor)
+                rows = []
+                for new_id, record in enumerate(records, next_id):
+                    task_ids[record['id']] = new_id
+                    rows.append((
+                        new_id, user_id, record['content'], record.get('status') or 'open',
+                        record.get('category') or 'כללי', record.get('created_at'), record.get('updated_at'),
+                        record.get('due_at'), record.get('priority') or 2, record.get('due_notified') or 0
+                    ))
+                cursor.executemany('''
+                    INSERT INTO tasks (id, user_id, content, status, category, created_at, updated_at,
+                                       due_at, priority, due_notified)
+                    VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?)
+                ''', rows)
+            
+            elif row_type == 'task_tag':
+                rows = [(task_ids[record['task_id']], record['tag_name'])
+                        for record in records if record.get('task_id') in task_ids]
+                insert_task_tags(cursor, rows)
+            
+            elif row_type == 'category':
+                rows = [(user_id, record['name'], record.get('emoji') or '📂') for record in records]
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO categories (user_id, name, emoji) VALUES (?, ?, ?)
+                ''', rows)
+            
+            elif row_type == 'recurring_task':
+                rows = [(user_id, record['content'], record.get('category') or 'כללי', record['frequency'],
+                         record['next_due_date'], record.get('is_active', True), record.get('day_of_month'))
+                        for record in records]
+                cursor.executemany('''
+                    INSERT INTO recurring_tasks (user_id, content, category, frequency, next_due_date, is_active,
+                                                 day_of_month)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+            
+            else:  # stats - ימים שכבר קיימים במסד נשארים כפי שהם
+                rows = [(user_id, record['date'], record.get('tasks_created', 0), record.get('tasks_completed', 0),
+                         record.get('tasks_deleted', 0), record.get('productivity_score', 0.0)) for record in records]
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO daily_stats
+                        (user_id, date, tasks_created, tasks_completed, tasks_deleted, productivity_score)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', rows)
+            
+            if table is not None:
+                # INSERT OR IGNORE - רק השורות שנכנסו בפועל, לא אלה שכבר היו קיימות
+                inserted[table].extend(row_id for row_id, in cursor.execute(
+                    f'SELECT id FROM {table} WHERE id > ? AND user_id = ?', (last_id, user_id)
+                ))
         
-        return backup_filename
\ No newline at end of file
+        return len(rows)
+
+    def _undo_restore(self, user_id: int, inserted: Dict[str, List[int]]):
+        """מחיקת השורות ששחזור שנכשל הספיק לכתוב (התגיות של המשימות נמחקות איתן ב-CASCADE)"""
+        with self.db.transaction() as cursor:
+            for table, row_ids in inserted.items():
+                for start in range(0, len(row_ids), 500):
+                    chunk = row_ids[start:start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f'DELETE FROM {table} WHERE user_id = ? AND id IN ({placeholders})',
+                                   (user_id, *chunk))
+        removed = sum(len(row_ids) for row_ids in inserted.values())
+        if removed:
+            logger.warning(f"Restore for user {user_id} failed, removed {removed} partially restored rows")
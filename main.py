@@ -5,16 +5,37 @@
 מאת: כותב תוכן טכנולוגי
 """
 
+import re
 import sqlite3
 import logging
 import asyncio
-from datetime import datetime, time
-from typing import Dict, List, Optional
+import signal
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
 import os
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
+from telegram.error import BadRequest
+from telegram.ext import (
+    Application, ApplicationHandlerStop, CommandHandler, CallbackQueryHandler, MessageHandler, TypeHandler,
+    filters, ContextTypes
+)
 import pytz
 from config import config
+from database import get_database, insert_task_tags, next_task_id
+from migrations import run_migrations
+from cache import TTLCache
+from notifications import RateLimitedSender
+from scheduler import (
+    DeadlineScheduler, ReminderScheduler, from_db_time, parse_due_date, parse_reminder_time, to_db_time
+)
+from snapshots import create_snapshot, prune_snapshots
+from state import SQLiteStateBackend, StateStore
+from ratelimit import RateLimiter
+from concurrency import ChatOrderedUpdateProcessor
+from metrics import MetricsRegistry
+from monitoring import InstrumentedRequest, WebApp, update_label
 
 # הגדרת לוגים
 logging.basicConfig(
@@ -27,169 +48,332 @@ logger = logging.getLogger(__name__)
 DB_NAME = 'todo_tasks.db'
 TIMEZONE = pytz.timezone('Asia/Jerusalem')
 
+# עדיפות משימה: 1 גבוהה, 2 רגילה (ברירת מחדל), 3 נמוכה
+PRIORITY_NAMES = {
+    '1': 1, 'גבוהה': 1, 'דחוף': 1, 'high': 1,
+    '2': 2, 'רגילה': 2, 'normal': 2,
+    '3': 3, 'נמוכה': 3, 'low': 3,
+}
+PRIORITY_MARKS = {1: '🔴 ', 2: '', 3: '🔵 '}
+
+# הוספה מרובה: #תגית ו-@קטגוריה בכל שורה (רק בתחילת מילה)
+TAG_RE = re.compile(r'(?<!\S)#(\w+)')
+CATEGORY_RE = re.compile(r'(?<!\S)@(\S+)')
+
+
+def extract_tags(text: str) -> List[str]:
+    """התגיות (#תגית) בטקסט - באותיות קטנות, בלי כפילויות"""
+    return list(dict.fromkeys(tag.lower() for tag in TAG_RE.findall(text)))
+
+
+def parse_task_line(line: str) -> Tuple[str, Optional[str], List[str]]:
+    """שורה -> (תוכן בלי הסימונים, קטגוריה או None, תגיות)"""
+    categories = CATEGORY_RE.findall(line)
+    tags = extract_tags(line)
+    content = ' '.join(CATEGORY_RE.sub('', TAG_RE.sub('', line)).split())
+    return content, categories[-1] if categories else None, tags
+
 class TodoBot:
     def __init__(self, token: str):
         self.token = token
-        self.application = Application.builder().token(token).build()
-        self.user_states: Dict[int, str] = {}
-        self.pending_tasks: Dict[int, Dict] = {}
+        self.metrics = MetricsRegistry()
+        self.handler_latency = self.metrics.histogram(
+            'todo_bot_handler_duration_seconds', 'Time spent handling one update', ('kind', 'handler')
+        )
+        self.handler_errors = self.metrics.counter(
+            'todo_bot_handler_errors_total', 'Unhandled exceptions raised by handlers', ('error',)
+        )
+        self.db_latency = self.metrics.histogram(
+            'todo_bot_db_query_duration_seconds', 'Database operation run time', ('kind', 'operation')
+        )
+        self.bot_api_latency = self.metrics.histogram(
+            'todo_bot_api_request_duration_seconds', 'Bot API request duration', ('method',)
+        )
+        self.bot_api_errors = self.metrics.counter(
+            'todo_bot_api_errors_total', 'Failed Bot API requests', ('method', 'error')
+        )
+        self._command_names: Optional[frozenset] = None
+        self.update_processor = ChatOrderedUpdateProcessor(
+            config.Advanced.MAX_CONCURRENT_USERS,
+            config.Advanced.MAX_PENDING_UPDATES,
+            observer=self._observe_update
+        )
+        self.application = (
+            Application.builder()
+            .token(token)
+            .request(InstrumentedRequest(self.bot_api_latency, self.bot_api_errors, connection_pool_size=256))
+            .concurrent_updates(self.update_processor)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
         self.db_name = config.DATABASE_NAME
-        
+        self.db = get_database(self.db_name)
+        self.db.observer = lambda kind, operation, seconds: self.db_latency.observe(seconds, kind, operation)
+        self.user_states = self._create_state_store('user_states')
+        self.pending_tasks = self._create_state_store('pending_tasks')
+        self.category_cache = TTLCache(
+            max_size=config.Advanced.CATEGORY_CACHE_MAX_USERS,
+            ttl=config.Advanced.CACHE_TIMEOUT
+        )
+        # העמוד המוצג בכל הודעת רשימה, לעדכון חלקי אחרי לחיצה
+        self.task_views = TTLCache(
+            max_size=config.Advanced.TASK_VIEW_CACHE_SIZE,
+            ttl=config.Advanced.TASK_VIEW_TTL
+        )
+        self.reminder_scheduler = ReminderScheduler(
+            config.DAILY_REMINDER_TIME.strftime('%H:%M'),
+            config.TIMEZONE.zone
+        )
+        self.deadline_scheduler = DeadlineScheduler(
+            timedelta(minutes=config.Advanced.DUE_SOON_MINUTES),
+            timedelta(hours=config.Advanced.DUE_LOAD_WINDOW_HOURS)
+        )
+        self.sender: Optional[RateLimitedSender] = None
+        self.rate_limiter = RateLimiter(
+            config.Advanced.RATE_LIMIT_PER_MINUTE,
+            config.Advanced.RATE_LIMIT_BURST
+        )
+        self.register_metrics()
+        
+    def register_metrics(self):
+        """מדדים שנקראים מהמונים של הרכיבים בזמן הבקשה ל-/metrics"""
+        metrics = self.metrics
+        metrics.gauge('todo_bot_updates_pending', 'Updates waiting or being handled', (),
+                      lambda: {(): self.update_processor.stats()['pending']})
+        metrics.gauge('todo_bot_updates_active_chats', 'Chats with an update in progress', (),
+                      lambda: {(): self.update_processor.stats()['active_chats']})
+        metrics.counter_callback('todo_bot_updates_total', 'Updates by outcome', ('result',),
+                                 lambda: {(key,): value for key, value in self.update_processor.stats().items()
+                                          if key in ('processed', 'shed')})
+        metrics.gauge('todo_bot_db_in_flight', 'Database operations queued or running', ('kind',),
+                      lambda: {(kind,): count for kind, count in self.db.in_flight.items()})
+        metrics.gauge('todo_bot_send_queue_depth', 'Messages waiting in the send queue', (),
+                      lambda: {(): self.sender.stats()['queued'] if self.sender is not None else 0})
+        metrics.counter_callback('todo_bot_sent_messages_total', 'Queued messages by outcome', ('result',),
+                                 lambda: {(key,): value for key, value in self.sender.stats().items()
+                                          if key != 'queued'} if self.sender is not None else {})
+        metrics.gauge('todo_bot_cache_hit_ratio', 'Cache hit ratio', ('cache',),
+                      lambda: {(name,): stats['hit_rate'] for name, stats in self.cache_stats().items()})
+        metrics.gauge('todo_bot_cache_entries', 'Entries held in each cache', ('cache',),
+                      lambda: {(name,): stats['size'] for name, stats in self.cache_stats().items()})
+        metrics.counter_callback('todo_bot_rate_limit_requests_total', 'Rate limiter decisions', ('result',),
+                                 lambda: {(key,): self.rate_limiter.stats()[key] for key in ('allowed', 'throttled')})
+
+    def cache_stats(self) -> Dict[str, Dict]:
+        """מוני המטמונים לפי שם"""
+        return {
+            'categories': self.category_cache.stats(),
+            'task_views': self.task_views.stats(),
+            'user_states': self.user_states.stats(),
+            'pending_tasks': self.pending_tasks.stats()
+        }
+
+    def _observe_update(self, update: object, seconds: float):
+        if self._command_names is None:
+            self._command_names = frozenset(
+                command
+                for handlers in self.application.handlers.values()
+                for handler in handlers if isinstance(handler, CommandHandler)
+                for command in handler.commands
+            )
+        self.handler_latency.observe(seconds, *update_label(update, self._command_names))
+
+    async def error_handler(self, update: object, context: ContextTypes.DEFAULT_TYPE):
+        """שגיאה שלא טופלה ב-handler - רישום ללוג וספירה לפי סוג"""
+        self.handler_errors.inc(type(context.error).__name__)
+        logger.error(f"Unhandled error while handling an update: {context.error}", exc_info=context.error)
+
+    def _create_state_store(self, name: str) -> StateStore:
+        """מאגר מצב שיחה - בזיכרון, או עם שמירה למסד לפי ההגדרות"""
+        advanced = config.Advanced
+        backend = SQLiteStateBackend(self.db, name) if advanced.STATE_BACKEND == 'sqlite' else None
+        return StateStore(advanced.STATE_MAX_USERS, advanced.STATE_TTL, backend)
+
     def init_database(self):
         """יצירת מסד הנתונים והטבלאות"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        # טבלת משימות
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                content TEXT NOT NULL,
-                status TEXT DEFAULT 'open',
-                category TEXT DEFAULT 'כללי',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # טבלת קטגוריות
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                emoji TEXT DEFAULT '📂',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, name)
-            )
-        ''')
-        
-        # הוספת קטגוריות ברירת מחדל
-        default_categories = [
-            ('עבודה', '💼'),
-            ('לימודים', '📚'),
-            ('אישי', '🏠'),
-            ('כללי', '➕')
-        ]
-        
-        for category, emoji in default_categories:
-            cursor.execute('''
-                INSERT OR IGNORE INTO categories (user_id, name, emoji) 
-                VALUES (0, ?, ?)
-            ''', (category, emoji))
-        
-        conn.commit()
-        conn.close()
+        run_migrations(self.db)
+        # שיחות שהיו באמצע לפני ההפעלה מחדש
+        restored = self.user_states.load() + self.pending_tasks.load()
+        if restored:
+            logger.info(f"Restored {restored} conversation state entries")
         
     def get_user_categories(self, user_id: int) -> List[tuple]:
         """קבלת קטגוריות של משתמש"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        return self.db.fetchall('''
             SELECT name, emoji FROM categories 
             WHERE user_id = ? OR user_id = 0
             ORDER BY name
         ''', (user_id,))
-        
-        categories = cursor.fetchall()
-        conn.close()
-        return categories
+
+    def get_category_emojis(self, user_id: int) -> Dict[str, str]:
+        """מיפוי שם קטגוריה לאימוג'י, דרך המטמון"""
+        emojis = self.category_cache.get(user_id)
+        if emojis is None:
+            # קטגוריות המשתמש גוברות על קטגוריות ברירת המחדל באותו שם
+            rows = self.db.fetchall('''
+                SELECT name, emoji FROM categories 
+                WHERE user_id = ? OR user_id = 0
+                ORDER BY name, user_id
+            ''', (user_id,))
+            emojis = dict(rows)
+            self.category_cache.set(user_id, emojis)
+        return emojis
         
     def add_category(self, user_id: int, name: str, emoji: str = '📂'):
         """הוספת קטגוריה חדשה"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('''
+            self.db.execute('''
                 INSERT INTO categories (user_id, name, emoji) 
                 VALUES (?, ?, ?)
             ''', (user_id, name, emoji))
-            conn.commit()
-            return True
         except sqlite3.IntegrityError:
             return False
-        finally:
-            conn.close()
-            
-    def add_task(self, user_id: int, content: str, category: str = 'כללי'):
-        """הוספת משימה חדשה"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
         
-        cursor.execute('''
+        self.category_cache.invalidate(user_id)
+        return True
+            
+    def add_task(self, user_id: int, content: str, category: str = 'כללי', tags: List[str] = None):
+        """הוספת משימה חדשה, עם התגיות שלה באותה טרנזקציה"""
+        if tags:
+            return self.add_tasks(user_id, [(content, category, tags)])[0]
+        cursor = self.db.execute('''
             INSERT INTO tasks (user_id, content, category) 
             VALUES (?, ?, ?)
         ''', (user_id, content, category))
-        
-        task_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return task_id
-        
+        return cursor.lastrowid
+        
+    def add_tasks(self, user_id: int, tasks: List[Tuple[str, str, List[str]]]) -> List[int]:
+        """הוספת משימות (תוכן, קטגוריה, תגיות) ותגיותיהן בטרנזקציה אחת"""
+        with self.db.transaction() as cursor:
+            first_id = next_task_id(cursor)
+            task_ids = list(range(first_id, first_id + len(tasks)))
+            cursor.executemany('''
+                INSERT INTO tasks (id, user_id, content, category)
+                VALUES (?, ?, ?, ?)
+            ''', [(task_id, user_id, content, category)
+                  for task_id, (content, category, _) in zip(task_ids, tasks)])
+            insert_task_tags(cursor, [(task_id, tag) for task_id, (_, _, tags) in zip(task_ids, tasks) for tag in tags])
+        return task_ids
+
+    def record_task_activity(self, user_id: int, activity_type: str, count: int):
+        """נקרא אחרי הוספה/סיום/מחיקה של משימות (task_created/task_completed/task_deleted)
+        - הבוט המתקדם סופר אותן לסטטיסטיקות"""
+
     def get_tasks(self, user_id: int, category: str = None, status: str = 'open') -> List[tuple]:
         """קבלת משימות לפי קטגוריה וסטטוס"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
         if category:
-            cursor.execute('''
+            return self.db.fetchall('''
                 SELECT id, content, category, created_at 
                 FROM tasks 
                 WHERE user_id = ? AND category = ? AND status = ?
                 ORDER BY created_at DESC
             ''', (user_id, category, status))
+
+        return self.db.fetchall('''
+            SELECT id, content, category, created_at 
+            FROM tasks 
+            WHERE user_id = ? AND status = ?
+            ORDER BY category, created_at DESC
+        ''', (user_id, status))
+
+    def get_task(self, task_id: int, user_id: int) -> Optional[tuple]:
+        """קבלת משימה בודדת"""
+        return self.db.fetchone('''
+            SELECT id, content, category, created_at, status
+            FROM tasks
+            WHERE id = ? AND user_id = ?
+        ''', (task_id, user_id))
+
+    def get_tasks_page(self, user_id: int, category: str = None, anchor_id: int = None,
+                       backward: bool = False, limit: int = None) -> Tuple[List[tuple], bool, bool]:
+        """עמוד משימות פתוחות לפי סמן (keyset) - מחזיר (משימות, יש_קודם, יש_הבא)"""
+        limit = limit or config.MAX_TASKS_PER_PAGE
+        select = '''
+            SELECT id, content, category, created_at
+            FROM tasks
+            WHERE user_id = ? AND status = 'open' '''
+
+        # הסמן הוא המשימה שבגבול העמוד הקודם; מפתח המיון שלה נשלף לפי המזהה
+        anchor = self.get_task(anchor_id, user_id) if anchor_id is not None else None
+        if anchor is None or (category and anchor[2] != category):
+            if category:
+                rows = self.db.fetchall(select + '''AND category = ?
+                    ORDER BY created_at DESC, id DESC LIMIT ?
+                ''', (user_id, category, limit + 1))
+            else:
+                rows = self.db.fetchall(select + '''
+                    ORDER BY category, created_at DESC, id DESC LIMIT ?
+                ''', (user_id, limit + 1))
+            return rows[:limit], False, len(rows) > limit
+
+        anchor_id, _, anchor_category, anchor_created_at, _ = anchor
+        if backward:
+            same_category = '''AND category = ? AND (created_at, id) > (?, ?)
+                ORDER BY created_at, id LIMIT ?'''
+            other_categories = '''AND category < ?
+                ORDER BY category DESC, created_at, id LIMIT ?'''
         else:
-            cursor.execute('''
-                SELECT id, content, category, created_at 
-                FROM tasks 
-                WHERE user_id = ? AND status = ?
-                ORDER BY category, created_at DESC
-            ''', (user_id, status))
-            
-        tasks = cursor.fetchall()
-        conn.close()
-        return tasks
+            same_category = '''AND category = ? AND (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC LIMIT ?'''
+            other_categories = '''AND category > ?
+                ORDER BY category, created_at DESC, id DESC LIMIT ?'''
+
+        rows = self.db.fetchall(select + same_category,
+                                (user_id, anchor_category, anchor_created_at, anchor_id, limit + 1))
+        if not category and len(rows) <= limit:
+            rows += self.db.fetchall(select + other_categories,
+                                     (user_id, anchor_category, limit + 1 - len(rows)))
+
+        if not rows:
+            # כל המשימות מעבר לסמן נסגרו - חזרה לעמוד הראשון
+            return self.get_tasks_page(user_id, category, limit=limit)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backward:
+            rows.reverse()
+            return rows, has_more, True
+        return rows, True, has_more
         
     def update_task_status(self, task_id: int, user_id: int, status: str):
         """עדכון סטטוס משימה"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        cursor = self.db.execute('''
             UPDATE tasks 
             SET status = ?, updated_at = CURRENT_TIMESTAMP 
             WHERE id = ? AND user_id = ?
         ''', (status, task_id, user_id))
-        
-        affected = cursor.rowcount
-        conn.commit()
-        conn.close()
-        return affected > 0
+        return cursor.rowcount > 0
         
     def delete_task(self, task_id: int, user_id: int):
         """מחיקת משימה"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        cursor = self.db.execute('''
             DELETE FROM tasks 
             WHERE id = ? AND user_id = ?
         ''', (task_id, user_id))
-        
-        affected = cursor.rowcount
-        conn.commit()
-        conn.close()
-        return affected > 0
+        return cursor.rowcount > 0
+
+    def update_tasks_status(self, task_ids: List[int], user_id: int, status: str) -> int:
+        """עדכון סטטוס של כמה משימות בפקודה אחת - מחזיר כמה עודכנו"""
+        placeholders = ','.join('?' * len(task_ids))
+        cursor = self.db.execute(f'''
+            UPDATE tasks
+            SET status = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE user_id = ? AND status != ? AND id IN ({placeholders})
+        ''', (status, user_id, status, *task_ids))
+        return cursor.rowcount
+
+    def delete_tasks(self, task_ids: List[int], user_id: int) -> int:
+        """מחיקת כמה משימות בפקודה אחת - מחזיר כמה נמחקו"""
+        placeholders = ','.join('?' * len(task_ids))
+        cursor = self.db.execute(f'''
+            DELETE FROM tasks
+            WHERE user_id = ? AND id IN ({placeholders})
+        ''', (user_id, *task_ids))
+        return cursor.rowcount
         
     def get_task_summary(self, user_id: int) -> Dict:
         """קבלת סיכום משימות לפי קטגוריה"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        rows = self.db.fetchall('''
             SELECT category, COUNT(*) as count 
             FROM tasks 
             WHERE user_id = ? AND status = 'open'
@@ -197,12 +381,174 @@ class TodoBot:
             ORDER BY category
         ''', (user_id,))
         
-        summary = {}
-        for category, count in cursor.fetchall():
-            summary[category] = count
-            
-        conn.close()
-        return summary
+        return {category: count for category, count in rows}
+
+    def get_category_counts(self, user_id: int, include_empty: bool = True) -> List[tuple]:
+        """קבלת קטגוריות עם מספר המשימות הפתוחות בכל אחת - בשאילתה אחת"""
+        # איחוד הקטגוריות עם ספירת המשימות, כך שגם משימות בקטגוריה שנמחקה נספרות.
+        # כמו ב-get_category_emojis - קטגוריית המשתמש גוברת על ברירת המחדל באותו שם
+        return self.db.fetchall('''
+            SELECT name, COALESCE(MAX(emoji), '📂'), SUM(open_count)
+            FROM (
+                SELECT name, emoji, 0 AS open_count
+                FROM categories c
+                WHERE user_id = ?
+                   OR (user_id = 0 AND NOT EXISTS (
+                       SELECT 1 FROM categories WHERE user_id = ? AND name = c.name))
+                UNION ALL
+                SELECT category, NULL, COUNT(*)
+                FROM tasks
+                WHERE user_id = ? AND status = 'open'
+                GROUP BY category
+            )
+            GROUP BY name
+            HAVING ? OR SUM(open_count) > 0
+            ORDER BY name
+        ''', (user_id, user_id, user_id, include_empty))
+
+    def get_reminder_batch(self, after_user_id: int, limit: int) -> List[tuple]:
+        """ספירת משימות פתוחות לפי קטגוריה עבור קבוצת המשתמשים הבאה (לפי user_id)"""
+        return self.db.fetchall('''
+            SELECT t.user_id, t.category,
+                   COALESCE((SELECT c.emoji FROM categories c
+                             WHERE c.user_id IN (t.user_id, 0) AND c.name = t.category
+                             ORDER BY c.user_id DESC LIMIT 1), '📂'),
+                   COUNT(*)
+            FROM tasks t
+            WHERE t.status = 'open' AND t.user_id > ? AND t.user_id <= (
+                SELECT MAX(user_id) FROM (
+                    SELECT DISTINCT user_id FROM tasks
+                    WHERE status = 'open' AND user_id > ?
+                    AND user_id NOT IN (SELECT user_id FROM user_preferences)
+                    ORDER BY user_id LIMIT ?
+                )
+            )
+            AND t.user_id NOT IN (SELECT user_id FROM user_preferences)
+            GROUP BY t.user_id, t.category
+            ORDER BY t.user_id, t.category
+        ''', (after_user_id, after_user_id, limit))
+
+    def get_reminder_counts(self, user_ids: List[int]) -> List[tuple]:
+        """ספירת משימות פתוחות לפי קטגוריה עבור רשימת משתמשים נתונה"""
+        placeholders = ','.join('?' * len(user_ids))
+        return self.db.fetchall(f'''
+            SELECT t.user_id, t.category,
+                   COALESCE((SELECT c.emoji FROM categories c
+                             WHERE c.user_id IN (t.user_id, 0) AND c.name = t.category
+                             ORDER BY c.user_id DESC LIMIT 1), '📂'),
+                   COUNT(*)
+            FROM tasks t
+            WHERE t.status = 'open' AND t.user_id IN ({placeholders})
+            GROUP BY t.user_id, t.category
+            ORDER BY t.user_id, t.category
+        ''', tuple(user_ids))
+
+    def get_reminder_preferences(self) -> List[tuple]:
+        """העדפות התזכורת של כל המשתמשים שהגדירו אותן"""
+        return self.db.fetchall('''
+            SELECT user_id, reminder_time, timezone, notifications_enabled
+            FROM user_preferences
+        ''')
+
+    def set_reminder_preferences(self, user_id: int, reminder_time: str = None,
+                                 timezone: str = None, enabled: bool = True) -> tuple:
+        """עדכון שעת/אזור זמן התזכורת - ערך None משאיר את הערך הקיים"""
+        with self.db.transaction() as cursor:
+            cursor.execute('''
+                INSERT OR IGNORE INTO user_preferences (user_id, reminder_time, timezone)
+                VALUES (?, ?, ?)
+            ''', (user_id, config.DAILY_REMINDER_TIME.strftime('%H:%M'), config.TIMEZONE.zone))
+            cursor.execute('''
+                UPDATE user_preferences
+                SET reminder_time = COALESCE(?, reminder_time),
+                    timezone = COALESCE(?, timezone),
+                    notifications_enabled = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE user_id = ?
+            ''', (reminder_time, timezone, enabled, user_id))
+            cursor.execute('''
+                SELECT reminder_time, timezone, notifications_enabled
+                FROM user_preferences WHERE user_id = ?
+            ''', (user_id,))
+            return cursor.fetchone()
+
+    def get_user_timezone(self, user_id: int) -> str:
+        """אזור הזמן של המשתמש (מהגדרות התזכורת) או ברירת המחדל"""
+        row = self.db.fetchone('SELECT timezone FROM user_preferences WHERE user_id = ?', (user_id,))
+        return row[0] if row and row[0] else config.TIMEZONE.zone
+
+    def set_task_due(self, task_id: int, user_id: int, due_at: Optional[str]) -> bool:
+        """קביעת מועד יעד (None מבטל) - התראה חדשה תישלח על המועד החדש"""
+        cursor = self.db.execute('''
+            UPDATE tasks SET due_at = ?, due_notified = 0, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND user_id = ? AND status = 'open'
+        ''', (due_at, task_id, user_id))
+        return cursor.rowcount > 0
+
+    def set_task_priority(self, task_id: int, user_id: int, priority: int) -> bool:
+        """עדכון עדיפות משימה"""
+        cursor = self.db.execute('''
+            UPDATE tasks SET priority = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND user_id = ? AND status = 'open'
+        ''', (priority, task_id, user_id))
+        return cursor.rowcount > 0
+
+    def get_next_tasks(self, user_id: int, limit: int) -> List[tuple]:
+        """המשימות הבאות - קודם לפי מועד יעד ועדיפות, ואז משימות בלי מועד לפי עדיפות"""
+        # שתי השאילתות נקראות לפי סדר האינדקס (user_id, due_at, priority, id) - בלי מיון
+        with self.db.read_transaction() as cursor:
+            rows = cursor.execute('''
+                SELECT id, content, category, due_at, priority
+                FROM tasks
+                WHERE user_id = ? AND status = 'open' AND due_at IS NOT NULL
+                ORDER BY due_at, priority, id
+                LIMIT ?
+            ''', (user_id, limit)).fetchall()
+            if len(rows) < limit:
+                rows += cursor.execute('''
+                    SELECT id, content, category, due_at, priority
+                    FROM tasks
+                    WHERE user_id = ? AND status = 'open' AND due_at IS NULL
+                    ORDER BY priority, id
+                    LIMIT ?
+                ''', (user_id, limit - len(rows))).fetchall()
+        return rows
+
+    def get_tasks_due_before(self, user_id: int, until: str) -> List[tuple]:
+        """משימות פתוחות שמועדן לפני until (כולל באיחור), לפי מועד ועדיפות"""
+        return self.db.fetchall('''
+            SELECT id, content, category, due_at, priority
+            FROM tasks
+            WHERE user_id = ? AND status = 'open' AND due_at < ?
+            ORDER BY due_at, priority, id
+        ''', (user_id, until))
+
+    def get_pending_deadlines(self, after: Optional[str], until: str) -> List[tuple]:
+        """(task_id, due_at) של משימות שעוד לא נשלחה עליהן התראה, בחלון (after, until]"""
+        if after is None:
+            # טעינה ראשונה - כולל מועדים שחלפו בזמן שהבוט לא רץ
+            return self.db.fetchall('''
+                SELECT id, due_at FROM tasks
+                WHERE status = 'open' AND due_notified = 0 AND due_at <= ?
+            ''', (until,))
+        return self.db.fetchall('''
+            SELECT id, due_at FROM tasks
+            WHERE status = 'open' AND due_notified = 0 AND due_at > ? AND due_at <= ?
+        ''', (after, until))
+
+    def claim_due_notifications(self, task_ids: List[int], limit: str) -> List[tuple]:
+        """סימון ההתראות כנשלחות - מחזיר רק משימות שעדיין פתוחות ומועדן עדיין בטווח"""
+        rows = []
+        with self.db.transaction() as cursor:
+            for start in range(0, len(task_ids), 500):
+                chunk = task_ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows += cursor.execute(f'''
+                    UPDATE tasks SET due_notified = 1
+                    WHERE id IN ({placeholders}) AND status = 'open' AND due_notified = 0 AND due_at <= ?
+                    RETURNING user_id, id, content, due_at
+                ''', (*chunk, limit)).fetchall()
+        return sorted(rows)
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """פקודת התחלה"""
@@ -216,6 +562,11 @@ class TodoBot:
 • `/done` - סימון משימה כבוצעה
 • `/delete` - מחיקת משימה
 • `/summary` - סיכום משימות פתוחות
+• `/reminder` - קביעת שעת התזכורת היומית
+• `/next` - המשימות הבאות לפי מועד ועדיפות
+• `/today` - משימות להיום
+• `/due` - קביעת מועד יעד למשימה
+• `/priority` - קביעת עדיפות למשימה
 
 💡 **טיפ:** השתמש בכפתורים המהירים כדי לנווט בקלות!
 
@@ -230,17 +581,18 @@ class TodoBot:
         
         await update.message.reply_text(
             "📝 **הוספת משימה חדשה**\n\n"
-            "אנא כתוב את תוכן המשימה:",
+            "אנא כתוב את תוכן המשימה:\n\n"
+            "💡 כמה משימות בבת אחת: שורה לכל משימה, עם #תגית ו-@קטגוריה אופציונליים",
             parse_mode='Markdown'
         )
 
     async def categories_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """הצגת וניהול קטגוריות"""
         user_id = update.effective_user.id
-        categories = self.get_user_categories(user_id)
+        categories = await self.db.read(self.get_category_emojis, user_id)
         
         keyboard = []
-        for category, emoji in categories:
+        for category, emoji in categories.items():
             keyboard.append([InlineKeyboardButton(
                 f"{emoji} {category}", 
                 callback_data=f"view_category_{category}"
@@ -265,11 +617,10 @@ class TodoBot:
     async def list_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """הצגת משימות"""
         user_id = update.effective_user.id
-        categories = self.get_user_categories(user_id)
+        categories = await self.db.read(self.get_category_counts, user_id)
         
         keyboard = []
-        for category, emoji in categories:
-            task_count = len(self.get_tasks(user_id, category))
+        for category, emoji, task_count in categories:
             button_text = f"{emoji} {category}"
             if task_count > 0:
                 button_text += f" ({task_count})"
@@ -296,7 +647,7 @@ class TodoBot:
     async def summary_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """סיכום משימות פתוחות"""
         user_id = update.effective_user.id
-        summary = self.get_task_summary(user_id)
+        summary = await self.db.read(self.get_category_counts, user_id, False)
         
         if not summary:
             await update.message.reply_text(
@@ -309,14 +660,7 @@ class TodoBot:
         message = "📊 **סיכום המשימות הפתוחות שלך:**\n\n"
         total_tasks = 0
         
-        for category, count in summary.items():
-            categories = self.get_user_categories(user_id)
-            emoji = '📂'
-            for cat_name, cat_emoji in categories:
-                if cat_name == category:
-                    emoji = cat_emoji
-                    break
-            
+        for category, emoji, count in summary:
             message += f"{emoji} **{category}:** {count} משימות\n"
             total_tasks += count
         
@@ -337,11 +681,13 @@ class TodoBot:
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """טיפול בלחיצות על כפתורים"""
         query = update.callback_query
-        await query.answer()
-        
         user_id = query.from_user.id
         data = query.data
         
+        # לחיצות בוצע/מחק נענות עם הודעת התוצאה עצמה
+        if not data.startswith(('task_done_', 'task_delete_', 'sel_done', 'sel_delete')):
+            await query.answer()
+        
         if data.startswith('list_category_'):
             category = data.replace('list_category_', '')
             await self.show_category_tasks(query, user_id, category)
@@ -349,13 +695,29 @@ class TodoBot:
         elif data == 'list_all_tasks':
             await self.show_all_tasks(query, user_id)
             
-        elif data.startswith('task_done_'):
-            task_id = int(data.replace('task_done_', ''))
-            await self.mark_task_done(query, user_id, task_id)
+        elif data.startswith('tasks_page_'):
+            # tasks_page_{all|cat}_{n|p}_{anchor_id}
+            _, _, scope, direction, anchor_id = data.split('_')
+            anchor_id = int(anchor_id)
+            backward = direction == 'p'
+            if scope == 'cat':
+                task = await self.db.read(self.get_task, anchor_id, user_id)
+                if task:
+                    await self.show_category_tasks(query, user_id, task[2], anchor_id, backward)
+                    return
+            await self.show_all_tasks(query, user_id, anchor_id, backward)
             
-        elif data.startswith('task_delete_'):
-            task_id = int(data.replace('task_delete_', ''))
-            await self.delete_task_callback(query, user_id, task_id)
+        elif data.startswith(('task_done_', 'task_delete_')):
+            # task_{done|delete}_{all|cat}_{task_id} (בהודעות ישנות בלי התחום)
+            _, action, *scope, task_id = data.split('_')
+            scope = scope[0] if scope else 'all'
+            if action == 'done':
+                await self.mark_task_done(query, user_id, int(task_id), scope)
+            else:
+                await self.delete_task_callback(query, user_id, int(task_id), scope)
+            
+        elif data.startswith('sel_'):
+            await self.handle_selection(query, user_id, data)
             
         elif data == 'add_new_category':
             self.user_states[user_id] = 'waiting_category_name'
@@ -364,93 +726,237 @@ class TodoBot:
                 "אנא כתוב את שם הקטגוריה החדשה:"
             )
 
-    async def show_category_tasks(self, query, user_id: int, category: str):
-        """הצגת משימות של קטגוריה מסוימת"""
-        tasks = self.get_tasks(user_id, category)
-        
-        if not tasks:
-            await query.edit_message_text(
-                f"📂 **קטגוריה: {category}**\n\n"
-                "אין משימות פתוחות בקטגוריה זו.\n"
-                "השתמש ב-/add כדי להוסיף משימה חדשה! 📝"
-            )
-            return
-        
-        message = f"📂 **משימות בקטגוריה: {category}**\n\n"
+    def _page_navigation(self, scope: str, tasks: List[tuple], has_prev: bool, has_next: bool) -> List:
+        """כפתורי דפדוף - הסמן הוא מזהה המשימה שבקצה העמוד"""
+        navigation = []
+        if has_prev:
+            navigation.append(InlineKeyboardButton(
+                "➡️ הקודם", callback_data=f"tasks_page_{scope}_p_{tasks[0][0]}"
+            ))
+        if has_next:
+            navigation.append(InlineKeyboardButton(
+                "הבא ⬅️", callback_data=f"tasks_page_{scope}_n_{tasks[-1][0]}"
+            ))
+        return navigation
+
+    def _render_task_view(self, view: Dict) -> Tuple[str, InlineKeyboardMarkup]:
+        """בניית הטקסט והמקלדת של עמוד משימות מתוך מצב התצוגה"""
+        tasks = view['tasks']
+        if view['scope'] == 'cat':
+            message = f"📂 **משימות בקטגוריה: {view['category']}**\n\n"
+        else:
+            message = "📋 **כל המשימות הפתוחות שלך:**\n\n"
         keyboard = []
+        current_category = None
+        # מצב בחירה: המשימות המסומנות הן ביטים לפי המיקום בעמוד
+        selecting = view.get('selecting', False)
+        selected = view.get('selected', 0)
+        toggles = []
         
-        for task_id, content, _, created_at in tasks:
+        for index, (task_id, content, category, created_at) in enumerate(tasks):
+            if view['scope'] == 'all' and category != current_category:
+                if current_category is not None:
+                    message += "\n"
+                
+                emoji = view['emojis'].get(category, '📂')
+                message += f"**{emoji} {category}:**\n"
+                current_category = category
+            
+            if selecting:
+                mark = '☑️' if selected >> index & 1 else '⬜'
+                message += f"{index + 1}. {mark} {content}\n"
+                toggles.append(InlineKeyboardButton(f"{mark} {index + 1}", callback_data=f"sel_toggle_{task_id}"))
+                continue
+            
             message += f"• {content}\n"
             keyboard.append([
-                InlineKeyboardButton("✅ בוצע", callback_data=f"task_done_{task_id}"),
-                InlineKeyboardButton("🗑 מחק", callback_data=f"task_delete_{task_id}")
+                InlineKeyboardButton("✅ בוצע", callback_data=f"task_done_{view['scope']}_{task_id}"),
+                InlineKeyboardButton("🗑 מחק", callback_data=f"task_delete_{view['scope']}_{task_id}")
             ])
         
-        keyboard.append([InlineKeyboardButton("🔙 חזור לקטגוריות", callback_data="back_to_categories")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        if selecting:
+            keyboard.extend(toggles[start:start + 4] for start in range(0, len(toggles), 4))
+            count = bin(selected).count('1')
+            keyboard.append([
+                InlineKeyboardButton(f"✅ בצע נבחרות ({count})", callback_data="sel_done"),
+                InlineKeyboardButton(f"🗑 מחק נבחרות ({count})", callback_data="sel_delete")
+            ])
+            keyboard.append([InlineKeyboardButton("✖️ ביטול בחירה", callback_data="sel_cancel")])
+        else:
+            navigation = self._page_navigation(view['scope'], tasks, view['has_prev'], view['has_next'])
+            if navigation:
+                keyboard.append(navigation)
+            keyboard.append([InlineKeyboardButton("☑️ בחירה מרובה", callback_data="sel_start")])
+        if view['scope'] == 'cat':
+            keyboard.append([InlineKeyboardButton("🔙 חזור לקטגוריות", callback_data="back_to_categories")])
+        
+        return message, InlineKeyboardMarkup(keyboard)
+
+    @staticmethod
+    def _task_view_key(query):
+        """מפתח מצב התצוגה - ההודעה שעליה נלחץ הכפתור"""
+        if query.message:
+            return query.message.chat_id, query.message.message_id
+        return query.inline_message_id
+
+    async def _edit_task_view(self, query, view: Dict):
+        """עריכת הודעת הרשימה - רק אם התוכן השתנה"""
+        message, reply_markup = self._render_task_view(view)
+        key = self._task_view_key(query)
+        previous = self.task_views.get(key)
+        self.task_views.set(key, dict(view, message=message, reply_markup=reply_markup))
+        
+        if previous and previous['message'] == message and previous['reply_markup'] == reply_markup:
+            return
         
-        await query.edit_message_text(message, reply_markup=reply_markup)
+        try:
+            await query.edit_message_text(message, reply_markup=reply_markup)
+        except BadRequest as e:
+            if 'not modified' not in str(e).lower():
+                raise
 
-    async def show_all_tasks(self, query, user_id: int):
-        """הצגת כל המשימות"""
-        tasks = self.get_tasks(user_id)
+    async def _show_task_page(self, query, user_id: int, scope: str, category: Optional[str],
+                              anchor_id: Optional[int], backward: bool):
+        """שליפת עמוד משימות והצגתו"""
+        tasks, has_prev, has_next = await self.db.read(
+            self.get_tasks_page, user_id, category, anchor_id, backward
+        )
         
         if not tasks:
-            await query.edit_message_text(
-                "🎉 **מעולה!**\n\n"
-                "אין לך משימות פתוחות כרגע.\n"
-                "השתמש ב-/add כדי להוסיף משימה חדשה! 📝"
+            self.task_views.invalidate(self._task_view_key(query))
+            if scope == 'cat':
+                await query.edit_message_text(
+                    f"📂 **קטגוריה: {category}**\n\n"
+                    "אין משימות פתוחות בקטגוריה זו.\n"
+                    "השתמש ב-/add כדי להוסיף משימה חדשה! 📝"
+                )
+            else:
+                await query.edit_message_text(
+                    "🎉 **מעולה!**\n\n"
+                    "אין לך משימות פתוחות כרגע.\n"
+                    "השתמש ב-/add כדי להוסיף משימה חדשה! 📝"
+                )
+            return
+        
+        emojis = await self.db.read(self.get_category_emojis, user_id) if scope == 'all' else {}
+        view = {
+            'scope': scope,
+            'category': category,
+            'anchor_id': anchor_id,
+            'backward': backward,
+            'tasks': tasks,
+            'has_prev': has_prev,
+            'has_next': has_next,
+            'emojis': emojis,
+        }
+        await self._edit_task_view(query, view)
+
+    async def show_category_tasks(self, query, user_id: int, category: str,
+                                  anchor_id: int = None, backward: bool = False):
+        """הצגת משימות של קטגוריה מסוימת"""
+        await self._show_task_page(query, user_id, 'cat', category, anchor_id, backward)
+
+    async def show_all_tasks(self, query, user_id: int, anchor_id: int = None, backward: bool = False):
+        """הצגת כל המשימות"""
+        await self._show_task_page(query, user_id, 'all', None, anchor_id, backward)
+
+    async def refresh_task_view(self, query, user_id: int, task_id: int, category: Optional[str] = None):
+        """הסרת משימה מהעמוד המוצג, בלי לשלוף את כל הרשימה מחדש"""
+        view = self.task_views.get(self._task_view_key(query))
+        if view is None:
+            # אין מצב שמור להודעה (למשל אחרי הפעלה מחדש) - העמוד הראשון של אותו תחום
+            if category is not None:
+                await self.show_category_tasks(query, user_id, category)
+            else:
+                await self.show_all_tasks(query, user_id)
+            return
+        await self._remove_from_view(query, user_id, view, {task_id})
+
+    async def _fallback_category(self, query, user_id: int, task_id: int, scope: str) -> Optional[str]:
+        """הקטגוריה לרענון כשאין מצב שמור להודעה של עמוד קטגוריה - נקראת לפני שהמשימה משתנה"""
+        if scope != 'cat' or self.task_views.get(self._task_view_key(query)) is not None:
+            return None
+        task = await self.db.read(self.get_task, task_id, user_id)
+        return task[2] if task else None
+
+    async def _remove_from_view(self, query, user_id: int, view: Dict, task_ids: set):
+        """עריכה אחת של ההודעה אחרי שמשימות נסגרו - יציאה ממצב בחירה"""
+        remaining = [task for task in view['tasks'] if task[0] not in task_ids]
+        if remaining:
+            await self._edit_task_view(query, dict(view, tasks=remaining, selecting=False, selected=0))
+        else:
+            # העמוד התרוקן - שליפה מחדש מאותו סמן
+            await self._show_task_page(
+                query, user_id, view['scope'], view['category'], view['anchor_id'], view['backward']
             )
+
+    async def handle_selection(self, query, user_id: int, data: str):
+        """מצב בחירה מרובה בעמוד המשימות - המצב נשמר במצב התצוגה של ההודעה"""
+        view = self.task_views.get(self._task_view_key(query))
+        if view is None:
+            if data in ('sel_done', 'sel_delete'):
+                await query.answer("⌛ הבחירה פגה, נסה שוב")
+            await self.show_all_tasks(query, user_id)
             return
         
-        message = "📋 **כל המשימות הפתוחות שלך:**\n\n"
-        keyboard = []
-        current_category = None
+        if data == 'sel_start':
+            view = dict(view, selecting=True, selected=0)
+        elif data == 'sel_cancel':
+            view = dict(view, selecting=False, selected=0)
+        elif data.startswith('sel_toggle_'):
+            task_id = int(data.replace('sel_toggle_', ''))
+            index = next((i for i, task in enumerate(view['tasks']) if task[0] == task_id), None)
+            if index is None:
+                return
+            view = dict(view, selected=view.get('selected', 0) ^ (1 << index))
+        elif data in ('sel_done', 'sel_delete'):
+            await self.apply_selection(query, user_id, view, delete=data == 'sel_delete')
+            return
         
-        for task_id, content, category, created_at in tasks:
-            if category != current_category:
-                if current_category is not None:
-                    message += "\n"
-                
-                # מציאת האימוג'י של הקטגוריה
-                categories = self.get_user_categories(user_id)
-                emoji = '📂'
-                for cat_name, cat_emoji in categories:
-                    if cat_name == category:
-                        emoji = cat_emoji
-                        break
-                
-                message += f"**{emoji} {category}:**\n"
-                current_category = category
-            
-            message += f"• {content}\n"
-            keyboard.append([
-                InlineKeyboardButton("✅ בוצע", callback_data=f"task_done_{task_id}"),
-                InlineKeyboardButton("🗑 מחק", callback_data=f"task_delete_{task_id}")
-            ])
+        await self._edit_task_view(query, view)
+
+    async def apply_selection(self, query, user_id: int, view: Dict, delete: bool):
+        """סיום/מחיקה של כל המשימות המסומנות - פקודה אחת למסד ועריכה אחת של ההודעה"""
+        selected = view.get('selected', 0)
+        task_ids = [task[0] for index, task in enumerate(view['tasks']) if selected >> index & 1]
+        if not task_ids:
+            await query.answer("לא נבחרו משימות")
+            return
         
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(message, reply_markup=reply_markup)
+        if delete:
+            count = await self.db.write(self.delete_tasks, task_ids, user_id)
+            self.record_task_activity(user_id, 'task_deleted', count)
+            await query.answer(f"🗑 נמחקו {count} משימות")
+        else:
+            count = await self.db.write(self.update_tasks_status, task_ids, user_id, 'done')
+            self.record_task_activity(user_id, 'task_completed', count)
+            await query.answer(f"✅ {count} משימות סומנו כבוצעו")
+        
+        await self._remove_from_view(query, user_id, view, set(task_ids))
 
-    async def mark_task_done(self, query, user_id: int, task_id: int):
+    async def mark_task_done(self, query, user_id: int, task_id: int, scope: str = 'all'):
         """סימון משימה כבוצעה"""
-        success = self.update_task_status(task_id, user_id, 'done')
+        category = await self._fallback_category(query, user_id, task_id, scope)
+        success = await self.db.write(self.update_task_status, task_id, user_id, 'done')
         
         if success:
+            self.record_task_activity(user_id, 'task_completed', 1)
             await query.answer("✅ המשימה סומנה כבוצעה!")
             # רענון התצוגה
-            await self.show_all_tasks(query, user_id)
+            await self.refresh_task_view(query, user_id, task_id, category)
         else:
             await query.answer("❌ שגיאה בעדכון המשימה")
 
-    async def delete_task_callback(self, query, user_id: int, task_id: int):
+    async def delete_task_callback(self, query, user_id: int, task_id: int, scope: str = 'all'):
         """מחיקת משימה"""
-        success = self.delete_task(task_id, user_id)
+        category = await self._fallback_category(query, user_id, task_id, scope)
+        success = await self.db.write(self.delete_task, task_id, user_id)
         
         if success:
+            self.record_task_activity(user_id, 'task_deleted', 1)
             await query.answer("🗑 המשימה נמחקה!")
             # רענון התצוגה
-            await self.show_all_tasks(query, user_id)
+            await self.refresh_task_view(query, user_id, task_id, category)
         else:
             await query.answer("❌ שגיאה במחיקת המשימה")
 
@@ -465,21 +971,17 @@ class TodoBot:
             )
             return
         
-        state = self.user_states[user_id]
+        state = self.user_states.get(user_id)
         
         if state == 'waiting_task_content':
+            lines = [line for line in text.splitlines() if line.strip()]
+            if len(lines) > 1:
+                await self.add_task_lines(update, user_id, lines)
+                return
+            
             # שמירת תוכן המשימה והמעבר לבחירת קטגוריה
             self.pending_tasks[user_id] = {'content': text}
-            categories = self.get_user_categories(user_id)
-            
-            keyboard = []
-            for category, emoji in categories:
-                keyboard.append([InlineKeyboardButton(
-                    f"{emoji} {category}", 
-                    callback_data=f"select_category_{category}"
-                )])
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = await self._category_keyboard(user_id)
             self.user_states[user_id] = 'waiting_category_selection'
             
             await update.message.reply_text(
@@ -491,8 +993,8 @@ class TodoBot:
             
         elif state == 'waiting_category_name':
             # הוספת קטגוריה חדשה
-            if self.add_category(user_id, text):
-                del self.user_states[user_id]
+            if await self.db.write(self.add_category, user_id, text):
+                self.user_states.pop(user_id, None)
                 await update.message.reply_text(
                     f"✅ **הקטגוריה '{text}' נוספה בהצלחה!**\n\n"
                     "עכשיו תוכל להשתמש בה בעת הוספת משימות חדשות.",
@@ -504,6 +1006,49 @@ class TodoBot:
                     "אנא בחר שם אחר."
                 )
 
+    async def _category_keyboard(self, user_id: int) -> InlineKeyboardMarkup:
+        """כפתורי בחירת קטגוריה למשימה חדשה"""
+        categories = await self.db.read(self.get_category_emojis, user_id)
+        return InlineKeyboardMarkup([
+            [InlineKeyboardButton(f"{emoji} {category}", callback_data=f"select_category_{category}")]
+            for category, emoji in categories.items()
+        ])
+
+    async def add_task_lines(self, update: Update, user_id: int, lines: List[str]):
+        """הוספה מרובה - כל שורה היא משימה, עם #תגית ו-@קטגוריה אופציונליים"""
+        tasks = [list(parse_task_line(line)) for line in lines]
+        tasks = [task for task in tasks if task[0]]
+        if not tasks:
+            await update.message.reply_text(config.Messages.ERROR_INVALID_INPUT, parse_mode='Markdown')
+            return
+        
+        missing = sum(1 for _, category, _ in tasks if category is None)
+        if not missing:
+            self.pending_tasks.pop(user_id, None)
+            self.user_states.pop(user_id, None)
+            await self._save_task_lines(update.message.reply_text, user_id, tasks)
+            return
+        
+        # קטגוריה אחת לכל השורות שאין בהן @קטגוריה
+        self.pending_tasks[user_id] = {'tasks': tasks}
+        self.user_states[user_id] = 'waiting_category_selection'
+        await update.message.reply_text(
+            f"📝 {len(tasks)} משימות\n\n"
+            f"📂 בחר קטגוריה ל-{missing} המשימות שאין בהן @קטגוריה:",
+            reply_markup=await self._category_keyboard(user_id)
+        )
+
+    async def _save_task_lines(self, reply, user_id: int, tasks: List[list]):
+        """שמירת כל המשימות בטרנזקציה אחת וסיכום לפי קטגוריה"""
+        task_ids = await self.db.write(self.add_tasks, user_id, [tuple(task) for task in tasks])
+        self.record_task_activity(user_id, 'task_created', len(task_ids))
+        
+        counts: Dict[str, int] = {}
+        for _, category, _ in tasks:
+            counts[category] = counts.get(category, 0) + 1
+        summary = "\n".join(f"📂 {category}: {count}" for category, count in counts.items())
+        await reply(f"✅ נוספו {len(task_ids)} משימות!\n\n{summary}")
+
     async def handle_category_selection(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """טיפול בבחירת קטגוריה למשימה חדשה"""
         query = update.callback_query
@@ -514,13 +1059,20 @@ class TodoBot:
         if query.data.startswith('select_category_'):
             category = query.data.replace('select_category_', '')
             
-            if user_id in self.pending_tasks:
-                content = self.pending_tasks[user_id]['content']
-                task_id = self.add_task(user_id, content, category)
+            pending = self.pending_tasks.get(user_id)
+            if pending and 'tasks' in pending:
+                tasks = [[content, task_category or category, tags] for content, task_category, tags in pending['tasks']]
+                self.pending_tasks.pop(user_id, None)
+                self.user_states.pop(user_id, None)
+                await self._save_task_lines(query.edit_message_text, user_id, tasks)
+            elif pending:
+                content = pending['content']
+                task_id = await self.db.write(self.add_task, user_id, content, category, extract_tags(content))
+                self.record_task_activity(user_id, 'task_created', 1)
                 
                 # ניקוי זמני
-                del self.pending_tasks[user_id]
-                del self.user_states[user_id]
+                self.pending_tasks.pop(user_id, None)
+                self.user_states.pop(user_id, None)
                 
                 await query.edit_message_text(
                     f"✅ **המשימה נוספה בהצלחה!**\n\n"
@@ -530,41 +1082,283 @@ class TodoBot:
                     parse_mode='Markdown'
                 )
 
-    async def daily_reminder(self, context: ContextTypes.DEFAULT_TYPE):
-        """תזכורת יומית - רק לדוגמה, צריך להגדיר את ה-user_id"""
-        # כאן תצטרך להוסיף לוגיקה לשליחה לכל המשתמשים הרשומים
-        # לעת עתה זה רק דוגמה למשתמש אחד
-        user_id = 123456789  # החלף למזהה המשתמש שלך
+    def format_daily_reminder(self, summary: List[tuple]) -> str:
+        """הודעת התזכורת היומית מתוך (קטגוריה, אימוג'י, מספר משימות)"""
+        message = "🌅 **בוקר טוב!**\n\n"
+        message += "📊 **סיכום המשימות הפתוחות שלך:**\n\n"
         
-        summary = self.get_task_summary(user_id)
+        total_tasks = 0
+        for category, emoji, count in summary:
+            message += f"{emoji} {category}: {count} משימות\n"
+            total_tasks += count
         
-        if summary:
-            message = "🌅 **בוקר טוב!**\n\n"
-            message += "📊 **סיכום המשימות הפתוחות שלך:**\n\n"
-            
-            total_tasks = 0
-            for category, count in summary.items():
-                categories = self.get_user_categories(user_id)
-                emoji = '📂'
-                for cat_name, cat_emoji in categories:
-                    if cat_name == category:
-                        emoji = cat_emoji
-                        break
-                
-                message += f"{emoji} {category}: {count} משימות\n"
-                total_tasks += count
-            
-            message += f"\n💪 **בואו נתקדם היום! סך הכל {total_tasks} משימות מחכות לך.**"
-            
-            await context.bot.send_message(chat_id=user_id, text=message, parse_mode='Markdown')
+        message += f"\n💪 **בואו נתקדם היום! סך הכל {total_tasks} משימות מחכות לך.**"
+        return message
+
+    async def _get_sender(self, bot) -> RateLimitedSender:
+        """תור השליחה המשותף לכל ההודעות היזומות"""
+        if self.sender is None:
+            self.sender = RateLimitedSender(bot)
+            await self.sender.start()
+        return self.sender
+
+    async def _post_shutdown(self, application: Application):
+        """עצירת תור השליחה בסגירת הבוט"""
+        if self.sender is not None:
+            await self.sender.stop()
+            self.sender = None
+
+    async def _send_reminder_rows(self, sender: RateLimitedSender, rows: List[tuple]):
+        """קיבוץ שורות (משתמש, קטגוריה, אימוג'י, מספר) להודעה אחת לכל משתמש"""
+        for user_id, user_rows in groupby(rows, key=itemgetter(0)):
+            summary = [(category, emoji, count) for _, category, emoji, count in user_rows]
+            await sender.send(user_id, self.format_daily_reminder(summary), parse_mode='Markdown')
+
+    async def send_reminders(self, bot, user_ids: List[int], include_default: bool):
+        """שליחת תזכורות למשתמשים שהגיע זמנם"""
+        sender = await self._get_sender(bot)
+        batch_size = config.Advanced.REMINDER_BATCH_USERS
+        
+        for start in range(0, len(user_ids), batch_size):
+            rows = await self.db.read(self.get_reminder_counts, user_ids[start:start + batch_size])
+            await self._send_reminder_rows(sender, rows)
+        
+        if include_default:
+            # משתמשים שלא הגדירו העדפות מקבלים תזכורת בשעת ברירת המחדל
+            after_user_id = 0
+            while True:
+                # כל שאילתה מחזירה את הספירות של קבוצת משתמשים שלמה
+                rows = await self.db.read(self.get_reminder_batch, after_user_id, batch_size)
+                if not rows:
+                    break
+                await self._send_reminder_rows(sender, rows)
+                after_user_id = rows[-1][0]
+        
+        logger.info(f"Reminders queued ({len(user_ids)} scheduled users, default={include_default}): {sender.stats()}")
+
+    async def reminder_tick(self, context: ContextTypes.DEFAULT_TYPE):
+        """מופעל פעם בדקה - שולח תזכורות רק לדלי של הדקה הנוכחית"""
+        user_ids, include_default = self.reminder_scheduler.due(datetime.now(pytz.utc))
+        if user_ids or include_default:
+            # השליחה נמשכת ברקע כדי שהדקה הבאה לא תחכה לה
+            context.application.create_task(self.send_reminders(context.bot, user_ids, include_default))
+
+    async def database_backup_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """גיבוי תקופתי של מסד הנתונים ומחיקת גיבויים ישנים"""
+        advanced = config.Advanced
+        try:
+            path = await asyncio.to_thread(
+                create_snapshot, self.db_name, advanced.BACKUP_DIR,
+                advanced.BACKUP_PAGES_PER_STEP, advanced.BACKUP_STEP_SLEEP, advanced.DATABASE_TIMEOUT
+            )
+            removed = await asyncio.to_thread(
+                prune_snapshots, self.db_name, advanced.BACKUP_DIR, advanced.BACKUP_KEEP_DAYS
+            )
+            logger.info(f"Database backup saved to {path} ({len(removed)} old backups removed)")
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Database backup failed: {e}")
+
+    async def reminder_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """הגדרת שעת התזכורת היומית"""
+        user_id = update.effective_user.id
+        args = context.args or []
+        
+        if not args:
+            await update.message.reply_text(
+                "⏰ **תזכורת יומית**\n\n"
+                "שימוש: `/reminder 08:30 [אזור זמן]`\n"
+                "דוגמה: `/reminder 07:45 Europe/London`\n"
+                "כיבוי/הפעלה: `/reminder off` או `/reminder on`",
+                parse_mode='Markdown'
+            )
+            return
+        
+        reminder_time = timezone = None
+        enabled = args[0].lower() != 'off'
+        if args[0].lower() not in ('on', 'off'):
+            try:
+                reminder_time = parse_reminder_time(args[0]).strftime('%H:%M')
+                timezone = pytz.timezone(args[1]).zone if len(args) > 1 else None
+            except ValueError:
+                await update.message.reply_text("❌ שעה לא תקינה. השתמש בפורמט HH:MM, למשל 08:30")
+                return
+            except pytz.UnknownTimeZoneError:
+                await update.message.reply_text(f"❌ אזור זמן לא מוכר: {args[1]}")
+                return
+        
+        reminder_time, timezone, enabled = await self.db.write(
+            self.set_reminder_preferences, user_id, reminder_time, timezone, enabled
+        )
+        self.reminder_scheduler.set_user(user_id, reminder_time, timezone, bool(enabled))
+        
+        if enabled:
+            await update.message.reply_text(f"✅ התזכורת היומית תישלח בשעה {reminder_time} ({timezone})")
+        else:
+            await update.message.reply_text("🔕 התזכורת היומית כובתה")
+
+    @staticmethod
+    def _format_due_line(row: tuple, tz, now: datetime) -> str:
+        """שורת משימה ב-/next ו-/today: עדיפות, תוכן, מועד (בשעון המשתמש) ומזהה"""
+        task_id, content, category, due_at, priority = row
+        line = f"• {PRIORITY_MARKS.get(priority, '')}{content}"
+        if due_at:
+            due = from_db_time(due_at)
+            line += f" — {'⚠️' if due < now else '📅'} {due.astimezone(tz).strftime('%d/%m %H:%M')}"
+        return line + f" (#{task_id})"
+
+    async def next_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """המשימות הבאות לפי מועד יעד ועדיפות"""
+        user_id = update.effective_user.id
+        rows = await self.db.read(self.get_next_tasks, user_id, config.Advanced.NEXT_TASKS_LIMIT)
+        if not rows:
+            await update.message.reply_text("🎉 אין משימות פתוחות!")
+            return
+        
+        tz = pytz.timezone(await self.db.read(self.get_user_timezone, user_id))
+        now = datetime.now(pytz.utc)
+        lines = [self._format_due_line(row, tz, now) for row in rows]
+        await update.message.reply_text("⏭ המשימות הבאות שלך:\n\n" + "\n".join(lines))
+
+    async def today_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """משימות שמועדן היום, כולל משימות באיחור"""
+        user_id = update.effective_user.id
+        tz = pytz.timezone(await self.db.read(self.get_user_timezone, user_id))
+        now = datetime.now(pytz.utc)
+        # סוף היום בשעון המשתמש
+        tomorrow = now.astimezone(tz).date() + timedelta(days=1)
+        end_of_day = to_db_time(tz.localize(datetime.combine(tomorrow, datetime.min.time())))
+        
+        rows = await self.db.read(self.get_tasks_due_before, user_id, end_of_day)
+        if not rows:
+            await update.message.reply_text("☀️ אין משימות עם מועד להיום.\nלקביעת מועד: /due")
+            return
+        
+        lines = [self._format_due_line(row, tz, now) for row in rows]
+        await update.message.reply_text("📅 המשימות להיום:\n\n" + "\n".join(lines))
+
+    async def due_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """קביעת מועד יעד למשימה"""
+        user_id = update.effective_user.id
+        args = context.args or []
+        
+        if len(args) < 2 or not args[0].lstrip('#').isdigit():
+            await update.message.reply_text(
+                "📅 **מועד יעד**\n\n"
+                "שימוש: `/due <מזהה> <תאריך> [שעה]`\n"
+                "דוגמאות: `/due 12 25/12 14:00`, `/due 12 מחר`\n"
+                "ביטול: `/due 12 -`",
+                parse_mode='Markdown'
+            )
+            return
+        
+        task_id = int(args[0].lstrip('#'))
+        due_at = None
+        if args[1] != '-':
+            timezone = await self.db.read(self.get_user_timezone, user_id)
+            now = datetime.now(pytz.utc)
+            try:
+                due = parse_due_date(args[1:], timezone, config.Advanced.DUE_DEFAULT_TIME, now)
+            except ValueError:
+                await update.message.reply_text("❌ מועד לא תקין. לדוגמה: 25/12 14:00 או מחר")
+                return
+            if due <= now:
+                await update.message.reply_text("❌ המועד כבר עבר")
+                return
+            due_at = to_db_time(due)
+        
+        if not await self.db.write(self.set_task_due, task_id, user_id, due_at):
+            await update.message.reply_text(config.Messages.ERROR_TASK_NOT_FOUND, parse_mode='Markdown')
+            return
+        
+        if due_at is None:
+            await update.message.reply_text(f"🗓 המועד של משימה #{task_id} בוטל")
+            return
+        self.deadline_scheduler.push(task_id, due_at)
+        await update.message.reply_text(f"✅ מועד היעד של משימה #{task_id}: {' '.join(args[1:])}")
+
+    async def priority_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """קביעת עדיפות למשימה"""
+        user_id = update.effective_user.id
+        args = context.args or []
+        priority = PRIORITY_NAMES.get(args[1].lower()) if len(args) == 2 else None
+        
+        if priority is None or not args[0].lstrip('#').isdigit():
+            await update.message.reply_text(
+                "🔴 **עדיפות**\n\n"
+                "שימוש: `/priority <מזהה> <גבוהה|רגילה|נמוכה>` (או 1-3)",
+                parse_mode='Markdown'
+            )
+            return
+        
+        task_id = int(args[0].lstrip('#'))
+        if await self.db.write(self.set_task_priority, task_id, user_id, priority):
+            await update.message.reply_text(f"✅ העדיפות של משימה #{task_id} עודכנה: {args[1]}")
+        else:
+            await update.message.reply_text(config.Messages.ERROR_TASK_NOT_FOUND, parse_mode='Markdown')
+
+    async def due_soon_tick(self, context: ContextTypes.DEFAULT_TYPE):
+        """מופעל פעם בדקה - התראה על משימות שמועדן מתקרב, מתוך ערימת המועדים"""
+        scheduler = self.deadline_scheduler
+        now = datetime.now(pytz.utc)
+        window = scheduler.next_window(now)
+        if window is not None:
+            after, until = window
+            scheduler.load(await self.db.read(self.get_pending_deadlines, after, until), until)
+        
+        task_ids, limit = scheduler.due(now)
+        if not task_ids:
+            return
+        rows = await self.db.write(self.claim_due_notifications, task_ids, limit)
+        if rows:
+            context.application.create_task(self.send_due_notifications(context.bot, rows, now))
+
+    async def send_due_notifications(self, bot, rows: List[tuple], now: datetime):
+        """הודעה אחת לכל משתמש עם כל המשימות שמועדן מתקרב"""
+        sender = await self._get_sender(bot)
+        for user_id, user_rows in groupby(rows, key=itemgetter(0)):
+            lines = []
+            for _, task_id, content, due_at in user_rows:
+                minutes = int((from_db_time(due_at) - now).total_seconds() // 60)
+                when = f"בעוד {minutes} דקות" if minutes > 0 else "המועד עבר"
+                lines.append(f"• {content} (#{task_id}) — {when}")
+            await sender.send(user_id, "⏰ מועד יעד מתקרב:\n\n" + "\n".join(lines))
+
+    async def rate_limit_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """רץ לפני כל ה-handlers - עוצר עדכונים של משתמש שחרג מהקצב"""
+        user = update.effective_user
+        if user is None or user.id in config.Advanced.ADMIN_USER_IDS or self.rate_limiter.allow(user.id):
+            return
+        
+        if self.rate_limiter.should_warn(user.id):
+            warning = "⏳ יותר מדי בקשות. אנא המתן מספר שניות ונסה שוב."
+            if update.callback_query:
+                await update.callback_query.answer(warning)
+            elif update.effective_message:
+                await update.effective_message.reply_text(warning)
+        elif update.callback_query:
+            # בלי תשובה הכפתור נשאר "בטעינה" אצל המשתמש
+            await update.callback_query.answer()
+        
+        raise ApplicationHandlerStop
 
     def setup_handlers(self):
         """הגדרת הטיפול בפקודות"""
+        # הגבלת קצב - קבוצה -1 רצה לפני כל שאר ה-handlers
+        self.application.add_handler(TypeHandler(Update, self.rate_limit_update), group=-1)
+        self.application.add_error_handler(self.error_handler)
+        
         self.application.add_handler(CommandHandler("start", self.start_command))
         self.application.add_handler(CommandHandler("add", self.add_command))
         self.application.add_handler(CommandHandler("list", self.list_command))
         self.application.add_handler(CommandHandler("categories", self.categories_command))
         self.application.add_handler(CommandHandler("summary", self.summary_command))
+        self.application.add_handler(CommandHandler("reminder", self.reminder_command))
+        if config.Advanced.ENABLE_DUE_DATES:
+            self.application.add_handler(CommandHandler("next", self.next_command))
+            self.application.add_handler(CommandHandler("today", self.today_command))
+            self.application.add_handler(CommandHandler("due", self.due_command))
+        if config.Advanced.ENABLE_TASK_PRIORITIES:
+            self.application.add_handler(CommandHandler("priority", self.priority_command))
         
         self.application.add_handler(CallbackQueryHandler(
             self.handle_category_selection, 
@@ -577,16 +1371,29 @@ class TodoBot:
             self.handle_message
         ))
         
-        # הגדרת תזכורת יומית לשעה 9:00 (עם בדיקה שה-JobQueue קיים)
+        # תזכורות יומיות לפי שעת כל משתמש - job אחד שרץ כל דקה (עם בדיקה שה-JobQueue קיים)
         job_queue = getattr(self.application, 'job_queue', None)
         if job_queue is None:
             logger.warning("No JobQueue available. Install PTB with job-queue extra or check application setup.")
         else:
-            job_queue.run_daily(
-                self.daily_reminder,
-                time=time(hour=9, minute=0, tzinfo=TIMEZONE),
-                name='daily_reminder'
+            self.reminder_scheduler.load(self.get_reminder_preferences(), datetime.now(pytz.utc).date())
+            job_queue.run_repeating(
+                self.reminder_tick,
+                interval=60,
+                first=60 - datetime.now().second,
+                name='reminder_tick'
             )
+            
+            if config.Advanced.ENABLE_DUE_DATES:
+                job_queue.run_repeating(self.due_soon_tick, interval=60, first=5, name='due_soon_tick')
+            
+            if config.Advanced.BACKUP_ENABLED and self.db_name != ':memory:':
+                job_queue.run_repeating(
+                    self.database_backup_job,
+                    interval=config.Advanced.BACKUP_INTERVAL_HOURS * 3600,
+                    first=60,
+                    name='database_backup'
+                )
 
     def run(self):
         """הרצת הבוט"""
@@ -596,7 +1403,10 @@ class TodoBot:
         print("🤖 הבוט מתחיל לפעול...")
         print("📱 לחץ Ctrl+C כדי לעצור")
         
-        self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+        try:
+            self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+        finally:
+            self.db.close()
 
     def run_webhook(self, port: int, url_path: str, webhook_url: Optional[str] = None):
         """הרצת הבוט במצב Webhook עם שרת מובנה המאזין ל-$PORT"""
@@ -605,23 +1415,41 @@ class TodoBot:
 
         print("🤖 הבוט מתחיל לפעול במצב Webhook...")
         print(f"🌐 Webhook URL: {webhook_url or '(לא הוגדר - יש להגדיר כדי לקבל עדכונים)'}")
-        print(f"🛰 מאזין על 0.0.0.0:{port} | path=/{url_path}")
-        
-        # הוספת נתיב בריאות בסיסי כדי ש-Render יזהה שהשירות חי
-        async def _health(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            if update.message:
-                await update.message.reply_text("ok")
-        
-        # PTB v20 אינו מספק ראוטר גנרי ל-GET, אך health דרך BOT אינה הכרחית אם יש Webhook.
-        # לכן נשתמש ב-url_path עבור Telegram, ומספקים health דרך אחזור webhookInfo בעת הצורך.
-        
-        self.application.run_webhook(
-            listen="0.0.0.0",
-            port=port,
-            url_path=url_path,
-            webhook_url=webhook_url,
-            allowed_updates=Update.ALL_TYPES
-        )
+        print(f"🛰 מאזין על 0.0.0.0:{port} | path=/{url_path} | /healthz | /metrics")
+        
+        try:
+            asyncio.run(self._serve_webhook(port, url_path, webhook_url))
+        finally:
+            self.db.close()
+
+    async def _serve_webhook(self, port: int, url_path: str, webhook_url: Optional[str]):
+        """השרת של PTB מקבל רק את נתיב ה-Webhook, לכן מפעילים את האפליקציה עם שרת משלנו"""
+        from tornado.httpserver import HTTPServer
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass  # Windows - Ctrl+C יגיע כ-KeyboardInterrupt
+
+        application = self.application
+        await application.initialize()
+        server = HTTPServer(WebApp(application, url_path, self.metrics))
+        try:
+            if webhook_url:
+                await application.bot.set_webhook(webhook_url, allowed_updates=Update.ALL_TYPES)
+            await application.start()
+            server.listen(port, address='0.0.0.0')
+            await stop.wait()
+        finally:
+            server.stop()
+            await server.close_all_connections()
+            if application.running:
+                await application.stop()
+            await application.shutdown()
+            await self._post_shutdown(application)
 
 def main():
     """פונקציה ראשית"""
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+מיגרציות למסד הנתונים - גרסת הסכמה נשמרת ב-PRAGMA user_version
+"""
+
+import logging
+import sqlite3
+import textwrap
+
+logger = logging.getLogger(__name__)
+
+
+def _initial_schema(cursor):
+    """הסכמה הבסיסית - כל הטבלאות של הבוט והתכונות המתקדמות"""
+    # טבלת משימות
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            status TEXT DEFAULT 'open',
+            category TEXT DEFAULT 'כללי',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # טבלת קטגוריות
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            emoji TEXT DEFAULT '📂',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, name)
+        )
+    ''')
+
+    # הוספת קטגוריות ברירת מחדל
+    default_categories = [
+        ('עבודה', '💼'),
+        ('לימודים', '📚'),
+        ('אישי', '🏠'),
+        ('כללי', '➕')
+    ]
+
+    cursor.executemany('''
+        INSERT OR IGNORE INTO categories (user_id, name, emoji)
+        VALUES (0, ?, ?)
+    ''', default_categories)
+
+    # טבלת סטטיסטיקות יומיות
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            tasks_created INTEGER DEFAULT 0,
+            tasks_completed INTEGER DEFAULT 0,
+            tasks_deleted INTEGER DEFAULT 0,
+            productivity_score REAL DEFAULT 0.0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, date)
+        )
+    ''')
+
+    # טבלת הגדרות משתמש
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_preferences (
+            user_id INTEGER PRIMARY KEY,
+            reminder_time TEXT DEFAULT '09:00',
+            timezone TEXT DEFAULT 'Asia/Jerusalem',
+            notifications_enabled BOOLEAN DEFAULT TRUE,
+            preferred_language TEXT DEFAULT 'he',
+            theme_color TEXT DEFAULT 'blue',
+            daily_goal INTEGER DEFAULT 3,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # טבלת תגיות למשימות
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_tags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            tag_name TEXT NOT NULL,
+            FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE,
+            UNIQUE(task_id, tag_name)
+        )
+    ''')
+
+    # טבלת משימות חוזרות
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recurring_tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            category TEXT DEFAULT 'כללי',
+            frequency TEXT NOT NULL, -- daily, weekly, monthly
+            next_due_date TEXT NOT NULL,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _hot_query_indexes(cursor):
+    """אינדקסים לשאילתות החמות"""
+    # רשימות משימות, ספירה לפי קטגוריה וסטטיסטיקות - לפי סדר ה-ORDER BY של get_tasks
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_user_status_category_created
+        ON tasks (user_id, status, category, created_at DESC)
+    ''')
+
+    # אינדקס מכסה לגרפים ולסטטיסטיקות - ללא גישה לטבלה עצמה
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_daily_stats_user_date
+        ON daily_stats (user_id, date, tasks_created, tasks_completed, tasks_deleted, productivity_score)
+    ''')
+
+    # חיפוש משימות לפי תגית
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_task_tags_tag
+        ON task_tags (tag_name, task_id)
+    ''')
+
+
+def _keyset_pagination_index(cursor):
+    """אינדקס עם id כשובר שוויון - כל עמוד הוא חיפוש באינדקס ללא מיון"""
+    cursor.execute('DROP INDEX IF EXISTS idx_tasks_user_status_category_created')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_user_status_category_created_id
+        ON tasks (user_id, status, category, created_at DESC, id DESC)
+    ''')
+
+
+def _open_tasks_by_user_index(cursor):
+    """אינדקס חלקי למשימות פתוחות - מעבר על כל המשתמשים לתזכורות"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_open_user_category
+        ON tasks (user_id, category)
+        WHERE status = 'open'
+    ''')
+
+
+def _task_search_index(cursor):
+    """אינדקס FTS5 לחיפוש במשימות פתוחות - מסונכרן עם tasks ו-task_tags בטריגרים"""
+    # כל מילה נשמרת כ-'<user_id>_<מילה>' (ראו search_tokens) - חיפוש של משתמש
+    # קורא רק את המופעים שלו ולא את כל המשימות במסד שמכילות את אותה מילה
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE tasks_fts USING fts5(
+                content, category, tags,
+                tokenize = "unicode61 remove_diacritics 2 tokenchars '_'"
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        # SQLite ללא FTS5 - החיפוש ממשיך לעבוד עם LIKE
+        logger.warning(f"FTS5 not available, search will use LIKE: {e}")
+        return
+
+    tags_of = '''(SELECT group_concat(tag_name, ' ') FROM task_tags WHERE task_id = {task})'''
+
+    cursor.execute(f'''
+        INSERT INTO tasks_fts (rowid, content, category, tags)
+        SELECT t.id, search_tokens(t.user_id, t.content), search_tokens(t.user_id, t.category),
+               search_tokens(t.user_id, {tags_of.format(task='t.id')})
+        FROM tasks t
+        WHERE t.status = 'open'
+    ''')
+
+    # רק משימות פתוחות נמצאות באינדקס
+    cursor.execute('''
+        CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks
+        WHEN new.status = 'open'
+        BEGIN
+            INSERT INTO tasks_fts (rowid, content, category, tags)
+            VALUES (new.id, search_tokens(new.user_id, new.content),
+                    search_tokens(new.user_id, new.category), '');
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks
+        BEGIN
+            DELETE FROM tasks_fts WHERE rowid = old.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER tasks_fts_update AFTER UPDATE OF user_id, content, category, status ON tasks
+        BEGIN
+            DELETE FROM tasks_fts WHERE rowid = old.id;
+            INSERT INTO tasks_fts (rowid, content, category, tags)
+            SELECT new.id, search_tokens(new.user_id, new.content), search_tokens(new.user_id, new.category),
+                   search_tokens(new.user_id, {tags_of.format(task='new.id')})
+            WHERE new.status = 'open';
+        END
+    ''')
+    for event, row in (('INSERT', 'new'), ('DELETE', 'old')):
+        cursor.execute(f'''
+            CREATE TRIGGER task_tags_fts_{event.lower()} AFTER {event} ON task_tags
+            BEGIN
+                UPDATE tasks_fts
+                SET tags = search_tokens((SELECT user_id FROM tasks WHERE id = {row}.task_id),
+                                         {tags_of.format(task=row + '.task_id')})
+                WHERE rowid = {row}.task_id;
+            END
+        ''')
+
+
+def _conversation_state(cursor):
+    """מצב השיחה של המשתמשים - נשמר כדי לשרוד הפעלה מחדש"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_state (
+            store TEXT NOT NULL,
+            key INTEGER NOT NULL,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (store, key)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conversation_state_expires
+        ON conversation_state (expires_at)
+    ''')
+
+
+def _recurring_due_index(cursor):
+    """אינדקס לשליפת המשימות החוזרות שהגיע מועדן"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_recurring_tasks_active_due
+        ON recurring_tasks (is_active, next_due_date)
+    ''')
+
+
+def _due_dates_and_priorities(cursor):
+    """מועד יעד ועדיפות למשימות"""
+    # due_at ב-UTC בפורמט של CURRENT_TIMESTAMP; עדיפות 1 (גבוהה) עד 3 (נמוכה)
+    cursor.execute('ALTER TABLE tasks ADD COLUMN due_at TIMESTAMP')
+    cursor.execute('ALTER TABLE tasks ADD COLUMN priority INTEGER NOT NULL DEFAULT 2')
+    cursor.execute('ALTER TABLE tasks ADD COLUMN due_notified INTEGER NOT NULL DEFAULT 0')
+
+    # /next ו-/today - לפי מועד ואז עדיפות, ישירות מסדר האינדקס
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_open_user_due_priority
+        ON tasks (user_id, due_at, priority, id)
+        WHERE status = 'open'
+    ''')
+
+    # טעינת חלון ההתראות הבא - רק משימות פתוחות שעוד לא נשלחה עליהן התראה
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_due_pending
+        ON tasks (due_at)
+        WHERE status = 'open' AND due_notified = 0
+    ''')
+
+
+def _normalized_tags(cursor):
+    """מילון תגיות (tags) וקישורי (tag_id, task_id) במקום שם התגית בכל שורה"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO tags (name) SELECT DISTINCT tag_name FROM task_tags ORDER BY tag_name')
+
+    # המפתח (tag_id, task_id) משמש לסינון לפי תגית, והאינדקס ההפוך לתגיות של משימה ול-CASCADE
+    cursor.execute('''
+        CREATE TABLE task_tag_links (
+            tag_id INTEGER NOT NULL REFERENCES tags (id),
+            task_id INTEGER NOT NULL REFERENCES tasks (id) ON DELETE CASCADE,
+            PRIMARY KEY (tag_id, task_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO task_tag_links (tag_id, task_id)
+        SELECT g.id, tt.task_id
+        FROM task_tags tt
+        JOIN tags g ON g.name = tt.tag_name
+        JOIN tasks t ON t.id = tt.task_id
+    ''')
+
+    # הטריגרים של החיפוש מפנים לטבלה הישנה - נמחקים ונוצרים מחדש מול הטבלה החדשה
+    for trigger in ('tasks_fts_update', 'task_tags_fts_insert', 'task_tags_fts_delete'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    cursor.execute('DROP TABLE task_tags')
+    cursor.execute('ALTER TABLE task_tag_links RENAME TO task_tags')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_task_tags_task
+        ON task_tags (task_id, tag_id)
+    ''')
+
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'").fetchone() is None:
+        return
+
+    tags_of = '''(SELECT group_concat(g.name, ' ') FROM task_tags tt JOIN tags g ON g.id = tt.tag_id
+                  WHERE tt.task_id = {task})'''
+    cursor.execute(f'''
+        CREATE TRIGGER tasks_fts_update AFTER UPDATE OF user_id, content, category, status ON tasks
+        BEGIN
+            DELETE FROM tasks_fts WHERE rowid = old.id;
+            INSERT INTO tasks_fts (rowid, content, category, tags)
+            SELECT new.id, search_tokens(new.user_id, new.content), search_tokens(new.user_id, new.category),
+                   search_tokens(new.user_id, {tags_of.format(task='new.id')})
+            WHERE new.status = 'open';
+        END
+    ''')
+    for event, row in (('INSERT', 'new'), ('DELETE', 'old')):
+        cursor.execute(f'''
+            CREATE TRIGGER task_tags_fts_{event.lower()} AFTER {event} ON task_tags
+            BEGIN
+                UPDATE tasks_fts
+                SET tags = search_tokens((SELECT user_id FROM tasks WHERE id = {row}.task_id),
+                                         {tags_of.format(task=row + '.task_id')})
+                WHERE rowid = {row}.task_id;
+            END
+        ''')
+
+
+def _recurring_day_of_month(cursor):
+    """היום המקורי בחודש של משימה חודשית - מועד שקוצר לסוף חודש קצר לא נשאר מקוצר"""
+    cursor.execute('ALTER TABLE recurring_tasks ADD COLUMN day_of_month INTEGER')
+    # חוקים שכבר קוצרו לא ניתנים לשחזור - היום של המועד הבא הוא הקירוב הטוב ביותר
+    cursor.execute('''
+        UPDATE recurring_tasks
+        SET day_of_month = CAST(strftime('%d', next_due_date) AS INTEGER)
+        WHERE frequency = 'monthly'
+    ''')
+
+
+# (גרסה, תיאור, פונקציית מיגרציה) - יש להוסיף רק בסוף הרשימה
+MIGRATIONS = [
+    (1, 'initial schema', _initial_schema),
+    (2, 'hot query indexes', _hot_query_indexes),
+    (3, 'keyset pagination index', _keyset_pagination_index),
+    (4, 'open tasks by user index', _open_tasks_by_user_index),
+    (5, 'task full-text search index', _task_search_index),
+    (6, 'conversation state', _conversation_state),
+    (7, 'recurring tasks due index', _recurring_due_index),
+    (8, 'due dates and priorities', _due_dates_and_priorities),
+    (9, 'normalized tags', _normalized_tags),
+    (10, 'recurring tasks day of month', _recurring_day_of_month),
+]
+
+
+def run_migrations(db) -> int:
+    """הרצת כל המיגרציות שטרם הורצו, כל אחת בטרנזקציה משלה"""
+    current = db.fetchone('PRAGMA user_version')[0]
+
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+
+        with db.transaction() as cursor:
+            # בדיקה חוזרת בתוך הטרנזקציה - ייתכן שתהליך אחר כבר הריץ את המיגרציה
+            current = cursor.execute('PRAGMA user_version').fetchone()[0]
+            if version <= current:
+                continue
+
+            migrate(cursor)
+            cursor.execute(f'PRAGMA user_version = {version}')
+
+        current = version
+        logger.info(f"Database migrated to version {version} ({description})")
+
+    return current
+
+
+def dump_schema(db) -> str:
+    """הסכמה של מסד אחרי מיגרציות כקובץ SQL - ממנה נוצר schema.sql"""
+    version = db.fetchone('PRAGMA user_version')[0]
+    # טבלאות הצל של FTS5 נוצרות מהטבלה הווירטואלית עצמה
+    shadow = {name for name, in db.fetchall("SELECT name FROM pragma_table_list WHERE type = 'shadow'")}
+    rows = db.fetchall('''
+        SELECT name, sql FROM sqlite_master
+        WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+        ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 WHEN 'trigger' THEN 2 ELSE 3 END, name
+    ''')
+
+    lines = [
+        f'-- סכמת מסד הנתונים של הבוט אחרי כל המיגרציות (user_version = {version})',
+        '-- נוצר מ-migrations.py, שהוא המקור היחיד לסכמה - אין לערוך ידנית. ליצירה מחדש:',
+        '--     python migrations.py > schema.sql',
+        '-- קטגוריות ברירת המחדל (user_id = 0) נוספות במיגרציה הראשונה.',
+        '',
+    ]
+    for name, sql in rows:
+        if name in shadow:
+            continue
+        # ההזחה של מחרוזות ה-SQL בקוד המיגרציות
+        first, _, rest = sql.partition('\n')
+        statement = first + ('\n' + textwrap.dedent(rest) if rest else '')
+        lines += [statement.rstrip() + ';', '']
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import os
+    import tempfile
+
+    from database import DatabaseManager
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = DatabaseManager(os.path.join(directory, 'schema.db'))
+        try:
+            run_migrations(db)
+            print(dump_schema(db), end='')
+        finally:
+            db.close()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+שרת ה-HTTP של מצב Webhook - עדכונים מטלגרם, /healthz ו-/metrics על אותו פורט
+"""
+
+import json
+import logging
+import re
+import time
+from http import HTTPStatus
+from typing import Optional
+
+import tornado.web
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import Application, ExtBot
+from telegram.request import HTTPXRequest
+
+from metrics import Counter, Histogram, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# קידומת callback_data - עד שתי מילים, בלי מזהים ושמות קטגוריות
+_CALLBACK_PREFIX = re.compile(r'[a-z]+(?:_[a-z]+)?')
+
+
+def update_label(update: object, commands: frozenset):
+    """(סוג, שם) של העדכון לתוויות המדדים - מספר הערכים האפשריים חסום"""
+    if not isinstance(update, Update):
+        return 'other', 'other'
+    if update.callback_query is not None:
+        match = _CALLBACK_PREFIX.match(update.callback_query.data or '')
+        return 'callback', match.group(0) if match else 'other'
+    message = update.effective_message
+    if message is not None and message.text and message.text.startswith('/'):
+        parts = message.text[1:].split(maxsplit=1)
+        command = parts[0].split('@', 1)[0].lower() if parts else ''
+        return 'command', command if command in commands else 'other_command'
+    if message is not None:
+        return 'message', 'document' if message.document is not None else 'text'
+    return 'other', 'other'
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """בקשות ל-Bot API עם מדידת זמן וספירת שגיאות לפי מתודה"""
+
+    def __init__(self, latency: Histogram, errors: Counter, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.errors = errors
+
+    async def post(self, url: str, *args, **kwargs):
+        method = url.rsplit('/', 1)[-1]
+        start = time.perf_counter()
+        try:
+            return await super().post(url, *args, **kwargs)
+        except TelegramError as e:
+            self.errors.inc(method, type(e).__name__)
+            raise
+        finally:
+            self.latency.observe(time.perf_counter() - start, method)
+
+
+class WebhookHandler(tornado.web.RequestHandler):
+    """קבלת עדכון מטלגרם והעברתו לתור של האפליקציה"""
+
+    SUPPORTED_METHODS = ('POST',)
+
+    def initialize(self, bot_application: Application):
+        self.bot_application = bot_application
+
+    async def post(self):
+        if self.request.headers.get('Content-Type') != 'application/json':
+            raise tornado.web.HTTPError(HTTPStatus.FORBIDDEN)
+        try:
+            update = Update.de_json(json.loads(self.request.body), self.bot_application.bot)
+        except Exception as e:
+            logger.error(f"Invalid webhook payload: {e}")
+            raise tornado.web.HTTPError(HTTPStatus.BAD_REQUEST)
+
+        if update is not None:
+            bot = self.bot_application.bot
+            if isinstance(bot, ExtBot):
+                bot.insert_callback_data(update)
+            await self.bot_application.update_queue.put(update)
+        self.set_status(HTTPStatus.OK)
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    """בדיקת חיות - 200 כשהאפליקציה רצה, 503 אחרת"""
+
+    SUPPORTED_METHODS = ('GET', 'HEAD')
+
+    def initialize(self, bot_application: Application, started_at: float):
+        self.bot_application = bot_application
+        self.started_at = started_at
+
+    def get(self):
+        running = self.bot_application.running
+        self.set_status(HTTPStatus.OK if running else HTTPStatus.SERVICE_UNAVAILABLE)
+        self.set_header('Content-Type', 'application/json')
+        self.write(json.dumps({
+            'status': 'ok' if running else 'stopped',
+            'uptime_seconds': round(time.monotonic() - self.started_at, 1)
+        }))
+
+    def head(self):
+        self.set_status(HTTPStatus.OK if self.bot_application.running else HTTPStatus.SERVICE_UNAVAILABLE)
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    """המדדים בפורמט הטקסט של Prometheus"""
+
+    SUPPORTED_METHODS = ('GET',)
+
+    def initialize(self, registry: MetricsRegistry):
+        self.registry = registry
+
+    def get(self):
+        self.set_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.write(self.registry.render())
+
+
+class WebApp(tornado.web.Application):
+    """הנתיבים של השרת - בלי לוג לכל בקשה (טלגרם ו-Prometheus פונים כל הזמן)"""
+
+    def __init__(self, application: Application, url_path: str, registry: MetricsRegistry,
+                 started_at: Optional[float] = None):
+        started_at = time.monotonic() if started_at is None else started_at
+        super().__init__([
+            (r'/healthz', HealthHandler, {'bot_application': application, 'started_at': started_at}),
+            (r'/metrics', MetricsHandler, {'registry': registry}),
+            (rf'/{re.escape(url_path.strip("/"))}/?', WebhookHandler, {'bot_application': application}),
+        ])
+
+    def log_request(self, handler: tornado.web.RequestHandler):
+        if handler.get_status() >= 500:
+            logger.warning(f"{handler.request.method} {handler.request.path} -> {handler.get_status()}")
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+שליחת הודעות יזומות בכמות גדולה בהתאם למגבלות הקצב של Bot API
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitedSender:
+    """תור שליחה אסינכרוני - קצב גלובלי, מרווח מינימלי לכל צ'אט וטיפול ב-RetryAfter"""
+
+    # מעל מספר זה של צ'אטים נמחקים הרישומים שכבר אינם מגבילים
+    CHAT_STATE_LIMIT = 10000
+
+    def __init__(self, bot, global_rate: float = None, per_chat_interval: float = None,
+                 workers: int = None, max_queue: int = None, max_retries: int = 3, retry_backoff: float = 1.0):
+        advanced = config.Advanced
+        self.bot = bot
+        self.global_rate = global_rate or advanced.SEND_GLOBAL_RATE
+        self.per_chat_interval = advanced.SEND_PER_CHAT_INTERVAL if per_chat_interval is None else per_chat_interval
+        self.workers = workers or advanced.SEND_WORKERS
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff  # שניות לפני הניסיון החוזר הראשון אחרי שגיאת רשת, ומוכפל בכל ניסיון
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue or advanced.SEND_QUEUE_SIZE)
+
+        self._tasks: List[asyncio.Task] = []
+        self._next_global_send = 0.0
+        self._paused_until = 0.0
+        self._chat_next_send: Dict[int, float] = {}
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+
+    async def start(self):
+        """הפעלת ה-workers"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain_timeout: float = None):
+        """עצירת ה-workers - קודם המתנה של עד drain_timeout שניות לשליחת מה שבתור
+
+        הודעות שלא נשלחו עד אז נזרקות ונספרות ב-dropped.
+        """
+        if not self._tasks:
+            return
+        drain_timeout = config.Advanced.SEND_DRAIN_TIMEOUT if drain_timeout is None else drain_timeout
+        try:
+            await asyncio.wait_for(self.queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        
+        dropped = 0
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
+            dropped += 1
+        if dropped:
+            self.dropped += dropped
+            logger.warning(f"Sender stopped with {dropped} unsent messages dropped")
+
+    async def send(self, chat_id: int, text: str, **kwargs):
+        """הוספת הודעה לתור - ממתין כשהתור מלא (backpressure)"""
+        await self.queue.put((chat_id, text, kwargs))
+
+    async def join(self):
+        """המתנה עד שכל ההודעות בתור טופלו"""
+        await self.queue.join()
+
+    async def _worker(self):
+        while True:
+            chat_id, text, kwargs = await self.queue.get()
+            try:
+                await self._deliver(chat_id, text, kwargs)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Unexpected error sending to {chat_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, chat_id: int, text: str, kwargs: Dict):
+        """שליחה עם ניסיונות חוזרים"""
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_slot(chat_id)
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                self.sent += 1
+                return
+            except RetryAfter as e:
+                # הגבלת הצפה חלה על כל הבוט - עצירת כל ה-workers עד שיעבור הזמן
+                if attempt == self.max_retries:
+                    break
+                self.retried += 1
+                loop = asyncio.get_running_loop()
+                self._paused_until = max(self._paused_until, loop.time() + float(e.retry_after))
+                logger.warning(f"Flood limit hit, pausing sends for {e.retry_after}s")
+            except (Forbidden, BadRequest) as e:
+                # המשתמש חסם את הבוט או שהצ'אט לא קיים - אין טעם לנסות שוב
+                self.failed += 1
+                logger.info(f"Dropping message to {chat_id}: {e}")
+                return
+            except (TimedOut, NetworkError) as e:
+                if attempt == self.max_retries:
+                    break
+                self.retried += 1
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+        self.failed += 1
+        logger.warning(f"Giving up on message to {chat_id} after {self.max_retries} retries")
+
+    async def _wait_for_slot(self, chat_id: int):
+        """המתנה לתור השליחה של הצ'אט ואז לחלון הגלובלי הבא"""
+        loop = asyncio.get_running_loop()
+
+        # המרווח לצ'אט נמדד מזמן השליחה בפועל - בודקים שוב אחרי כל המתנה
+        while True:
+            now = loop.time()
+            chat_slot = self._chat_next_send.get(chat_id, 0.0)
+            if chat_slot <= now:
+                break
+            await asyncio.sleep(chat_slot - now)
+
+        # שריון החלון הגלובלי והצ'אטי יחד, בלי await ביניהם
+        slot = max(now, self._next_global_send, self._paused_until)
+        self._next_global_send = slot + 1 / self.global_rate
+        self._chat_next_send[chat_id] = slot + self.per_chat_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+        # RetryAfter שהתקבל בזמן ההמתנה עוצר גם חלונות ששוריינו קודם
+        while self._paused_until > loop.time():
+            await asyncio.sleep(self._paused_until - loop.time())
+        # התעוררות באיחור דוחה גם את ההודעה הבאה לצ'אט
+        self._chat_next_send[chat_id] = loop.time() + self.per_chat_interval
+
+        if len(self._chat_next_send) > self.CHAT_STATE_LIMIT:
+            self._prune_chat_state(loop.time())
+
+    def _prune_chat_state(self, now: float):
+        self._chat_next_send = {
+            chat_id: next_send for chat_id, next_send in self._chat_next_send.items()
+            if next_send > now
+        }
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """מונים לניטור"""
+        return {
+            'queued': self.queue.qsize(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'dropped': self.dropped
+        }
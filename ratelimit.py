@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+הגבלת קצב בקשות לכל משתמש (token bucket)
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+
+class TokenBucket:
+    """מצב ההגבלה של משתמש אחד"""
+
+    __slots__ = ('tokens', 'updated', 'warned')
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+        self.warned = False
+
+
+class RateLimiter:
+    """דלי אסימונים לכל משתמש - rate_per_minute בממוצע, עד burst בקשות ברצף"""
+
+    def __init__(self, rate_per_minute: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        # אחרי זמן זה הדלי מלא שוב - מחיקתו לא משנה את ההחלטות הבאות
+        self.idle_timeout = burst / self.rate
+        self._clock = clock
+        self._buckets: 'OrderedDict[int, TokenBucket]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.allowed = 0
+        self.throttled = 0
+        self.evicted = 0
+
+    def allow(self, user_id: int) -> bool:
+        """האם לטפל בבקשה - צורך אסימון אחד אם יש"""
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = self._buckets[user_id] = TokenBucket(self.burst, now)
+            else:
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+                bucket.updated = now
+                self._buckets.move_to_end(user_id)
+
+            self._evict_idle(now)
+
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                bucket.warned = False
+                self.allowed += 1
+                return True
+
+            self.throttled += 1
+            return False
+
+    def should_warn(self, user_id: int) -> bool:
+        """הודעת אזהרה אחת בלבד לכל רצף של בקשות חסומות"""
+        with self._lock:
+            bucket = self._buckets.get(user_id)
+            if bucket is None or bucket.warned:
+                return False
+            bucket.warned = True
+            return True
+
+    def _evict_idle(self, now: float):
+        # הדליים מסודרים לפי זמן השימוש האחרון - בודקים רק מההתחלה
+        while self._buckets:
+            user_id, bucket = next(iter(self._buckets.items()))
+            if now - bucket.updated < self.idle_timeout:
+                break
+            del self._buckets[user_id]
+            self.evicted += 1
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """מונים לניטור"""
+        return {
+            'buckets': len(self._buckets),
+            'allowed': self.allowed,
+            'throttled': self.throttled,
+            'evicted': self.evicted
+        }
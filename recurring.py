@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+יצירת משימות מהמשימות החוזרות (recurring_tasks) כשמגיע מועדן
+"""
+
+import calendar
+import logging
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = '%Y-%m-%d'
+
+# תדירויות עם מרווח קבוע - מספר המופעים מחושב בלי לעבור על כל אחד
+FIXED_STEPS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
+
+def next_occurrence(current: date, frequency: str, day_of_month: Optional[int] = None) -> Optional[date]:
+    """המועד הבא אחרי current - None לתדירות לא מוכרת
+
+    במשימה חודשית day_of_month הוא היום המקורי בחודש: אחרי 28 בפברואר של חוק
+    שנקבע ל-31 המועד הבא הוא 31 במרץ ולא 28.
+    """
+    step = FIXED_STEPS.get(frequency)
+    if step is not None:
+        return current + step
+    if frequency == 'monthly':
+        # אותו יום בחודש הבא, או היום האחרון בחודש אם הוא קצר יותר
+        day = day_of_month or current.day
+        year, month = (current.year + 1, 1) if current.month == 12 else (current.year, current.month + 1)
+        return current.replace(year=year, month=month, day=min(day, calendar.monthrange(year, month)[1]))
+    return None
+
+
+class RecurringTaskMaterializer:
+    """שליפת החוקים שהגיע מועדם לפי (is_active, next_due_date) ויצירת המשימות במנות"""
+
+    def __init__(self, db, batch_size: int, max_catch_up: int):
+        self.db = db
+        self.batch_size = batch_size
+        # מספר המופעים המקסימלי שנוצרים לחוק אחד אחרי השבתה - מופעים ישנים יותר מדולגים
+        self.max_catch_up = max_catch_up
+
+        self.created = 0
+        self.skipped = 0
+        self.deactivated = 0
+
+    def _occurrences(self, due: date, frequency: str, today: date,
+                     day_of_month: Optional[int] = None) -> Tuple[int, List[date], Optional[date]]:
+        """(מספר המועדים שחלפו עד today כולל, האחרונים שבהם עד max_catch_up, המועד הבא)"""
+        step = FIXED_STEPS.get(frequency)
+        if step is not None:
+            count = (today - due).days // step.days + 1
+            first = max(0, count - self.max_catch_up)
+            return count, [due + step * i for i in range(first, count)], due + step * count
+
+        occurrences = []
+        while due is not None and due <= today:
+            occurrences.append(due)
+            due = next_occurrence(due, frequency, day_of_month)
+        return len(occurrences), occurrences[-self.max_catch_up:], due
+
+    def run_batch(self, today: date) -> int:
+        """מנה אחת בטרנזקציה אחת - מחזיר את מספר החוקים שטופלו (0 כשאין עוד)
+
+        יצירת המשימות וקידום next_due_date נעשים יחד, כך שקריסה באמצע לא יוצרת כפילויות.
+        """
+        with self.db.transaction() as cursor:
+            rules = cursor.execute('''
+                SELECT id, user_id, content, category, frequency, next_due_date, day_of_month
+                FROM recurring_tasks
+                WHERE is_active = 1 AND next_due_date <= ?
+                ORDER BY next_due_date
+                LIMIT ?
+            ''', (today.strftime(DATE_FORMAT), self.batch_size)).fetchall()
+
+            tasks = []
+            advanced = []
+            deactivated = []
+            for rule_id, user_id, content, category, frequency, next_due_date, day_of_month in rules:
+                try:
+                    due = datetime.strptime(next_due_date, DATE_FORMAT).date()
+                except ValueError:
+                    due = None
+                if due and frequency == 'monthly' and not day_of_month:
+                    # חוק בלי יום מקורי (נוסף ישירות או שוחזר מגיבוי ישן) - היום של המועד הנוכחי
+                    day_of_month = due.day
+                count, occurrences, following = (
+                    self._occurrences(due, frequency, today, day_of_month) if due else (0, [], None)
+                )
+                if following is None:
+                    # בלי מועד הבא החוק היה נשלף שוב בכל מנה
+                    logger.warning(f"Deactivating recurring task {rule_id}: "
+                                   f"frequency={frequency!r}, next_due_date={next_due_date!r}")
+                    deactivated.append((rule_id,))
+                    continue
+
+                self.skipped += count - len(occurrences)
+                tasks.extend([(user_id, content, category)] * len(occurrences))
+                advanced.append((following.strftime(DATE_FORMAT), day_of_month, rule_id))
+
+            cursor.executemany('INSERT INTO tasks (user_id, content, category) VALUES (?, ?, ?)', tasks)
+            cursor.executemany('''
+                UPDATE recurring_tasks SET next_due_date = ?, day_of_month = ? WHERE id = ?
+            ''', advanced)
+            cursor.executemany('UPDATE recurring_tasks SET is_active = 0 WHERE id = ?', deactivated)
+
+        self.created += len(tasks)
+        self.deactivated += len(deactivated)
+        return len(rules)
+
+    def stats(self):
+        """מונים לניטור"""
+        return {
+            'created': self.created,
+            'skipped': self.skipped,
+            'deactivated': self.deactivated
+        }
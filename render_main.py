@@ -45,21 +45,6 @@ def validate_environment():
     
     return token
 
-def create_render_health_check():
-    """יצירת בדיקת בריאות פשוטה ל-Render"""
-    
-    # יצירת קובץ health check
-    health_file = '/tmp/bot_health.txt'
-    
-    try:
-        with open(health_file, 'w') as f:
-            f.write(f"Bot running at {os.environ.get('RENDER_SERVICE_NAME', 'unknown')}")
-        
-        return True
-    except Exception as e:
-        logging.error(f"Failed to create health check: {e}")
-        return False
-
 def main():
     """פונקציה ראשית מותאמת ל-Render"""
     
@@ -83,10 +68,6 @@ def main():
     
     logger.info(f"🔑 טוקן נטען בהצלחה: {token[:10]}...")
     
-    # יצירת health check
-    if create_render_health_check():
-        logger.info("✅ Health check נוצר בהצלחה")
-    
     # יצירת הבוט
     try:
         bot = TodoBot(token)
@@ -110,6 +91,7 @@ def main():
             logger.info(f"🌐 Webhook URL יוגדר ל: {webhook_url}")
         else:
             logger.warning("⚠️ לא הוגדר WEBHOOK_URL/RENDER_EXTERNAL_URL — השרת יאזין אך Telegram לא יקבל כתובת לעדכונים.")
+        logger.info(f"🩺 בדיקת בריאות: /healthz | מדדים: /metrics (פורט {port})")
 
         # הפעלת הבוט במצב Webhook (מאזין ל-0.0.0.0:$PORT)
         bot.run_webhook(port=port, url_path=url_path, webhook_url=webhook_url)
@@ -11,12 +11,13 @@ import logging
 from datetime import datetime
 import signal
 import argparse
+from tempfile import SpooledTemporaryFile
 
 # הוספת הנתיב הנוכחי לחיפוש מודולים
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # ייבוא הבוט והתכונות
-from main import TodoBot
+from main import TodoBot, extract_tags
 from enhanced_features import EnhancedTodoBot
 from config import config
 
@@ -69,12 +70,79 @@ class AdvancedTodoBot(TodoBot, EnhancedTodoBot):
         
         if self.enable_enhanced:
             # הוספת פקודות מתקדמות
-            from telegram.ext import CommandHandler
+            from telegram.ext import CommandHandler, MessageHandler, filters
             
             self.application.add_handler(CommandHandler("stats", self.stats_command))
             self.application.add_handler(CommandHandler("chart", self.show_productivity_chart))
             self.application.add_handler(CommandHandler("backup", self.backup_command))
             self.application.add_handler(CommandHandler("search", self.search_command))
+            self.application.add_handler(CommandHandler("tags", self.tags_command))
+            self.application.add_handler(CommandHandler("restore", self.restore_command))
+            self.application.add_handler(MessageHandler(filters.Document.ALL, self.restore_document))
+            
+            # כתיבה תקופתית של סטטיסטיקות הפעילות שנצברו בזיכרון
+            job_queue = getattr(self.application, 'job_queue', None)
+            if job_queue is not None:
+                job_queue.run_repeating(
+                    self.flush_activity_job,
+                    interval=config.Advanced.ACTIVITY_FLUSH_INTERVAL,
+                    name='activity_flush'
+                )
+                
+                if config.Advanced.ENABLE_RECURRING_TASKS:
+                    # בדיקה ראשונה מיד אחרי ההפעלה - משלימה את מה שהוחמץ בזמן ההשבתה
+                    job_queue.run_repeating(
+                        self.recurring_tasks_job,
+                        interval=config.Advanced.RECURRING_INTERVAL,
+                        first=10,
+                        name='recurring_tasks'
+                    )
+    
+    def register_metrics(self):
+        """מדדי התכונות המתקדמות בנוסף למדדי הבוט הבסיסי"""
+        super().register_metrics()
+        metrics = self.metrics
+        metrics.gauge('todo_bot_activity_buffer_users', 'User-days with activity not yet written', (),
+                      lambda: {(): len(self.activity)})
+        metrics.gauge('todo_bot_chart_renders_pending', 'Charts being rendered', (),
+                      lambda: {(): self.chart_renderer.stats()['pending']})
+        metrics.counter_callback('todo_bot_chart_renders_total', 'Chart render requests by outcome', ('result',),
+                                 lambda: {(key,): self.chart_renderer.stats()[key] for key in ('rendered', 'rejected')})
+        metrics.counter_callback('todo_bot_recurring_tasks_total', 'Recurring task occurrences by outcome', ('result',),
+                                 lambda: {(key,): value for key, value in self.recurring.stats().items()})
+    
+    def cache_stats(self):
+        stats = super().cache_stats()
+        stats['charts'] = self.chart_renderer.cache.stats()
+        return stats
+    
+    def record_task_activity(self, user_id: int, activity_type: str, count: int):
+        """ספירת פעולות על משימות לסטטיסטיקות - עדכון אחד גם לפעולה מרובה"""
+        if self.enable_enhanced:
+            self.record_user_activity(user_id, activity_type, count)
+    
+    async def flush_activity_job(self, context):
+        """כתיבת מוני הפעילות שנצברו למסד"""
+        await self.db.write(self.activity.flush)
+    
+    async def recurring_tasks_job(self, context):
+        """יצירת משימות מהמשימות החוזרות שהגיע מועדן"""
+        handled = await self.materialize_recurring_tasks()
+        if handled:
+            logging.info(f"Materialized {handled} recurring tasks ({self.recurring.stats()})")
+    
+    async def handle_callback(self, update, context):
+        """כפתורי התכונות המתקדמות, ושאר הכפתורים לבוט הבסיסי"""
+        if self.enable_enhanced and update.callback_query.data == 'show_chart':
+            await self.show_productivity_chart(update, context)
+            return
+        await super().handle_callback(update, context)
+    
+    async def _post_shutdown(self, application):
+        """כתיבת הפעילות שנותרה לפני סגירת החיבורים"""
+        await self.db.write(self.activity.flush)
+        self.chart_renderer.close()
+        await super()._post_shutdown(application)
     
     async def backup_command(self, update, context):
         """פקודת גיבוי"""
@@ -82,16 +150,12 @@ class AdvancedTodoBot(TodoBot, EnhancedTodoBot):
         username = update.effective_user.username or "unknown"
         
         try:
-            backup_file = await self.backup_user_data(user_id)
-            
-            await update.message.reply_document(
-                document=open(backup_file, 'rb'),
-                filename=f"backup_{username}_{datetime.now().strftime('%Y%m%d')}.json",
-                caption="💾 **הגיבוי שלך מוכן!**\n\nשמור את הקובץ במקום בטוח."
-            )
-            
-            # מחיקת הקובץ הזמני
-            os.remove(backup_file)
+            with await self.backup_user_data(user_id) as backup_file:
+                await update.message.reply_document(
+                    document=backup_file,
+                    filename=f"backup_{username}_{datetime.now().strftime('%Y%m%d')}.jsonl.gz",
+                    caption="💾 **הגיבוי שלך מוכן!**\n\nשמור את הקובץ במקום בטוח."
+                )
             
             self.log_user_activity(user_id, username, "BACKUP", "Successfully created backup")
             
@@ -99,6 +163,59 @@ class AdvancedTodoBot(TodoBot, EnhancedTodoBot):
             await update.message.reply_text("❌ שגיאה ביצירת הגיבוי. אנא נסה שוב מאוחר יותר.")
             logging.error(f"Backup error for user {user_id}: {e}")
     
+    async def restore_command(self, update, context):
+        """פקודת שחזור מגיבוי - הקובץ נשלח בהודעה הבאה"""
+        user_id = update.effective_user.id
+        self.user_states[user_id] = 'waiting_restore_file'
+        await update.message.reply_text(
+            "♻️ **שחזור מגיבוי**\n\n"
+            "שלח עכשיו את קובץ הגיבוי (.jsonl.gz) שקיבלת מ-/backup.\n"
+            "המשימות מהגיבוי יתווספו למשימות הקיימות שלך."
+        )
+    
+    async def restore_document(self, update, context):
+        """קבלת קובץ הגיבוי ושחזור הנתונים"""
+        user_id = update.effective_user.id
+        username = update.effective_user.username or "unknown"
+        
+        if self.user_states.get(user_id) != 'waiting_restore_file':
+            await update.message.reply_text("💡 כדי לשחזר גיבוי, שלח קודם /restore ואז את הקובץ.")
+            return
+        
+        document = update.message.document
+        if document.file_size and document.file_size > config.Advanced.RESTORE_MAX_FILE_BYTES:
+            await update.message.reply_text("❌ הקובץ גדול מדי לשחזור דרך הבוט.")
+            return
+        
+        self.user_states.pop(user_id, None)
+        try:
+            telegram_file = await document.get_file()
+            with SpooledTemporaryFile(max_size=config.Advanced.BACKUP_SPOOL_MAX_BYTES) as backup_file:
+                await telegram_file.download_to_memory(backup_file)
+                backup_file.seek(0)
+                counts = await self.restore_user_backup(user_id, backup_file)
+            
+            # הקטגוריות של המשתמש השתנו
+            self.category_cache.invalidate(user_id)
+            
+            await update.message.reply_text(
+                "✅ **הגיבוי שוחזר בהצלחה!**\n\n"
+                f"📋 משימות: {counts['task']}\n"
+                f"🏷 תגיות: {counts['task_tag']}\n"
+                f"📂 קטגוריות: {counts['category']}\n"
+                f"🔁 משימות חוזרות: {counts['recurring_task']}\n"
+                f"📊 ימי סטטיסטיקה: {counts['stats']}"
+            )
+            self.log_user_activity(user_id, username, "RESTORE", f"Restored {counts}")
+            
+        except (OSError, EOFError, ValueError, KeyError) as e:
+            # gzip/JSON לא תקינים, קובץ קטוע או שורה חסרת שדות
+            await update.message.reply_text("❌ הקובץ אינו גיבוי תקין של הבוט.")
+            logging.warning(f"Invalid backup from user {user_id}: {e}")
+        except Exception as e:
+            await update.message.reply_text("❌ שגיאה בשחזור הגיבוי. אנא נסה שוב מאוחר יותר.")
+            logging.error(f"Restore error for user {user_id}: {e}")
+    
     async def search_command(self, update, context):
         """פקודת חיפוש משימות"""
         user_id = update.effective_user.id
@@ -113,7 +230,9 @@ class AdvancedTodoBot(TodoBot, EnhancedTodoBot):
             return
         
         search_query = " ".join(context.args)
-        results = self.search_tasks(user_id, search_query)
+        max_results = config.MAX_TASKS_PER_PAGE
+        # שורה אחת מעבר למוצג - רק כדי לדעת אם יש עוד תוצאות
+        results = await self.db.read(self.search_tasks, user_id, search_query, max_results + 1)
         
         if not results:
             await update.message.reply_text(f"🔍 לא נמצאו משימות עבור '{search_query}'")
@@ -121,34 +240,62 @@ class AdvancedTodoBot(TodoBot, EnhancedTodoBot):
         
         message = f"🔍 **תוצאות חיפוש עבור '{search_query}':**\n\n"
         
-        for task_id, content, category, created_at in results[:10]:  # מקסימום 10 תוצאות
+        for task_id, content, category, created_at in results[:max_results]:
             message += f"📋 {content}\n"
             message += f"📂 {category} | 🆔 #{task_id}\n\n"
         
-        if len(results) > 10:
-            message += f"... ועוד {len(results) - 10} תוצאות נוספות"
+        if len(results) > max_results:
+            message += "... ויש תוצאות נוספות - נסה חיפוש מדויק יותר"
         
         await update.message.reply_text(message)
         self.log_user_activity(user_id, username, "SEARCH", f"Query: '{search_query}', Results: {len(results)}")
     
+    async def tags_command(self, update, context):
+        """ענן התגיות, או המשימות של תגית אחת (/tags עבודה)"""
+        user_id = update.effective_user.id
+        max_results = config.MAX_TASKS_PER_PAGE
+        
+        if not context.args:
+            counts = await self.db.read(self.get_tag_counts, user_id, config.Advanced.TAG_CLOUD_SIZE)
+            if not counts:
+                await update.message.reply_text(
+                    "🏷 אין תגיות במשימות הפתוחות שלך.\n\n"
+                    "הוסף #תגית בתוכן המשימה, למשל: `לשלוח דוח #עבודה`"
+                )
+                return
+            
+            message = "🏷 **התגיות שלך:**\n\n"
+            message += "\n".join(f"#{tag} ({uses})" for tag, uses in counts)
+            message += "\n\nשימוש: `/tags [תגית]` להצגת המשימות שלה"
+            await update.message.reply_text(message)
+            return
+        
+        tag = context.args[0].lstrip('#')
+        # שורה אחת מעבר למוצג - רק כדי לדעת אם יש עוד משימות
+        results = await self.db.read(self.get_tasks_by_tag, user_id, tag, max_results + 1)
+        
+        if not results:
+            await update.message.reply_text(f"🏷 אין משימות פתוחות עם התגית #{tag}")
+            return
+        
+        message = f"🏷 **משימות עם #{tag}:**\n\n"
+        for task_id, content, category, created_at in results[:max_results]:
+            message += f"📋 {content}\n"
+            message += f"📂 {category} | 🆔 #{task_id}\n\n"
+        
+        if len(results) > max_results:
+            message += "... ויש משימות נוספות"
+        
+        await update.message.reply_text(message)
+    
     async def enhanced_add_task(self, user_id: int, content: str, category: str):
         """הוספת משימה מתקדמת עם ניתוח"""
-        # הוספת המשימה הרגילה
-        task_id = self.add_task(user_id, content, category)
+        # המשימה והתגיות שלה (#tag) בכתיבה אחת
+        tags = extract_tags(content) if self.enable_enhanced else None
+        task_id = await self.db.write(self.add_task, user_id, content, category, tags)
         
-        if self.enable_enhanced:
-            # ניתוח התוכן לחילוץ תגיות
-            import re
-            
-            # חיפוש תגיות (#tag)
-            tags = re.findall(r'#(\w+)', content)
-            
-            if tags:
-                # הוספת התגיות למשימה
-                self.add_task_with_tags(user_id, content, category, tags)
-            
-            # רישום פעילות לסטטיסטיקות
-            self.record_user_activity(user_id, 'task_created')
+        # רישום פעילות לסטטיסטיקות (נצבר בזיכרון, ללא גישה למסד)
+        self.record_task_activity(user_id, 'task_created', 1)
         
         return task_id
     
@@ -158,7 +305,12 @@ class AdvancedTodoBot(TodoBot, EnhancedTodoBot):
             print(f"\n🛑 התקבל אות סיום ({signum})")
             print("💾 שומר נתונים...")
             
-            # כאן ניתן להוסיף לוגיקת סגירה נקייה
+            # כתיבת הפעילות שעדיין בזיכרון לפני היציאה
+            try:
+                self.activity.flush()
+            except Exception as e:
+                logging.error(f"Failed to flush activity stats: {e}")
+            
             if hasattr(self, 'application') and self.application.running:
                 self.application.stop()
             
@@ -220,6 +372,26 @@ WantedBy=multi-user.target
     print("4. sudo systemctl start telegram-todo-bot.service")
     print("5. sudo systemctl status telegram-todo-bot.service")
 
+def restore_from_file(path: str, user_id: int) -> int:
+    """שחזור גיבוי משורת הפקודה, בלי להפעיל את הבוט"""
+    if user_id is None:
+        print("❌ יש לציין --user-id עבור השחזור")
+        return 1
+    
+    bot = EnhancedTodoBot(config.DATABASE_NAME)
+    bot.init_enhanced_database()
+    try:
+        with open(path, 'rb') as backup_file:
+            counts = asyncio.run(bot.restore_user_backup(user_id, backup_file))
+    except (OSError, EOFError, ValueError, KeyError) as e:
+        print(f"❌ שחזור נכשל: {e}")
+        return 1
+    finally:
+        bot.db.close()
+    
+    print(f"✅ הגיבוי שוחזר למשתמש {user_id}: {counts}")
+    return 0
+
 def main():
     """פונקציה ראשית עם תמיכה בארגומנטים"""
     parser = argparse.ArgumentParser(description='Telegram Todo Bot - מתקדם')
@@ -229,6 +401,8 @@ def main():
     parser.add_argument('--token', type=str, help='טוקן בוט טלגרם')
     parser.add_argument('--webhook', action='store_true', help='הפעלת מצב Webhook (מאזין ל-$PORT)')
     parser.add_argument('--polling', action='store_true', help='כפיית מצב Polling (מתעלם מ-$PORT)')
+    parser.add_argument('--restore', type=str, metavar='FILE', help='שחזור קובץ גיבוי (דורש --user-id)')
+    parser.add_argument('--user-id', type=int, help='המשתמש שאליו משוחזר הגיבוי')
     
     args = parser.parse_args()
     
@@ -236,6 +410,9 @@ def main():
         create_systemd_service()
         return
     
+    if args.restore:
+        return restore_from_file(args.restore, args.user_id)
+    
     # קביעת סביבת הפעלה
     if args.production:
         os.environ['BOT_ENV'] = 'production'
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+תזמון תזכורות לפי שעה ואזור זמן של כל משתמש
+"""
+
+import heapq
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+# פורמט מועדי היעד במסד - UTC, כמו CURRENT_TIMESTAMP של SQLite, כך שהשוואת מחרוזות היא השוואת זמנים
+DB_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_DUE_DATE_FORMATS = ('%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d', '%d.%m.%Y')
+_RELATIVE_DAYS = {'היום': 0, 'today': 0, 'מחר': 1, 'tomorrow': 1, 'מחרתיים': 2}
+
+
+def parse_reminder_time(value: str) -> time:
+    """המרת 'HH:MM' לאובייקט time (זורק ValueError אם לא תקין)"""
+    return datetime.strptime(value.strip(), '%H:%M').time()
+
+
+def utc_minutes_of_day(reminder_time: str, timezone: str, utc_date: date) -> Tuple[int, ...]:
+    """הדקות ביממת ה-UTC utc_date שבהן חלה שעת התזכורת המקומית
+
+    המופע שנופל ביממת UTC יכול להיות של היום המקומי הקודם או הבא, עם ההפרש מ-UTC
+    של אותו יום. בדרך כלל יש מופע אחד; ביום שבו ההפרש משתנה יכולים להיות אפס או שניים.
+    """
+    tz = pytz.timezone(timezone)
+    at = parse_reminder_time(reminder_time)
+    minutes = []
+    for offset in (-1, 0, 1):
+        local = tz.localize(datetime.combine(utc_date + timedelta(days=offset), at))
+        utc = local.astimezone(pytz.utc)
+        if utc.date() == utc_date:
+            minutes.append(utc.hour * 60 + utc.minute)
+    return tuple(sorted(minutes))
+
+
+def to_db_time(moment: datetime) -> str:
+    """datetime עם אזור זמן -> מחרוזת UTC לשמירה במסד"""
+    return moment.astimezone(pytz.utc).strftime(DB_TIME_FORMAT)
+
+
+def from_db_time(value: str) -> datetime:
+    """מחרוזת UTC מהמסד -> datetime ב-UTC"""
+    return pytz.utc.localize(datetime.strptime(value, DB_TIME_FORMAT))
+
+
+def parse_due_date(args: List[str], timezone: str, default_time: str, now: datetime) -> datetime:
+    """['25/12', '14:00'] או ['מחר'] -> datetime באזור הזמן של המשתמש (זורק ValueError אם לא תקין)
+
+    שנה חסרה - המועד הקרוב בעתיד; שעה חסרה - default_time.
+    """
+    if not args or len(args) > 2:
+        raise ValueError('expected a date and an optional time')
+    tz = pytz.timezone(timezone)
+    today = now.astimezone(tz).date()
+
+    day_text = args[0].strip().lower()
+    if day_text in _RELATIVE_DAYS:
+        day = today + timedelta(days=_RELATIVE_DAYS[day_text])
+    else:
+        for fmt in _DUE_DATE_FORMATS:
+            try:
+                day = datetime.strptime(day_text, fmt).date()
+                break
+            except ValueError:
+                continue
+        else:
+            day = _next_day_month(day_text, today)
+
+    at = parse_reminder_time(args[1] if len(args) > 1 else default_time)
+    return tz.localize(datetime.combine(day, at))
+
+
+def _next_day_month(text: str, today: date) -> date:
+    """'יום/חודש' בלי שנה -> המופע הקרוב מהיום והלאה (29/02 - בשנה המעוברת הבאה)
+
+    לא דרך strptime('%d/%m'), שמשלים את שנת 1900 ולכן דוחה את 29/02.
+    """
+    parts = text.split('/')
+    if len(parts) != 2 or not all(part.isdigit() for part in parts):
+        raise ValueError(f'invalid date: {text}')
+    day, month = int(parts[0]), int(parts[1])
+    date(2000, month, day)  # ValueError ליום או חודש שלא קיימים בשום שנה
+
+    year = today.year
+    while True:
+        try:
+            candidate = date(year, month, day)
+        except ValueError:
+            # 29/02 בשנה לא מעוברת
+            candidate = None
+        if candidate is not None and candidate >= today:
+            return candidate
+        year += 1
+
+
+class DeadlineScheduler:
+    """ערימת מינימום של מועדי יעד קרובים - נטענת מהמסד בחלונות זמן, לא בסריקה של כל הטבלה
+
+    הערימה מכילה את כל המועדים עד loaded_until. רשומה שהמשימה שלה נסגרה או שמועדה שונה
+    נשארת בערימה, ונפסלת בעדכון שמסמן את ההתראה כנשלחה.
+    """
+
+    def __init__(self, lead: timedelta, window: timedelta):
+        self.lead = lead
+        self.window = window
+        self._heap: List[Tuple[str, int]] = []
+        self.loaded_until: Optional[str] = None
+
+    def next_window(self, now: datetime) -> Optional[Tuple[Optional[str], str]]:
+        """(אחרי, עד) לטעינה הבאה, או None אם הערימה מכסה מספיק קדימה"""
+        horizon = now + self.lead + self.window / 2
+        if self.loaded_until is not None and to_db_time(horizon) <= self.loaded_until:
+            return None
+        return self.loaded_until, to_db_time(now + self.lead + self.window)
+
+    def load(self, rows: Iterable[Tuple[int, str]], until: str):
+        """הוספת (task_id, due_at) של חלון שנטען"""
+        for task_id, due_at in rows:
+            heapq.heappush(self._heap, (due_at, task_id))
+        self.loaded_until = until
+
+    def push(self, task_id: int, due_at: str):
+        """מועד שנקבע עכשיו - נכנס לערימה רק אם הוא בחלון שכבר נטען (אחרת ייטען בהמשך)"""
+        if self.loaded_until is not None and due_at <= self.loaded_until:
+            heapq.heappush(self._heap, (due_at, task_id))
+
+    def due(self, now: datetime) -> Tuple[List[int], str]:
+        """המשימות שמועדן בתוך זמן ההתראה, והגבול שחושב (להשוואה בעדכון במסד)"""
+        limit = to_db_time(now + self.lead)
+        task_ids = []
+        while self._heap and self._heap[0][0] <= limit:
+            task_ids.append(heapq.heappop(self._heap)[1])
+        return task_ids, limit
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class ReminderScheduler:
+    """דליים של משתמשים לפי דקת התזכורת ב-UTC - בכל דקה נשלף רק הדלי שלה"""
+
+    # מספר הדקות המקסימלי שמושלמות אחרי עיכוב (למשל עומס או הפעלה מחדש)
+    MAX_CATCH_UP_MINUTES = 15
+
+    def __init__(self, default_time: str, default_timezone: str):
+        self.default_time = default_time
+        self.default_timezone = default_timezone
+        self._preferences: Dict[int, Tuple[str, str]] = {}
+        self._buckets: Dict[int, Set[int]] = defaultdict(set)
+        self._user_minutes: Dict[int, Tuple[int, ...]] = {}
+        self._default_minutes: Tuple[int, ...] = ()
+        self._bucket_date: Optional[date] = None
+        self._last_minute: Optional[datetime] = None
+
+    def load(self, preferences: Iterable[tuple], today: date):
+        """טעינת כל ההעדפות - (user_id, reminder_time, timezone, enabled)"""
+        self._preferences = {}
+        for user_id, reminder_time, timezone, enabled in preferences:
+            if enabled:
+                self._preferences[user_id] = (reminder_time, timezone)
+        self._rebucket(today)
+
+    def set_user(self, user_id: int, reminder_time: str, timezone: str, enabled: bool = True):
+        """עדכון משתמש אחד אחרי שינוי העדפות"""
+        self.remove_user(user_id)
+        if not enabled:
+            return
+        self._preferences[user_id] = (reminder_time, timezone)
+        if self._bucket_date is not None:
+            self._add_to_buckets(user_id, self._minutes_for(reminder_time, timezone, self._bucket_date, {}))
+
+    def remove_user(self, user_id: int):
+        """הסרת משתמש מהתזמון"""
+        self._preferences.pop(user_id, None)
+        for minute in self._user_minutes.pop(user_id, ()):
+            bucket = self._buckets[minute]
+            bucket.discard(user_id)
+            if not bucket:
+                del self._buckets[minute]
+
+    def due(self, now: datetime) -> Tuple[List[int], bool]:
+        """המשתמשים שהגיע זמנם מאז הקריאה הקודמת, והאם הגיעה שעת ברירת המחדל"""
+        now = now.astimezone(pytz.utc).replace(second=0, microsecond=0)
+        if self._bucket_date != now.date():
+            # הדליים מחושבים מחדש פעם ביום - שעון קיץ משנה את ההפרש מ-UTC
+            self._rebucket(now.date())
+
+        if self._last_minute is None or now <= self._last_minute:
+            minutes = [now]
+        else:
+            missed = int((now - self._last_minute).total_seconds() // 60)
+            missed = min(missed, self.MAX_CATCH_UP_MINUTES)
+            minutes = [now - timedelta(minutes=offset) for offset in range(missed - 1, -1, -1)]
+        self._last_minute = now
+
+        user_ids: List[int] = []
+        include_default = False
+        for minute in minutes:
+            minute_of_day = minute.hour * 60 + minute.minute
+            user_ids.extend(self._buckets.get(minute_of_day, ()))
+            include_default = include_default or minute_of_day in self._default_minutes
+        return user_ids, include_default
+
+    def _rebucket(self, on_date: date):
+        self._buckets = defaultdict(set)
+        self._user_minutes = {}
+        # חישוב אחד לכל צירוף שעה+אזור זמן, לא לכל משתמש
+        minutes_cache: Dict[Tuple[str, str], Tuple[int, ...]] = {}
+        for user_id, (reminder_time, timezone) in self._preferences.items():
+            self._add_to_buckets(user_id, self._minutes_for(reminder_time, timezone, on_date, minutes_cache))
+        self._default_minutes = self._minutes_for(self.default_time, self.default_timezone, on_date, minutes_cache)
+        self._bucket_date = on_date
+        logger.info(f"Reminder buckets rebuilt for {on_date}: {len(self._user_minutes)} users")
+
+    def _minutes_for(self, reminder_time: str, timezone: str, on_date: date,
+                     minutes_cache: Dict[Tuple[str, str], Tuple[int, ...]]) -> Tuple[int, ...]:
+        key = (reminder_time, timezone)
+        minutes = minutes_cache.get(key)
+        if minutes is None:
+            try:
+                minutes = utc_minutes_of_day(reminder_time, timezone, on_date)
+            except (ValueError, pytz.UnknownTimeZoneError):
+                logger.warning(f"Invalid reminder preference {key}, using default")
+                minutes = utc_minutes_of_day(self.default_time, self.default_timezone, on_date)
+            minutes_cache[key] = minutes
+        return minutes
+
+    def _add_to_buckets(self, user_id: int, minutes: Tuple[int, ...]):
+        for minute in minutes:
+            self._buckets[minute].add(user_id)
+        self._user_minutes[user_id] = minutes
+
+    def __len__(self) -> int:
+        return len(self._user_minutes)
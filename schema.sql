@@ -1,110 +1,150 @@
--- סכמת מסד נתונים עבור בוט טלגרם לניהול משימות
--- מסד נתונים: SQLite
-
--- טבלת משימות
-CREATE TABLE IF NOT EXISTS tasks (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,          -- מזהה ייחודי
-    user_id INTEGER NOT NULL,                      -- מזהה משתמש טלגרם
-    content TEXT NOT NULL,                         -- תוכן המשימה
-    status TEXT DEFAULT 'open',                    -- סטטוס: open/done
-    category TEXT DEFAULT 'כללי',                  -- קטגוריה
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- תאריך יצירה
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- תאריך עדכון אחרון
-    
-    -- אינדקסים לביצועים טובים יותר
-    INDEX idx_tasks_user_status (user_id, status),
-    INDEX idx_tasks_user_category (user_id, category),
-    INDEX idx_tasks_created_at (created_at)
-);
+-- סכמת מסד הנתונים של הבוט אחרי כל המיגרציות (user_version = 10)
+-- נוצר מ-migrations.py, שהוא המקור היחיד לסכמה - אין לערוך ידנית. ליצירה מחדש:
+--     python migrations.py > schema.sql
+-- קטגוריות ברירת המחדל (user_id = 0) נוספות במיגרציה הראשונה.
 
--- טבלת קטגוריות
-CREATE TABLE IF NOT EXISTS categories (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,          -- מזהה ייחודי
-    user_id INTEGER NOT NULL,                      -- מזהה משתמש (0 = קטגוריות ברירת מחדל)
-    name TEXT NOT NULL,                            -- שם הקטגוריה
-    emoji TEXT DEFAULT '📂',                       -- אימוג'י לקטגוריה
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- תאריך יצירה
-    
-    -- מניעת כפילות של קטגוריות לאותו משתמש
-    UNIQUE(user_id, name),
-    
-    -- אינדקס לחיפוש מהיר
-    INDEX idx_categories_user (user_id)
+CREATE TABLE categories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    emoji TEXT DEFAULT '📂',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(user_id, name)
 );
 
--- הכנסת קטגוריות ברירת מחדל (user_id = 0 = זמין לכולם)
-INSERT OR IGNORE INTO categories (user_id, name, emoji) VALUES 
-(0, 'עבודה', '💼'),
-(0, 'לימודים', '📚'),
-(0, 'אישי', '🏠'),
-(0, 'כללי', '➕');
-
--- טבלת הגדרות משתמש (אופציונלי - לעתיד)
-CREATE TABLE IF NOT EXISTS user_settings (
-    user_id INTEGER PRIMARY KEY,                   -- מזהה משתמש טלגרם
-    timezone TEXT DEFAULT 'Asia/Jerusalem',        -- אזור זמן
-    reminder_time TEXT DEFAULT '09:00',            -- שעת תזכורת יומית
-    language TEXT DEFAULT 'he',                    -- שפה
-    notifications_enabled BOOLEAN DEFAULT TRUE,    -- הפעלת התראות
+CREATE TABLE conversation_state (
+    store TEXT NOT NULL,
+    key INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (store, key)
+) WITHOUT ROWID;
+
+CREATE TABLE daily_stats (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    tasks_created INTEGER DEFAULT 0,
+    tasks_completed INTEGER DEFAULT 0,
+    tasks_deleted INTEGER DEFAULT 0,
+    productivity_score REAL DEFAULT 0.0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    UNIQUE(user_id, date)
+);
+
+CREATE TABLE recurring_tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    category TEXT DEFAULT 'כללי',
+    frequency TEXT NOT NULL, -- daily, weekly, monthly
+    next_due_date TEXT NOT NULL,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+, day_of_month INTEGER);
+
+CREATE TABLE tags (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
 );
 
--- טבלת סטטיסטיקות (אופציונלי - לעתיד)
-CREATE TABLE IF NOT EXISTS task_stats (
+CREATE TABLE "task_tags" (
+    tag_id INTEGER NOT NULL REFERENCES tags (id),
+    task_id INTEGER NOT NULL REFERENCES tasks (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag_id, task_id)
+) WITHOUT ROWID;
+
+CREATE TABLE tasks (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER NOT NULL,
-    date TEXT NOT NULL,                            -- תאריך (YYYY-MM-DD)
-    tasks_created INTEGER DEFAULT 0,               -- משימות שנוצרו
-    tasks_completed INTEGER DEFAULT 0,             -- משימות שהושלמו
-    tasks_deleted INTEGER DEFAULT 0,               -- משימות שנמחקו
-    
-    UNIQUE(user_id, date),
-    INDEX idx_stats_user_date (user_id, date)
+    content TEXT NOT NULL,
+    status TEXT DEFAULT 'open',
+    category TEXT DEFAULT 'כללי',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+, due_at TIMESTAMP, priority INTEGER NOT NULL DEFAULT 2, due_notified INTEGER NOT NULL DEFAULT 0);
+
+CREATE VIRTUAL TABLE tasks_fts USING fts5(
+    content, category, tags,
+    tokenize = "unicode61 remove_diacritics 2 tokenchars '_'"
 );
 
--- Views לדוחות ושאילתות נפוצות
-
--- תצוגה של משימות פעילות עם פרטי קטגוריה
-CREATE VIEW IF NOT EXISTS active_tasks_view AS
-SELECT 
-    t.id,
-    t.user_id,
-    t.content,
-    t.status,
-    t.category,
-    c.emoji as category_emoji,
-    t.created_at,
-    t.updated_at
-FROM tasks t
-LEFT JOIN categories c ON (t.category = c.name AND (c.user_id = t.user_id OR c.user_id = 0))
-WHERE t.status = 'open'
-ORDER BY t.category, t.created_at DESC;
-
--- תצוגה של סיכום משימות לפי קטגוריה
-CREATE VIEW IF NOT EXISTS task_summary_view AS
-SELECT 
-    user_id,
-    category,
-    COUNT(*) as total_tasks,
-    SUM(CASE WHEN status = 'open' THEN 1 ELSE 0 END) as open_tasks,
-    SUM(CASE WHEN status = 'done' THEN 1 ELSE 0 END) as completed_tasks
-FROM tasks
-GROUP BY user_id, category
-ORDER BY user_id, category;
-
--- טריגרים לעדכון אוטומטי של תאריכים
-
--- עדכון updated_at בעת שינוי משימה
-CREATE TRIGGER IF NOT EXISTS update_task_timestamp 
-    AFTER UPDATE ON tasks
+CREATE TABLE user_preferences (
+    user_id INTEGER PRIMARY KEY,
+    reminder_time TEXT DEFAULT '09:00',
+    timezone TEXT DEFAULT 'Asia/Jerusalem',
+    notifications_enabled BOOLEAN DEFAULT TRUE,
+    preferred_language TEXT DEFAULT 'he',
+    theme_color TEXT DEFAULT 'blue',
+    daily_goal INTEGER DEFAULT 3,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_conversation_state_expires
+ON conversation_state (expires_at);
+
+CREATE INDEX idx_daily_stats_user_date
+ON daily_stats (user_id, date, tasks_created, tasks_completed, tasks_deleted, productivity_score);
+
+CREATE INDEX idx_recurring_tasks_active_due
+ON recurring_tasks (is_active, next_due_date);
+
+CREATE INDEX idx_task_tags_task
+ON task_tags (task_id, tag_id);
+
+CREATE INDEX idx_tasks_due_pending
+ON tasks (due_at)
+WHERE status = 'open' AND due_notified = 0;
+
+CREATE INDEX idx_tasks_open_user_category
+ON tasks (user_id, category)
+WHERE status = 'open';
+
+CREATE INDEX idx_tasks_open_user_due_priority
+ON tasks (user_id, due_at, priority, id)
+WHERE status = 'open';
+
+CREATE INDEX idx_tasks_user_status_category_created_id
+ON tasks (user_id, status, category, created_at DESC, id DESC);
+
+CREATE TRIGGER task_tags_fts_delete AFTER DELETE ON task_tags
 BEGIN
-    UPDATE tasks SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+    UPDATE tasks_fts
+    SET tags = search_tokens((SELECT user_id FROM tasks WHERE id = old.task_id),
+                             (SELECT group_concat(g.name, ' ') FROM task_tags tt JOIN tags g ON g.id = tt.tag_id
+      WHERE tt.task_id = old.task_id))
+    WHERE rowid = old.task_id;
 END;
 
--- עדכון updated_at בעת שינוי הגדרות משתמש
-CREATE TRIGGER IF NOT EXISTS update_user_settings_timestamp 
-    AFTER UPDATE ON user_settings
+CREATE TRIGGER task_tags_fts_insert AFTER INSERT ON task_tags
 BEGIN
-    UPDATE user_settings SET updated_at = CURRENT_TIMESTAMP WHERE user_id = NEW.user_id;
-END;
\ No newline at end of file
+    UPDATE tasks_fts
+    SET tags = search_tokens((SELECT user_id FROM tasks WHERE id = new.task_id),
+                             (SELECT group_concat(g.name, ' ') FROM task_tags tt JOIN tags g ON g.id = tt.tag_id
+      WHERE tt.task_id = new.task_id))
+    WHERE rowid = new.task_id;
+END;
+
+CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks
+BEGIN
+    DELETE FROM tasks_fts WHERE rowid = old.id;
+END;
+
+CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks
+WHEN new.status = 'open'
+BEGIN
+    INSERT INTO tasks_fts (rowid, content, category, tags)
+    VALUES (new.id, search_tokens(new.user_id, new.content),
+            search_tokens(new.user_id, new.category), '');
+END;
+
+CREATE TRIGGER tasks_fts_update AFTER UPDATE OF user_id, content, category, status ON tasks
+BEGIN
+    DELETE FROM tasks_fts WHERE rowid = old.id;
+    INSERT INTO tasks_fts (rowid, content, category, tags)
+    SELECT new.id, search_tokens(new.user_id, new.content), search_tokens(new.user_id, new.category),
+           search_tokens(new.user_id, (SELECT group_concat(g.name, ' ') FROM task_tags tt JOIN tags g ON g.id = tt.tag_id
+          WHERE tt.task_id = new.id))
+    WHERE new.status = 'open';
+END;
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+גיבוי חם של מסד הנתונים כולו - בלי לעצור את הבוט
+"""
+
+import gzip
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = '.db.gz'
+
+
+def _snapshot_prefix(db_name: str) -> str:
+    return os.path.splitext(os.path.basename(db_name))[0] + '_'
+
+
+def _snapshot_pattern(db_name: str) -> re.Pattern:
+    """שם קובץ גיבוי מלא של המסד - todo_<זמן>.db.gz, בלי todo_tasks_<זמן>.db.gz של מסד אחר"""
+    return re.compile(re.escape(_snapshot_prefix(db_name)) + r'\d{8}_\d{6}' + re.escape(SNAPSHOT_SUFFIX))
+
+
+def create_snapshot(db_name: str, backup_dir: str, pages: int, sleep: float, timeout: float = 30) -> str:
+    """העתקת המסד ב-Backup API של SQLite, דחיסה ב-gzip והחזרת נתיב הקובץ
+
+    pages עמודים בכל צעד ו-sleep שניות הפסקה אחרי כל צעד. הכותבים לא נחסמים בכל
+    מקרה (WAL וטרנזקציית הקריאה הפתוחה); ההפסקה מגבילה את קצב הקריאה מהדיסק
+    ומשאירה זמן מעבד לשאר ה-threads של הבוט.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    final_path = os.path.join(backup_dir, f'{_snapshot_prefix(db_name)}{stamp}{SNAPSHOT_SUFFIX}')
+    raw_path = final_path + '.tmp'
+
+    source = sqlite3.connect(db_name, timeout=timeout, isolation_level=None)
+    target = sqlite3.connect(raw_path, isolation_level=None)
+    try:
+        # טרנזקציית קריאה פתוחה - ההעתקה רואה תמונת מצב אחת ולא מתחילה מחדש
+        # כשהבוט כותב, והכותבים ממשיכים לעבוד (WAL)
+        source.execute('BEGIN')
+        source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        # הפרמטר sleep של backup() חל רק כשצעד מחזיר BUSY/LOCKED - ההפסקה בין צעדים נעשית כאן
+        def pause(status, remaining, total):
+            if remaining:
+                time.sleep(sleep)
+
+        source.backup(target, pages=pages, progress=pause if sleep > 0 else None)
+        source.execute('COMMIT')
+    finally:
+        target.close()
+        source.close()
+
+    try:
+        with open(raw_path, 'rb') as raw, gzip.open(final_path + '.part', 'wb', compresslevel=6) as compressed:
+            shutil.copyfileobj(raw, compressed, 1024 * 1024)
+        os.replace(final_path + '.part', final_path)
+    finally:
+        for leftover in (raw_path, final_path + '.part'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    return final_path
+
+
+def prune_snapshots(db_name: str, backup_dir: str, keep_days: int, now: Optional[float] = None) -> List[str]:
+    """מחיקת גיבויים ישנים מ-keep_days ימים - מחזיר את הקבצים שנמחקו"""
+    if not os.path.isdir(backup_dir):
+        return []
+
+    cutoff = (time.time() if now is None else now) - keep_days * 86400
+    pattern = _snapshot_pattern(db_name)
+    removed = []
+    for name in sorted(os.listdir(backup_dir)):
+        if not pattern.fullmatch(name):
+            continue
+        path = os.path.join(backup_dir, name)
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed.append(path)
+    return removed
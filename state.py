@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+מצב השיחה של המשתמשים (שלבי /add וכו') - מוגבל בגודל, עם תפוגה ושמירה אופציונלית למסד
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterator, List, MutableMapping, Optional, Tuple
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class SQLiteStateBackend:
+    """שמירת המצב בטבלת conversation_state - שינויים נצברים ונכתבים ברקע בטרנזקציה אחת"""
+
+    # מחיקת רשומות שפג תוקפן פעם בכך וכך כתיבות
+    PURGE_EVERY = 100
+
+    def __init__(self, db, name: str):
+        self.db = db
+        self.name = name
+        # מפתח -> (ערך JSON, זמן תפוגה) או None למחיקה - רק השינוי האחרון לכל מפתח
+        self._dirty: Dict[Hashable, Optional[Tuple[str, float]]] = {}
+        self._flush_scheduled = False
+        self._flushes = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> List[Tuple[int, Any, float]]:
+        """כל הרשומות שעדיין בתוקף - (מפתח, ערך, שניות שנותרו)"""
+        now = time.time()
+        self.db.execute('DELETE FROM conversation_state WHERE store = ? AND expires_at <= ?', (self.name, now))
+        rows = self.db.fetchall('''
+            SELECT key, value, expires_at FROM conversation_state
+            WHERE store = ?
+            ORDER BY expires_at
+        ''', (self.name,))
+        return [(key, json.loads(value), expires_at - now) for key, value, expires_at in rows]
+
+    def save(self, key: int, value: Any, ttl: float):
+        self._queue(key, (json.dumps(value, ensure_ascii=False), time.time() + ttl))
+
+    def delete(self, key: int):
+        self._queue(key, None)
+
+    def _queue(self, key: int, entry: Optional[Tuple[str, float]]):
+        with self._lock:
+            self._dirty[key] = entry
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self.db.submit_write(self.flush)
+
+    def flush(self):
+        """כתיבת כל השינויים שהצטברו (רץ ב-thread הכתיבה)"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            self._flush_scheduled = False
+        if not dirty:
+            return
+
+        upserts = [(self.name, key, entry[0], entry[1]) for key, entry in dirty.items() if entry is not None]
+        deletes = [(self.name, key) for key, entry in dirty.items() if entry is None]
+        self._flushes += 1
+        with self.db.transaction() as cursor:
+            cursor.executemany('''
+                INSERT INTO conversation_state (store, key, value, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (store, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+            ''', upserts)
+            cursor.executemany('DELETE FROM conversation_state WHERE store = ? AND key = ?', deletes)
+            if self._flushes % self.PURGE_EVERY == 0:
+                cursor.execute('DELETE FROM conversation_state WHERE expires_at <= ?', (time.time(),))
+
+
+class StateStore(MutableMapping):
+    """מילון מצב לפי משתמש - רשומה פגה אחרי ttl שניות, והישנה ביותר מפונה מעבר ל-max_size
+
+    ערכים נשמרים רק בהשמה (store[key] = value), לכן שינוי במקום של ערך לא יישמר למסד.
+    """
+
+    def __init__(self, max_size: int, ttl: float, backend: Optional[SQLiteStateBackend] = None):
+        self.ttl = ttl
+        self.backend = backend
+        # רשומה שמפונה מהזיכרון נמחקת גם מהמסד - כך גם הטבלה מוגבלת בגודל
+        self._cache = TTLCache(max_size, ttl, on_evict=backend.delete if backend is not None else None)
+
+    def load(self) -> int:
+        """טעינת המצב השמור (בהפעלה)"""
+        if self.backend is None:
+            return 0
+        rows = self.backend.load()
+        for key, value, remaining in rows:
+            self._cache.set(key, value, ttl=remaining)
+        return len(rows)
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self._cache.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self._cache.set(key, value)
+        if self.backend is not None:
+            self.backend.save(key, value, self.ttl)
+
+    def __delitem__(self, key: Hashable):
+        if self._cache.get(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+        self._cache.invalidate(key)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter([key for key, _ in self._cache.items()])
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def stats(self):
+        """מונים לניטור"""
+        return self._cache.stats()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+הגדרות משותפות לבדיקות - מסד נתונים זמני עם כל המיגרציות
+"""
+
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config  # noqa: E402
+from database import DatabaseManager  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+
+# בלי הודעות "Database migrated" בכל בדיקה
+logging.getLogger('migrations').setLevel(logging.WARNING)
+
+
+@pytest.fixture
+def db(tmp_path):
+    """מסד נתונים חדש אחרי כל המיגרציות"""
+    manager = DatabaseManager(str(tmp_path / 'todo.db'))
+    run_migrations(manager)
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    """הבוט המתקדם על מסד נתונים זמני (בלי חיבור לטלגרם)"""
+    from run_bot import AdvancedTodoBot
+
+    # קבצי הלוג של הבוט נכתבים לתיקייה הנוכחית
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, 'DATABASE_NAME', str(tmp_path / 'bot.db'))
+    instance = AdvancedTodoBot('123:test')
+    instance.init_database()
+    yield instance
+    instance.chart_renderer.close()
+    instance.db.close()
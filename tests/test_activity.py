@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בדיקות לצבירת הפעילות - כתיבה אחת לתור עד שהיא רצה
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from enhanced_features import ActivityBuffer
+
+
+def test_flush_is_scheduled_once_until_it_runs(db):
+    buffer = ActivityBuffer(db, max_events=10)
+
+    results = [buffer.add(user_id % 3, 'task_created') for user_id in range(50)]
+    # רק האירוע העשירי מבקש כתיבה - האירועים שאחריו מצטרפים לאותה כתיבה
+    assert results.index(True) == 9
+    assert results.count(True) == 1
+
+    assert buffer.flush() == 3
+    assert [buffer.add(1, 'task_completed') for _ in range(10)][-1] is True
+
+
+def test_one_flush_submitted_while_the_writer_is_busy(db):
+    buffer = ActivityBuffer(db, max_events=5)
+    release = threading.Event()
+    db.submit_write(release.wait)
+
+    submitted = []
+    for user_id in range(100):
+        if buffer.add(user_id, 'task_created'):
+            submitted.append(db.submit_write(buffer.flush))
+    release.set()
+
+    assert len(submitted) == 1
+    assert submitted[0].result(timeout=5) == 100
+    assert db.fetchone('SELECT SUM(tasks_created) FROM daily_stats')[0] == 100
+
+
+def test_failed_flush_can_be_scheduled_again(db):
+    buffer = ActivityBuffer(db, max_events=2)
+    assert not buffer.add(1, 'task_created')
+    assert buffer.add(1, 'task_created')
+
+    db.execute('DROP TABLE daily_stats')
+    with pytest.raises(sqlite3.OperationalError):
+        buffer.flush()
+    # המונים חזרו לצבירה והדגל נוקה - האירוע הבא מבקש כתיבה חדשה
+    assert len(buffer) == 1
+    assert buffer.add(1, 'task_created')
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בדיקות לגיבוי ושחזור של משתמש - ייצוא, שחזור והשוואה
+"""
+
+import asyncio
+import gzip
+import io
+import json
+
+import pytest
+
+from config import config
+
+SOURCE_USER = 1
+TARGET_USER = 2
+
+
+def _fill_user(bot, user_id):
+    bot.add_category(user_id, 'פרויקטים')
+    task_ids = bot.add_tasks(user_id, [
+        (f'משימה {i}', 'פרויקטים' if i % 3 else 'עבודה', ['דחוף'] if i % 2 else ['בית', 'q3'])
+        for i in range(120)
+    ])
+    bot.update_task_status(task_ids[0], user_id, 'done')
+    bot.set_task_due(task_ids[1], user_id, '2026-03-01 16:00:00')
+    bot.set_task_priority(task_ids[2], user_id, 1)
+    bot.db.execute('''
+        INSERT INTO recurring_tasks (user_id, content, category, frequency, next_due_date, day_of_month)
+        VALUES (?, 'שכר דירה', 'אישי', 'monthly', '2026-02-28', 31)
+    ''', (user_id,))
+    bot.db.execute('''
+        INSERT INTO daily_stats (user_id, date, tasks_created, tasks_completed, tasks_deleted, productivity_score)
+        VALUES (?, '2026-01-05', 4, 2, 1, 7.5)
+    ''', (user_id,))
+
+
+def _snapshot(bot, user_id):
+    """נתוני המשתמש בלי מזהים - להשוואה בין המקור לשחזור"""
+    fetch = bot.db.fetchall
+    tasks = fetch('''
+        SELECT t.content, t.status, t.category, t.created_at, t.due_at, t.priority, t.due_notified,
+               (SELECT group_concat(name, ',') FROM (
+                    SELECT g.name FROM task_tags tt JOIN tags g ON g.id = tt.tag_id
+                    WHERE tt.task_id = t.id ORDER BY g.name))
+        FROM tasks t WHERE t.user_id = ? ORDER BY t.id
+    ''', (user_id,))
+    return {
+        'tasks': tasks,
+        'categories': fetch('SELECT name, emoji FROM categories WHERE user_id = ? ORDER BY name', (user_id,)),
+        'recurring': fetch('''
+            SELECT content, category, frequency, next_due_date, is_active, day_of_month
+            FROM recurring_tasks WHERE user_id = ? ORDER BY id
+        ''', (user_id,)),
+        'stats': fetch('''
+            SELECT date, tasks_created, tasks_completed, tasks_deleted, productivity_score
+            FROM daily_stats WHERE user_id = ? ORDER BY date
+        ''', (user_id,)),
+    }
+
+
+def _export(bot, user_id) -> bytes:
+    async def export():
+        backup = await bot.backup_user_data(user_id)
+        with backup:
+            return backup.read()
+    return asyncio.run(export())
+
+
+def test_round_trip(bot):
+    _fill_user(bot, SOURCE_USER)
+
+    counts = asyncio.run(bot.restore_user_backup(TARGET_USER, io.BytesIO(_export(bot, SOURCE_USER))))
+
+    assert counts == {'category': 1, 'task': 120, 'task_tag': 180, 'recurring_task': 1, 'stats': 1}
+    assert _snapshot(bot, TARGET_USER) == _snapshot(bot, SOURCE_USER)
+    # גיבוי של המשוחזר זהה לגיבוי המקורי (פרט למזהים ולכותרת)
+    assert _records(_export(bot, TARGET_USER)) == _records(_export(bot, SOURCE_USER))
+
+
+def _records(data: bytes):
+    ignored = {'id', 'user_id', 'task_id', 'created_at', 'updated_at', 'backup_date'}
+    lines = gzip.decompress(data).decode('utf-8').splitlines()
+    return [{key: value for key, value in json.loads(line).items() if key not in ignored} for line in lines]
+
+
+def test_restore_writes_in_chunks_between_other_writes(bot, monkeypatch):
+    monkeypatch.setattr(config.Advanced, 'RESTORE_CHUNK_SIZE', 10)
+    _fill_user(bot, SOURCE_USER)
+    data = _export(bot, SOURCE_USER)
+
+    writes = []
+    bot.db.observer = lambda kind, name, seconds: writes.append(name) if kind == 'write' else None
+
+    async def restore_while_others_write():
+        restore = asyncio.create_task(bot.restore_user_backup(TARGET_USER, io.BytesIO(data)))
+        while not restore.done():
+            await bot.db.write(bot.add_task, 99, 'משתמש אחר')
+        return await restore
+
+    asyncio.run(restore_while_others_write())
+
+    chunks = [i for i, name in enumerate(writes) if name == '_restore_chunk']
+    assert len(chunks) > 10
+    # כתיבות של משתמשים אחרים לא ממתינות לסוף השחזור
+    assert 'add_task' in writes[chunks[0]:chunks[-1]]
+
+
+def test_rejects_other_files(bot):
+    with pytest.raises(ValueError):
+        asyncio.run(bot.restore_user_backup(TARGET_USER, io.BytesIO(gzip.compress(b'{"type": "other"}\n'))))
+    assert bot.db.fetchone('SELECT COUNT(*) FROM tasks')[0] == 0
+
+
+def _target_rows(bot):
+    return {table: bot.db.fetchone(f'SELECT COUNT(*) FROM {table} WHERE user_id = ?', (TARGET_USER,))[0]
+            for table in ('tasks', 'categories', 'recurring_tasks', 'daily_stats')}
+
+
+@pytest.mark.parametrize('corrupt', ['bad_json', 'truncated'])
+def test_corrupt_file_leaves_nothing_behind(bot, monkeypatch, corrupt):
+    monkeypatch.setattr(config.Advanced, 'RESTORE_CHUNK_SIZE', 10)
+    _fill_user(bot, SOURCE_USER)
+    # נתונים קיימים של המשתמש המשוחזר נשארים - גם קטגוריה שמופיעה בגיבוי
+    bot.add_category(TARGET_USER, 'פרויקטים')
+    existing_task = bot.add_task(TARGET_USER, 'משימה קיימת', tags=['בית'])
+    before = _target_rows(bot)
+    tag_links = bot.db.fetchone('SELECT COUNT(*) FROM task_tags')[0]
+
+    data = _export(bot, SOURCE_USER)
+    if corrupt == 'bad_json':
+        lines = gzip.decompress(data).splitlines(keepends=True)
+        # שורה 60 היא משימה - אחרי שמנת הקטגוריות וכמה מנות משימות כבר נכתבו
+        assert json.loads(lines[60])['type'] == 'task'
+        lines[60] = b'{"type": "task", "content": \n'
+        data = gzip.compress(b''.join(lines))
+    else:
+        data = data[:len(data) * 2 // 3]
+
+    writes = []
+    bot.db.observer = lambda kind, name, seconds: writes.append(name) if kind == 'write' else None
+    with pytest.raises((ValueError, EOFError)):
+        asyncio.run(bot.restore_user_backup(TARGET_USER, io.BytesIO(data)))
+
+    assert writes.count('_restore_chunk') > 1
+    assert writes[-1] == '_undo_restore'
+    assert _target_rows(bot) == before
+    assert bot.db.fetchone('SELECT COUNT(*) FROM task_tags')[0] == tag_links
+    assert bot.db.fetchone('SELECT id FROM tasks WHERE user_id = ?', (TARGET_USER,))[0] == existing_task
+    # המקור לא נפגע
+    assert _snapshot(bot, SOURCE_USER)['tasks'][5][0] == 'משימה 5'
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בדיקות לקטגוריות - קטגוריות ברירת מחדל מול קטגוריות של המשתמש
+"""
+
+USER = 1
+
+
+def test_user_category_emoji_overrides_default(bot):
+    defaults = dict(bot.db.fetchall('SELECT name, emoji FROM categories WHERE user_id = 0'))
+    name = 'עבודה'
+    assert name in defaults
+    # אימוג'י שקטן וגדול מזה של ברירת המחדל - MAX(emoji) היה בוחר לפי סדר התווים
+    for emoji in ('⭐', '🚀'):
+        bot.db.execute('DELETE FROM categories WHERE user_id = ?', (USER,))
+        bot.category_cache.invalidate(USER)
+        assert bot.add_category(USER, name, emoji)
+        bot.add_task(USER, 'משימה', name)
+
+        counts = {row[0]: row[1:] for row in bot.get_category_counts(USER)}
+        assert counts[name][0] == bot.get_category_emojis(USER)[name] == emoji
+        assert len(bot.get_category_counts(USER)) == len(counts)
+
+    # משתמש אחר עדיין רואה את ברירת המחדל
+    assert dict((name, emoji) for name, emoji, _ in bot.get_category_counts(USER + 1))[name] == defaults[name]
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בדיקות לעיבוד העדכונים במקביל - סדר בתוך צ'אט, מקביליות בין צ'אטים ודחיית עומס
+"""
+
+import asyncio
+import random
+from datetime import datetime
+
+from telegram import Chat, Message, Update
+
+from concurrency import ChatOrderedUpdateProcessor
+
+
+def _update(update_id: int, chat_id: int) -> Update:
+    chat = Chat(chat_id, Chat.PRIVATE)
+    return Update(update_id, message=Message(update_id, datetime.now(), chat, text='x'))
+
+
+async def _send(processor, updates, handler):
+    """כמו Application - משימה לכל עדכון, לפי סדר ההגעה"""
+    tasks = [asyncio.create_task(processor.process_update(update, handler(update))) for update in updates]
+    await asyncio.gather(*tasks)
+
+
+def test_ordered_per_chat_and_concurrent_across_chats():
+    chats = 20
+    per_chat = 25
+    max_concurrent = 8
+    rng = random.Random(7)
+    # עדכונים מעורבבים מכמה צ'אטים
+    arrivals = [chat_id for chat_id in range(chats) for _ in range(per_chat)]
+    rng.shuffle(arrivals)
+    updates = [_update(update_id, chat_id) for update_id, chat_id in enumerate(arrivals)]
+
+    handled = {chat_id: [] for chat_id in range(chats)}
+    running = {'total': 0, 'max': 0}
+    running_per_chat = {chat_id: 0 for chat_id in range(chats)}
+
+    async def handler(update):
+        chat_id = update.effective_chat.id
+        running_per_chat[chat_id] += 1
+        running['total'] += 1
+        running['max'] = max(running['max'], running['total'])
+        assert running_per_chat[chat_id] == 1
+        await asyncio.sleep(rng.uniform(0, 0.003))
+        handled[chat_id].append(update.update_id)
+        running_per_chat[chat_id] -= 1
+        running['total'] -= 1
+
+    processor = ChatOrderedUpdateProcessor(max_concurrent, max_pending_updates=10000)
+    asyncio.run(_send(processor, updates, handler))
+
+    for chat_id in range(chats):
+        arrived = [update.update_id for update in updates if update.effective_chat.id == chat_id]
+        assert handled[chat_id] == arrived
+    assert 1 < running['max'] <= max_concurrent
+    assert processor.stats() == {'pending': 0, 'active_chats': 0, 'processed': chats * per_chat, 'shed': 0}
+
+
+def test_busy_chat_does_not_hold_slots_of_other_chats():
+    async def scenario():
+        release = asyncio.Event()
+        done = []
+
+        async def handler(update):
+            if update.effective_chat.id == 1:
+                await release.wait()
+            done.append(update.update_id)
+
+        processor = ChatOrderedUpdateProcessor(2, max_pending_updates=100)
+        busy = [asyncio.create_task(processor.process_update(_update(i, 1), handler(_update(i, 1))))
+                for i in range(10)]
+        await asyncio.sleep(0)
+        # צ'אט 1 תקוע עם 10 עדכונים, ועדיין צ'אט אחר מעובד
+        await asyncio.wait_for(processor.process_update(_update(99, 2), handler(_update(99, 2))), 1)
+        release.set()
+        await asyncio.gather(*busy)
+        return done
+
+    done = asyncio.run(scenario())
+    assert done[0] == 99
+    assert done[1:] == list(range(10))
+
+
+def test_updates_are_shed_beyond_max_pending():
+    async def scenario():
+        release = asyncio.Event()
+        started = []
+
+        async def handler(update):
+            started.append(update.update_id)
+            await release.wait()
+
+        processor = ChatOrderedUpdateProcessor(4, max_pending_updates=5)
+        tasks = [asyncio.create_task(processor.process_update(_update(i, i % 3), handler(_update(i, i % 3))))
+                 for i in range(12)]
+        for _ in range(10):
+            await asyncio.sleep(0)
+        stats = processor.stats()
+        release.set()
+        await asyncio.gather(*tasks)
+        return stats, processor.stats(), started
+
+    during, after, started = asyncio.run(scenario())
+    assert during['pending'] == 5
+    assert during['shed'] == 7
+    assert after == {'pending': 0, 'active_chats': 0, 'processed': 5, 'shed': 7}
+    assert sorted(started) == list(range(5))
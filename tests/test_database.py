@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בדיקות למנהל החיבורים - קריאות לא ממתינות לכותב, ולולאת האירועים לא נחסמת
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from config import config
+
+
+def _p99(samples):
+    ordered = sorted(samples)
+    return ordered[int(len(ordered) * 0.99) - 1]
+
+
+def test_reads_and_event_loop_are_not_blocked_by_slow_write(db):
+    db.execute("INSERT INTO tasks (user_id, content) VALUES (1, 'משימה')")
+    release = threading.Event()
+
+    def slow_write():
+        # כתיבה ארוכה שמחזיקה את thread הכתיבה היחיד
+        with db.transaction() as cursor:
+            cursor.execute("INSERT INTO tasks (user_id, content) VALUES (2, 'ארוכה')")
+            release.wait(5)
+
+    async def scenario():
+        write = asyncio.create_task(db.write(slow_write))
+        await asyncio.sleep(0.05)
+
+        # תגובתיות הלולאה - כמה מאחרות יקיצות של 5 אלפיות
+        lags = []
+
+        async def ticker():
+            for _ in range(40):
+                start = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append(time.perf_counter() - start - 0.005)
+
+        async def timed_read():
+            start = time.perf_counter()
+            rows = await db.read(db.fetchall, 'SELECT id FROM tasks WHERE user_id = ?', (1,))
+            assert len(rows) == 1
+            return time.perf_counter() - start
+
+        ticks = asyncio.create_task(ticker())
+        read_latencies = await asyncio.gather(*(timed_read() for _ in range(400)))
+        await ticks
+        in_flight_during = dict(db.in_flight)
+
+        release.set()
+        await write
+        return read_latencies, lags, in_flight_during
+
+    read_latencies, lags, in_flight_during = asyncio.run(scenario())
+
+    assert _p99(read_latencies) < 0.5
+    assert max(lags) < 0.1
+    assert in_flight_during == {'read': 0, 'write': 1}
+    assert db.in_flight == {'read': 0, 'write': 0}
+    # הקריאות רואות רק מה שכבר נכתב
+    assert db.fetchone('SELECT COUNT(*) FROM tasks')[0] == 2
+
+
+def test_in_flight_returns_to_zero_after_errors(db):
+    def fail():
+        raise RuntimeError('boom')
+
+    async def scenario():
+        for operation in (db.read, db.write):
+            assert await operation(db.fetchone, 'SELECT 1') == (1,)
+            with pytest.raises(RuntimeError):
+                await operation(fail)
+        with pytest.raises(RuntimeError):
+            await asyncio.wrap_future(db.submit_write(fail))
+
+    asyncio.run(scenario())
+
+    assert db.in_flight == {'read': 0, 'write': 0}
+
+
+def test_observer_sees_every_operation(db):
+    seen = []
+    db.observer = lambda kind, name, seconds: seen.append((kind, name))
+
+    async def scenario():
+        await db.read(db.fetchone, 'SELECT 1')
+        await db.write(db.execute, "INSERT INTO tasks (user_id, content) VALUES (1, 'x')")
+
+    asyncio.run(scenario())
+
+    assert seen == [('read', 'fetchone'), ('write', 'execute')]
+
+
+@pytest.mark.parametrize('operations', [50, 500])
+def test_connections_do_not_grow_with_operations(bot, operations):
+    async def scenario():
+        for i in range(operations):
+            task_id = await bot.db.write(bot.add_task, 1, f'משימה {i}', 'עבודה')
+            await asyncio.gather(
+                bot.db.read(bot.get_tasks, 1),
+                bot.db.read(bot.get_category_counts, 1),
+                bot.db.read(bot.get_task, task_id, 1),
+            )
+            await bot.db.write(bot.update_task_status, task_id, 1, 'done')
+
+    asyncio.run(scenario())
+
+    # חיבור קבוע אחד ל-thread: ה-thread הראשי, thread הכתיבה ו-threads הקריאה
+    assert bot.db.connect_count <= 2 + config.Advanced.DATABASE_READ_THREADS
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בדיקות למיגרציות - גרסת הסכמה, ושהשאילתות החמות משתמשות באינדקסים (בלי SCAN)
+"""
+
+import os
+import re
+import sqlite3
+from datetime import date
+
+import pytest
+
+from database import DatabaseManager
+from migrations import MIGRATIONS, dump_schema, run_migrations
+from recurring import RecurringTaskMaterializer
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'schema.sql')
+
+# SCAN של טבלה או אינדקס שלם - לא של תת-שאילתה שכבר חושבה
+FULL_SCAN = re.compile(r'^SCAN (?!\(subquery|CONSTANT ROW)')
+
+# (המיגרציה שהאינדקס שלה משרת את השאילתה, קריאה) - הקריאה מקבלת את הבוט ומזהי משימות קיימות
+HOT_QUERIES = {
+    'get_tasks': (2, lambda bot, ids: bot.get_tasks(1)),
+    'get_tasks by category': (2, lambda bot, ids: bot.get_tasks(1, 'עבודה')),
+    'get_task_summary': (2, lambda bot, ids: bot.get_task_summary(1)),
+    'get_category_counts': (2, lambda bot, ids: bot.get_category_counts(1)),
+    'daily_stats range (get_user_statistics)': (2, lambda bot, ids: bot.get_user_statistics(1)),
+    'daily_stats range (get_chart_data)': (2, lambda bot, ids: bot.get_chart_data(1)),
+    'get_tasks_page first page': (3, lambda bot, ids: bot.get_tasks_page(1)),
+    'get_tasks_page next page': (3, lambda bot, ids: bot.get_tasks_page(1, None, ids[2])),
+    'get_tasks_page previous page in category': (3, lambda bot, ids: bot.get_tasks_page(1, 'עבודה', ids[2], True)),
+    'get_reminder_batch': (4, lambda bot, ids: bot.get_reminder_batch(0, 100)),
+    'get_reminder_counts': (4, lambda bot, ids: bot.get_reminder_counts([1, 2])),
+    'recurring due rules': (7, lambda bot, ids: RecurringTaskMaterializer(bot.db, 10, 7).run_batch(date(2026, 1, 1))),
+    'get_next_tasks': (8, lambda bot, ids: bot.get_next_tasks(1, 10)),
+    'get_tasks_due_before': (8, lambda bot, ids: bot.get_tasks_due_before(1, '2026-12-01 00:00:00')),
+    'get_pending_deadlines': (8, lambda bot, ids: bot.get_pending_deadlines(None, '2026-12-01 00:00:00')),
+    'get_tag_counts': (9, lambda bot, ids: bot.get_tag_counts(1, 30)),
+    'get_tasks_by_tag': (9, lambda bot, ids: bot.get_tasks_by_tag(1, 'דחוף', 10)),
+}
+
+
+def test_migrations_reach_latest_version(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'todo.db'))
+    try:
+        assert run_migrations(db) == MIGRATIONS[-1][0]
+        assert db.fetchone('PRAGMA user_version')[0] == MIGRATIONS[-1][0]
+        # הרצה חוזרת לא עושה כלום
+        assert run_migrations(db) == MIGRATIONS[-1][0]
+    finally:
+        db.close()
+
+
+def test_migration_versions_are_sequential():
+    assert [version for version, _, _ in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1))
+
+
+def _require_fts(db):
+    if db.fetchone("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'") is None:
+        pytest.skip('SQLite built without FTS5 - schema.sql is generated with it')
+
+
+def test_schema_sql_matches_migrations(db):
+    _require_fts(db)
+    with open(SCHEMA_PATH, encoding='utf-8') as schema:
+        # אחרי שינוי במיגרציות: python migrations.py > schema.sql
+        assert schema.read() == dump_schema(db)
+
+
+def test_schema_sql_creates_the_same_database(db):
+    _require_fts(db)
+    conn = sqlite3.connect(':memory:')
+    try:
+        with open(SCHEMA_PATH, encoding='utf-8') as schema:
+            conn.executescript(schema.read())
+        objects = 'SELECT type, name FROM sqlite_master ORDER BY type, name'
+        assert conn.execute(objects).fetchall() == db.fetchall(objects)
+    finally:
+        conn.close()
+
+
+def _query_plans(bot, call):
+    """תוכנית הביצוע של כל שאילתת SELECT שהקריאה הריצה"""
+    conn = bot.db.connection
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+
+    plans = {}
+    for sql in statements:
+        if sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            plans[sql] = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+    return plans
+
+
+@pytest.mark.parametrize('name', list(HOT_QUERIES))
+def test_hot_query_uses_indexes(bot, name):
+    migration, query = HOT_QUERIES[name]
+    task_ids = bot.add_tasks(1, [(f'משימה {i}', 'עבודה' if i % 2 else 'אישי', ['דחוף']) for i in range(6)])
+
+    plans = _query_plans(bot, lambda: query(bot, task_ids))
+
+    assert plans, f'{name} ran no SELECT'
+    for sql, plan in plans.items():
+        scans = [step for step in plan if FULL_SCAN.match(step) or 'AUTOMATIC' in step]
+        assert not scans, f'{name} (migration {migration}): {scans}\n{sql}'
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בדיקות לתור השליחה - קצב גלובלי, מרווח לכל צ'אט, RetryAfter ושגיאות סופיות
+"""
+
+import asyncio
+from collections import defaultdict
+
+from telegram.error import BadRequest, Forbidden, RetryAfter, TimedOut
+
+from notifications import RateLimitedSender
+
+# סטייה מותרת של שעון הלולאה (שניות)
+SLACK = 0.002
+
+
+class FakeBot:
+    """send_message שמתעד זמני שליחה - errors[chat_id] הן שגיאות לזרוק בניסיונות הבאים"""
+
+    def __init__(self, errors=None):
+        self.errors = {chat_id: list(chat_errors) for chat_id, chat_errors in (errors or {}).items()}
+        self.attempts = defaultdict(int)
+        self.delivered = []  # (זמן, chat_id, text)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        loop = asyncio.get_running_loop()
+        self.attempts[chat_id] += 1
+        pending = self.errors.get(chat_id)
+        if pending:
+            raise pending.pop(0)
+        self.delivered.append((loop.time(), chat_id, text))
+
+
+async def _send_all(sender, messages):
+    await sender.start()
+    for chat_id, text in messages:
+        await sender.send(chat_id, text)
+    await sender.join()
+    await sender.stop()
+
+
+def test_global_rate_and_per_chat_interval():
+    bot = FakeBot()
+    sender = RateLimitedSender(bot, global_rate=200, per_chat_interval=0.05, workers=8, max_queue=100)
+    messages = [(chat_id, f'{chat_id}-{i}') for i in range(4) for chat_id in range(10)]
+
+    asyncio.run(_send_all(sender, messages))
+
+    assert sorted(text for _, _, text in bot.delivered) == sorted(text for _, text in messages)
+    # worker שמתעורר באיחור מקצר את הפער הבא, אבל אף שליחה לא מקדימה את החלון שלה
+    times = [moment for moment, _, _ in bot.delivered]
+    assert all(moment - times[0] >= k / 200 - SLACK for k, moment in enumerate(times))
+    per_chat = defaultdict(list)
+    for moment, chat_id, _ in bot.delivered:
+        per_chat[chat_id].append(moment)
+    for chat_times in per_chat.values():
+        assert all(later - earlier >= 0.05 - SLACK for earlier, later in zip(chat_times, chat_times[1:]))
+    assert sender.stats() == {'queued': 0, 'sent': 40, 'failed': 0, 'retried': 0, 'dropped': 0}
+
+
+def test_retry_after_pauses_all_sends_and_delivers_once():
+    bot = FakeBot({1: [RetryAfter(0.2)]})
+    sender = RateLimitedSender(bot, global_rate=1000, per_chat_interval=0, workers=4, max_queue=100)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await _send_all(sender, [(1, 'first')] + [(chat_id, 'other') for chat_id in range(2, 12)])
+        return start
+
+    start = asyncio.run(scenario())
+
+    assert bot.attempts[1] == 2
+    assert [text for _, chat_id, text in bot.delivered if chat_id == 1] == ['first']
+    assert len(bot.delivered) == 11
+    # כל מה שנשלח אחרי ההגבלה ממתין עד סוף ההשהיה
+    first_retry = min(moment for moment, chat_id, _ in bot.delivered if chat_id == 1)
+    assert first_retry - start >= 0.2 - SLACK
+    assert sender.stats()['retried'] == 1
+
+
+def test_forbidden_and_bad_request_are_not_retried():
+    bot = FakeBot({1: [Forbidden('bot was blocked by the user')], 2: [BadRequest('chat not found')]})
+    sender = RateLimitedSender(bot, global_rate=1000, per_chat_interval=0, workers=2, max_queue=100)
+
+    asyncio.run(_send_all(sender, [(1, 'a'), (2, 'b'), (3, 'c')]))
+
+    assert bot.attempts == {1: 1, 2: 1, 3: 1}
+    assert [chat_id for _, chat_id, _ in bot.delivered] == [3]
+    assert sender.stats() == {'queued': 0, 'sent': 1, 'failed': 2, 'retried': 0, 'dropped': 0}
+
+
+def test_network_errors_are_retried_with_backoff_up_to_the_limit():
+    bot = FakeBot({1: [TimedOut()] * 10, 2: [TimedOut(), TimedOut()]})
+    sender = RateLimitedSender(bot, global_rate=1000, per_chat_interval=0, workers=2, max_queue=100,
+                               max_retries=3, retry_backoff=0.01)
+
+    asyncio.run(_send_all(sender, [(1, 'gives up'), (2, 'recovers')]))
+
+    assert bot.attempts[1] == 4
+    assert bot.attempts[2] == 3
+    assert [chat_id for _, chat_id, _ in bot.delivered] == [2]
+    assert sender.stats() == {'queued': 0, 'sent': 1, 'failed': 1, 'retried': 5, 'dropped': 0}
+
+
+def test_stop_drains_queue_then_counts_dropped():
+    async def scenario(drain_timeout):
+        bot = FakeBot()
+        sender = RateLimitedSender(bot, global_rate=100, per_chat_interval=0, workers=2, max_queue=100)
+        await sender.start()
+        for chat_id in range(20):
+            await sender.send(chat_id, 'x')
+        await sender.stop(drain_timeout)
+        return len(bot.delivered), sender.stats()
+
+    delivered, stats = asyncio.run(scenario(drain_timeout=5))
+    assert delivered == 20
+    assert stats['dropped'] == 0
+
+    # 20 הודעות בקצב 100 לשנייה לוקחות כ-0.2 שניות
+    delivered, stats = asyncio.run(scenario(drain_timeout=0.05))
+    assert stats['dropped'] > 0
+    assert delivered + stats['dropped'] <= 20
+    assert stats['queued'] == 0
+
+
+def test_throughput_with_many_chats():
+    """מדידת קצב: 300 הודעות ל-300 צ'אטים בקצב גלובלי של 1000 לשנייה"""
+    bot = FakeBot()
+    sender = RateLimitedSender(bot, global_rate=1000, per_chat_interval=1.0, workers=8, max_queue=50)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await _send_all(sender, [(chat_id, 'x') for chat_id in range(300)])
+        return loop.time() - start
+
+    elapsed = asyncio.run(scenario())
+
+    assert len(bot.delivered) == 300
+    assert 0.3 - SLACK <= elapsed < 1.5
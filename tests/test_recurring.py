@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בדיקות ליצירת משימות ממשימות חוזרות
+"""
+
+from datetime import date
+
+from recurring import RecurringTaskMaterializer, next_occurrence
+
+
+def _add_rule(db, frequency, next_due_date, day_of_month=None):
+    cursor = db.execute('''
+        INSERT INTO recurring_tasks (user_id, content, category, frequency, next_due_date, day_of_month)
+        VALUES (1, 'חוזרת', 'כללי', ?, ?, ?)
+    ''', (frequency, next_due_date, day_of_month))
+    return cursor.lastrowid
+
+
+def test_next_occurrence_keeps_day_of_month():
+    assert next_occurrence(date(2026, 1, 31), 'monthly') == date(2026, 2, 28)
+    assert next_occurrence(date(2026, 2, 28), 'monthly', 31) == date(2026, 3, 31)
+    assert next_occurrence(date(2026, 12, 15), 'monthly') == date(2027, 1, 15)
+    assert next_occurrence(date(2026, 1, 1), 'yearly') is None
+
+
+def test_monthly_rule_is_not_shifted_by_short_month(db):
+    rule_id = _add_rule(db, 'monthly', '2026-01-31')
+    materializer = RecurringTaskMaterializer(db, batch_size=100, max_catch_up=10)
+
+    assert materializer.run_batch(date(2026, 4, 30)) == 1
+
+    assert db.fetchone('SELECT COUNT(*) FROM tasks')[0] == 4  # 31/1, 28/2, 31/3, 30/4
+    assert db.fetchone('SELECT next_due_date, day_of_month FROM recurring_tasks WHERE id = ?',
+                       (rule_id,)) == ('2026-05-31', 31)
+
+
+def test_monthly_rule_across_runs(db):
+    rule_id = _add_rule(db, 'monthly', '2026-01-31', 31)
+    materializer = RecurringTaskMaterializer(db, batch_size=100, max_catch_up=10)
+
+    for today in (date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31)):
+        materializer.run_batch(today)
+        # ריצה חוזרת באותו יום לא יוצרת כפילויות
+        assert materializer.run_batch(today) == 0
+
+    assert db.fetchone('SELECT COUNT(*) FROM tasks')[0] == 3
+    assert db.fetchone('SELECT next_due_date FROM recurring_tasks WHERE id = ?', (rule_id,))[0] == '2026-04-30'
+
+
+def test_catch_up_is_capped(db):
+    _add_rule(db, 'daily', '2026-01-01')
+    materializer = RecurringTaskMaterializer(db, batch_size=100, max_catch_up=7)
+
+    materializer.run_batch(date(2026, 1, 30))
+
+    assert db.fetchone('SELECT COUNT(*) FROM tasks')[0] == 7
+    assert materializer.stats() == {'created': 7, 'skipped': 23, 'deactivated': 0}
+
+
+def test_invalid_rule_is_deactivated(db):
+    rule_id = _add_rule(db, 'hourly', '2026-01-01')
+    materializer = RecurringTaskMaterializer(db, batch_size=100, max_catch_up=7)
+
+    materializer.run_batch(date(2026, 1, 2))
+
+    assert db.fetchone('SELECT is_active FROM recurring_tasks WHERE id = ?', (rule_id,))[0] == 0
+    assert materializer.run_batch(date(2026, 1, 2)) == 0
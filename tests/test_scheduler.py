@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בדיקות לתזמון התזכורות - סימולציה של ימים שלמים, כולל מעברי שעון קיץ - ולמועדי יעד
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytz
+
+from scheduler import DeadlineScheduler, ReminderScheduler, parse_due_date, to_db_time, utc_minutes_of_day
+
+TIMEZONES = (
+    'Asia/Jerusalem', 'Europe/London', 'America/New_York', 'America/Los_Angeles', 'Asia/Tokyo',
+    'Australia/Sydney', 'Pacific/Auckland', 'UTC', 'Asia/Kolkata', 'America/Sao_Paulo',
+)
+TIMES = tuple(f'{hour:02d}:{minute:02d}' for hour in range(24) for minute in (0, 30))
+USERS = 50000
+
+
+def _preferences():
+    return [(user_id, TIMES[user_id % len(TIMES)], TIMEZONES[user_id // len(TIMES) % len(TIMEZONES)], True)
+            for user_id in range(USERS)]
+
+
+def _expected(reminder_time, timezone, start, end):
+    """המועדים ב-UTC שבהם התזכורת צריכה להישלח בין start ל-end - אחד לכל יום מקומי"""
+    tz = pytz.timezone(timezone)
+    at = datetime.strptime(reminder_time, '%H:%M').time()
+    moments = []
+    day = start.date() - timedelta(days=1)
+    while day <= end.date() + timedelta(days=1):
+        moment = tz.localize(datetime.combine(day, at)).astimezone(pytz.utc)
+        if start <= moment < end:
+            moments.append(moment)
+        day += timedelta(days=1)
+    return moments
+
+
+def _simulate(scheduler, start, days):
+    """קריאה ל-due בכל דקה, כמו ה-job - {משתמש: המועדים שבהם נשלחה לו תזכורת}"""
+    sent = defaultdict(list)
+    now = start
+    end = start + timedelta(days=days)
+    while now < end:
+        user_ids, _ = scheduler.due(now)
+        for user_id in user_ids:
+            sent[user_id].append(now)
+        now += timedelta(minutes=1)
+    return sent
+
+
+@pytest.mark.parametrize('start', [
+    '2026-03-07',  # ארה"ב עוברת לשעון קיץ ב-8/3
+    '2026-03-26',  # ישראל ב-27/3, אירופה ב-29/3
+    '2026-04-04',  # סידני ואוקלנד חוזרות לשעון חורף ב-5/4
+    '2026-10-24',  # אירופה חוזרת לשעון חורף ב-25/10, ישראל ב-25/10
+    '2026-06-10',  # בלי מעברים
+])
+def test_each_user_is_reminded_once_per_local_day(start):
+    start = pytz.utc.localize(datetime.strptime(start, '%Y-%m-%d'))
+    days = 4
+    preferences = _preferences()
+    scheduler = ReminderScheduler('09:00', 'Asia/Jerusalem')
+    scheduler.load(preferences, start.date())
+
+    sent = _simulate(scheduler, start, days)
+
+    expected_cache = {}
+    for user_id, reminder_time, timezone, _ in preferences:
+        key = (reminder_time, timezone)
+        if key not in expected_cache:
+            expected_cache[key] = _expected(reminder_time, timezone, start, start + timedelta(days=days))
+        assert sent.get(user_id, []) == expected_cache[key], (user_id, reminder_time, timezone)
+
+
+def test_minutes_around_offset_change():
+    # 21:00 בניו יורק נופל ב-UTC ביום המקומי הבא - ההפרש הוא של היום המקומי, לא של תאריך ה-UTC
+    assert utc_minutes_of_day('21:00', 'America/New_York', date(2026, 3, 8)) == (2 * 60,)
+    assert utc_minutes_of_day('21:00', 'America/New_York', date(2026, 3, 9)) == (1 * 60,)
+    # במעברים באוקלנד יממת UTC אחת בלי מופע, ואחרת עם שניים (של שני ימים מקומיים)
+    assert utc_minutes_of_day('12:30', 'Pacific/Auckland', date(2026, 4, 4)) == ()
+    assert utc_minutes_of_day('12:30', 'Pacific/Auckland', date(2026, 9, 26)) == (30, 23 * 60 + 30)
+    assert utc_minutes_of_day('09:00', 'UTC', date(2026, 1, 1)) == (9 * 60,)
+
+
+def test_set_and_remove_user():
+    scheduler = ReminderScheduler('09:00', 'Asia/Jerusalem')
+    now = pytz.utc.localize(datetime(2026, 6, 10, 5, 0))
+    scheduler.load([(1, '08:00', 'Asia/Jerusalem', True), (2, '08:00', 'Asia/Jerusalem', False)], now.date())
+    assert len(scheduler) == 1
+
+    scheduler.set_user(3, '09:00', 'Europe/London')
+    assert scheduler.due(now) == ([1], False)
+    assert len(scheduler) == 2
+
+    scheduler.remove_user(3)
+    scheduler.set_user(1, '07:00', 'Asia/Jerusalem', enabled=False)
+    assert len(scheduler) == 0
+    # 06:00 UTC היא 09:00 בישראל - שעת ברירת המחדל
+    assert scheduler.due(now + timedelta(hours=1)) == ([], True)
+
+
+def test_missed_minutes_are_caught_up():
+    scheduler = ReminderScheduler('09:00', 'Asia/Jerusalem')
+    start = pytz.utc.localize(datetime(2026, 6, 10, 6, 0))
+    scheduler.load([(user_id, f'09:{user_id:02d}', 'Asia/Jerusalem', True) for user_id in range(30)], start.date())
+
+    scheduler.due(start)
+    # עיכוב של 20 דקות - רק 15 האחרונות מושלמות
+    user_ids, include_default = scheduler.due(start + timedelta(minutes=20))
+
+    assert sorted(user_ids) == list(range(6, 21))
+    assert not include_default  # 06:00 UTC כבר לא בטווח
+
+
+def _due(args, now, timezone='Asia/Jerusalem'):
+    due = parse_due_date(args, timezone, '09:00', pytz.timezone(timezone).localize(now))
+    return due.replace(tzinfo=None)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('היום', date(2026, 3, 15)),
+    ('today', date(2026, 3, 15)),
+    ('מחר', date(2026, 3, 16)),
+    ('Tomorrow', date(2026, 3, 16)),
+    ('מחרתיים', date(2026, 3, 17)),
+    ('25/12', date(2026, 12, 25)),
+    ('15/03', date(2026, 3, 15)),  # היום עצמו - לא שנה הבאה
+    ('14/03', date(2027, 3, 14)),  # עבר השנה - בשנה הבאה
+    ('01/01', date(2027, 1, 1)),
+    ('5/4', date(2026, 4, 5)),
+    ('25/12/2027', date(2027, 12, 25)),
+    ('25/12/27', date(2027, 12, 25)),
+    ('2027-12-25', date(2027, 12, 25)),
+    ('25.12.2027', date(2027, 12, 25)),
+])
+def test_parse_due_date_days(text, expected):
+    assert _due([text], datetime(2026, 3, 15, 12, 0)) == datetime.combine(expected, datetime.min.time()).replace(hour=9)
+
+
+def test_parse_due_date_time_and_timezone():
+    assert _due(['25/12', '14:30'], datetime(2026, 3, 15, 12, 0)) == datetime(2026, 12, 25, 14, 30)
+    due = parse_due_date(['מחר', '08:00'], 'America/New_York', '09:00',
+                         pytz.utc.localize(datetime(2026, 3, 15, 2, 0)))
+    # 02:00 UTC הוא עדיין 14/03 בניו יורק
+    assert due.astimezone(pytz.utc) == pytz.utc.localize(datetime(2026, 3, 15, 12, 0))
+
+
+@pytest.mark.parametrize('today, expected', [
+    (datetime(2026, 3, 15), date(2028, 2, 29)),
+    (datetime(2028, 1, 10), date(2028, 2, 29)),
+    (datetime(2028, 2, 29), date(2028, 2, 29)),
+    (datetime(2028, 3, 1), date(2032, 2, 29)),
+])
+def test_parse_due_date_leap_day(today, expected):
+    assert _due(['29/02'], today).date() == expected
+
+
+@pytest.mark.parametrize('args', [
+    [], ['25/12', '14:00', 'extra'], ['32/01'], ['30/02'], ['25/13'], ['00/05'], ['25/12/'], ['/12'],
+    ['25-12'], ['abc'], ['25/12', '25:00'], ['25/12', 'noon'], ['29/02/2027'],
+])
+def test_parse_due_date_rejects_invalid(args):
+    with pytest.raises(ValueError):
+        _due(args, datetime(2026, 3, 15, 12, 0))
+
+
+def test_deadline_scheduler_pops_in_due_order():
+    now = pytz.utc.localize(datetime(2026, 6, 10, 12, 0))
+    scheduler = DeadlineScheduler(lead=timedelta(minutes=30), window=timedelta(hours=2))
+    assert scheduler.next_window(now) == (None, to_db_time(now + timedelta(hours=2, minutes=30)))
+
+    minutes = [50, 10, 40, 5, 120, 20, 35, 30]
+    scheduler.load([(task_id, to_db_time(now + timedelta(minutes=offset)))
+                    for task_id, offset in enumerate(minutes)], to_db_time(now + timedelta(hours=2, minutes=30)))
+    # מועד מחוץ לחלון שנטען לא נכנס לערימה - ייטען בחלון הבא
+    scheduler.push(100, to_db_time(now + timedelta(hours=3)))
+    scheduler.push(101, to_db_time(now + timedelta(minutes=15)))
+    assert len(scheduler) == len(minutes) + 1
+    assert scheduler.next_window(now) is None
+
+    task_ids, limit = scheduler.due(now)
+    assert task_ids == [3, 1, 101, 5, 7]
+    assert limit == to_db_time(now + timedelta(minutes=30))
+    assert scheduler.due(now + timedelta(minutes=15)) == ([6, 2], to_db_time(now + timedelta(minutes=45)))
+    assert scheduler.due(now + timedelta(minutes=15))[0] == []
+    assert scheduler.due(now + timedelta(minutes=20))[0] == [0]
+
+    # אחרי שעה וחצי החלון הבא נטען מהגבול הקודם
+    later = now + timedelta(hours=1, minutes=30)
+    assert scheduler.next_window(later) == (to_db_time(now + timedelta(hours=2, minutes=30)),
+                                           to_db_time(later + timedelta(hours=2, minutes=30)))
+
+
+def test_stale_deadlines_are_skipped_when_claimed(bot):
+    user_id = 7
+    now = pytz.utc.localize(datetime(2026, 6, 10, 12, 0))
+    task_ids = [bot.add_task(user_id, f'task {i}') for i in range(4)]
+    for task_id, offset in zip(task_ids, (10, 20, 25, 100)):
+        bot.set_task_due(task_id, user_id, to_db_time(now + timedelta(minutes=offset)))
+
+    scheduler = DeadlineScheduler(lead=timedelta(minutes=30), window=timedelta(hours=2))
+    after, until = scheduler.next_window(now)
+    scheduler.load(bot.get_pending_deadlines(after, until), until)
+
+    # אחרי הטעינה: משימה אחת נסגרה ומועד של אחרת נדחה - הרשומות שלהן בערימה התיישנו
+    bot.update_task_status(task_ids[0], user_id, 'done')
+    bot.set_task_due(task_ids[1], user_id, to_db_time(now + timedelta(hours=1)))
+
+    due_ids, limit = scheduler.due(now)
+    assert due_ids == task_ids[:3]
+    claimed = bot.claim_due_notifications(due_ids, limit)
+    assert [row[1] for row in claimed] == [task_ids[2]]
+    # התראה לא נשלחת פעמיים
+    assert bot.claim_due_notifications(due_ids, limit) == []
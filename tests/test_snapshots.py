@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בדיקות לגיבוי החם של המסד כולו
+"""
+
+import gzip
+import os
+import sqlite3
+import threading
+import time
+
+from snapshots import create_snapshot, prune_snapshots
+
+
+def _fill(db, tasks=5000):
+    with db.transaction() as cursor:
+        cursor.executemany('INSERT INTO tasks (user_id, content) VALUES (?, ?)',
+                           [(i % 50, 'משימה ' + 'x' * 200) for i in range(tasks)])
+
+
+def _page_count(db):
+    return db.fetchone('PRAGMA page_count')[0]
+
+
+def _restore(path, tmp_path):
+    restored = str(tmp_path / 'restored.db')
+    with gzip.open(path, 'rb') as compressed, open(restored, 'wb') as out:
+        out.write(compressed.read())
+    return sqlite3.connect(restored)
+
+
+def test_snapshot_is_complete(db, tmp_path):
+    _fill(db)
+
+    path = create_snapshot(db.db_name, str(tmp_path / 'backups'), pages=64, sleep=0)
+
+    conn = _restore(path, tmp_path)
+    try:
+        assert conn.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+        assert conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0] == 5000
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == db.fetchone('PRAGMA user_version')[0]
+    finally:
+        conn.close()
+    assert os.listdir(tmp_path / 'backups') == [os.path.basename(path)]
+
+
+def test_snapshot_pauses_between_steps(db, tmp_path):
+    _fill(db)
+    steps = -(-_page_count(db) // 16)
+
+    start = time.perf_counter()
+    create_snapshot(db.db_name, str(tmp_path / 'backups'), pages=16, sleep=0.002)
+
+    assert time.perf_counter() - start >= (steps - 1) * 0.002
+
+
+def test_writers_are_not_stalled(db, tmp_path):
+    _fill(db)
+    steps = -(-_page_count(db) // 4)
+    latencies = []
+    done = threading.Event()
+
+    def writer():
+        while not done.is_set():
+            start = time.perf_counter()
+            db.execute("INSERT INTO tasks (user_id, content) VALUES (999, 'בזמן הגיבוי')")
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.001)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        path = create_snapshot(db.db_name, str(tmp_path / 'backups'), pages=4, sleep=0.002)
+    finally:
+        done.set()
+        thread.join()
+
+    # ההעתקה נמשכת לפחות steps * sleep - הכותב המשיך לעבוד לאורך כולה
+    assert len(latencies) > steps // 10
+    assert max(latencies) < 0.25
+    # הגיבוי הוא תמונת המצב שמתחילת ההעתקה, בלי הכתיבות שבאו אחריה
+    conn = _restore(path, tmp_path)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM tasks WHERE user_id = 999').fetchone()[0] < len(latencies)
+    finally:
+        conn.close()
+
+
+def test_prune_keeps_recent_snapshots(db, tmp_path):
+    backup_dir = str(tmp_path / 'backups')
+    old = create_snapshot(db.db_name, backup_dir, pages=64, sleep=0)
+    os.utime(old, (time.time() - 10 * 86400,) * 2)
+    unrelated = os.path.join(backup_dir, 'other_20260101_000000.db.gz')
+    open(unrelated, 'wb').close()
+    os.utime(unrelated, (time.time() - 10 * 86400,) * 2)
+
+    assert prune_snapshots(db.db_name, backup_dir, keep_days=7) == [old]
+    assert os.listdir(backup_dir) == ['other_20260101_000000.db.gz']
+
+
+def test_prune_ignores_databases_with_a_shared_prefix(tmp_path):
+    backup_dir = tmp_path / 'backups'
+    backup_dir.mkdir()
+    names = [
+        'todo_20260101_000000.db.gz',
+        'todo_tasks_20260101_000000.db.gz',  # todo_tasks.db - מתחיל ב-todo_
+        'todo_20260101_000000.db.gz.part',
+        'todo_backup.db.gz',
+    ]
+    for name in names:
+        path = backup_dir / name
+        path.touch()
+        os.utime(path, (time.time() - 10 * 86400,) * 2)
+
+    assert prune_snapshots('todo.db', str(backup_dir), keep_days=7) == [str(backup_dir / names[0])]
+    assert prune_snapshots('data/todo_tasks.db', str(backup_dir), keep_days=7) == [str(backup_dir / names[1])]
+    assert sorted(os.listdir(backup_dir)) == sorted(names[2:])
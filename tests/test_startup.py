@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בדיקות לזמן העלייה - ספריות הגרפים נטענות רק בציור הגרף הראשון
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# תקציב נדיב - נמדדו 0.35-0.45 שניות; טעינת matplotlib מראש מוסיפה כ-0.4
+IMPORT_BUDGET_SECONDS = 2.0
+
+HEAVY_MODULES = ('matplotlib', 'numpy', 'seaborn', 'PIL')
+
+
+def _import_in_subprocess(module: str):
+    """(זמן הייבוא המצטבר בשניות, המודולים הכבדים שנטענו) בתהליך נקי"""
+    code = f'import sys, {module}; print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=REPO_DIR, capture_output=True, text=True, timeout=60, check=True
+    )
+    # import time: self [us] | cumulative | imported package
+    match = re.search(rf'^import time:\s+\d+ \|\s+(\d+) \| {module}$', result.stderr, re.MULTILINE)
+    assert match, result.stderr[-2000:]
+    return int(match.group(1)) / 1e6, [name for name in result.stdout.strip().split(',') if name]
+
+
+def test_run_bot_does_not_load_plotting_stack():
+    seconds, heavy = _import_in_subprocess('run_bot')
+
+    assert heavy == []
+    assert seconds < IMPORT_BUDGET_SECONDS
+
+
+def test_enhanced_features_does_not_load_plotting_stack():
+    _, heavy = _import_in_subprocess('enhanced_features')
+
+    assert heavy == []
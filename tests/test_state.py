@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בדיקות למצב השיחה - גודל חסום, תפוגה, ושמירה בין הפעלות
+"""
+
+import threading
+import time
+
+from state import SQLiteStateBackend, StateStore
+
+
+def _drain(db):
+    """המתנה לכל הכתיבות שנשלחו ל-thread הכתיבה (הוא מריץ אותן לפי הסדר)"""
+    db.submit_write(lambda: None).result()
+
+
+def _rows(db, store='user_states'):
+    return db.fetchone('SELECT COUNT(*) FROM conversation_state WHERE store = ?', (store,))[0]
+
+
+def test_one_shot_users_do_not_grow_memory_or_table(db):
+    max_size = 1000
+    store = StateStore(max_size, 3600, SQLiteStateBackend(db, 'user_states'))
+
+    # מיליון משתמשים שמתחילים שיחה ולא מסיימים אותה
+    for user_id in range(1_000_000):
+        store[user_id] = 'waiting_task_content'
+    _drain(db)
+
+    assert len(store) == max_size
+    assert store.stats()['evictions'] == 1_000_000 - max_size
+    # רשומה שמפונה מהזיכרון נמחקת גם מהמסד
+    assert _rows(db) == max_size
+    assert sorted(store) == list(range(1_000_000 - max_size, 1_000_000))
+
+
+def test_state_survives_restart(db):
+    store = StateStore(100, 3600, SQLiteStateBackend(db, 'pending_tasks'))
+    store[1] = {'content': 'לקנות חלב'}
+    store[2] = {'tasks': [['a', None, ['x']], ['b', 'עבודה', []]]}
+    store[3] = {'content': 'נמחק'}
+    del store[3]
+    _drain(db)
+
+    restarted = StateStore(100, 3600, SQLiteStateBackend(db, 'pending_tasks'))
+    assert restarted.load() == 2
+    assert dict(restarted) == {1: {'content': 'לקנות חלב'}, 2: {'tasks': [['a', None, ['x']], ['b', 'עבודה', []]]}}
+    # מאגר אחר באותה טבלה לא מושפע
+    assert StateStore(100, 3600, SQLiteStateBackend(db, 'user_states')).load() == 0
+
+
+def test_expired_state_is_not_restored(db):
+    store = StateStore(100, 0.2, SQLiteStateBackend(db, 'user_states'))
+    store[1] = 'waiting_task_content'
+    _drain(db)
+    assert store.get(1) == 'waiting_task_content'
+
+    time.sleep(0.3)
+
+    assert store.get(1) is None
+    restarted = StateStore(100, 0.2, SQLiteStateBackend(db, 'user_states'))
+    assert restarted.load() == 0
+    assert _rows(db) == 0
+
+
+def test_restored_entries_keep_remaining_ttl(db):
+    store = StateStore(100, 0.5, SQLiteStateBackend(db, 'user_states'))
+    store[1] = 'waiting_category_name'
+    _drain(db)
+    time.sleep(0.3)
+
+    restarted = StateStore(100, 0.5, SQLiteStateBackend(db, 'user_states'))
+    assert restarted.load() == 1
+    time.sleep(0.3)
+    # התפוגה נמדדת מההשמה המקורית, לא מההפעלה מחדש
+    assert restarted.get(1) is None
+
+
+def test_changes_are_batched_into_few_transactions(db):
+    backend = SQLiteStateBackend(db, 'user_states')
+    store = StateStore(100, 3600, backend)
+    # thread הכתיבה עסוק - כל השינויים מצטברים עד שהוא מתפנה
+    release = threading.Event()
+    db.submit_write(release.wait)
+
+    for user_id in range(50):
+        store[user_id] = 'waiting_task_content'
+        store[user_id] = 'waiting_category_selection'
+    release.set()
+    _drain(db)
+
+    assert backend._flushes == 1
+    assert db.fetchall('SELECT DISTINCT value FROM conversation_state') == [('"waiting_category_selection"',)]
+
+
+def test_expired_rows_are_purged_periodically(db, monkeypatch):
+    monkeypatch.setattr(SQLiteStateBackend, 'PURGE_EVERY', 1)
+    short = StateStore(100, 0.1, SQLiteStateBackend(db, 'pending_tasks'))
+    for user_id in range(10):
+        short[user_id] = {'content': 'x'}
+    _drain(db)
+    time.sleep(0.2)
+
+    StateStore(100, 3600, SQLiteStateBackend(db, 'user_states'))[1] = 'waiting_task_content'
+    _drain(db)
+
+    assert _rows(db, 'pending_tasks') == 0
+    assert _rows(db, 'user_states') == 1
+
+
+def test_memory_backend_is_bounded():
+    store = StateStore(10, 3600)
+    for user_id in range(1000):
+        store[user_id] = 'waiting_task_content'
+
+    assert len(store) == 10
+    assert store.load() == 0
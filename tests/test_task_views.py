@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בדיקות לכפתורי עמוד המשימות - בוצע/מחק מרעננים את אותו תחום, גם בלי מצב שמור
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+USER = 1
+
+
+class FakeQuery:
+    """callback_query שמתעד את עריכות ההודעה"""
+
+    def __init__(self, data, message_id=1):
+        self.data = data
+        self.from_user = SimpleNamespace(id=USER)
+        self.message = SimpleNamespace(chat_id=USER, message_id=message_id)
+        self.inline_message_id = None
+        self.edits = []
+
+    async def answer(self, text=None, **kwargs):
+        pass
+
+    async def edit_message_text(self, text, reply_markup=None, **kwargs):
+        self.edits.append((text, reply_markup))
+
+
+def _click(bot, data):
+    query = FakeQuery(data)
+    asyncio.run(bot.handle_callback(SimpleNamespace(callback_query=query), None))
+    return query
+
+
+def _buttons(reply_markup):
+    return [button.callback_data for row in reply_markup.inline_keyboard for button in row]
+
+
+def _fill(bot):
+    work = bot.add_tasks(USER, [(f'עבודה {i}', 'עבודה', []) for i in range(3)])
+    home = bot.add_tasks(USER, [(f'בית {i}', 'בית', []) for i in range(3)])
+    return work, home
+
+
+def test_task_buttons_carry_the_view_scope(bot):
+    work, _ = _fill(bot)
+
+    text, markup = _click(bot, 'list_category_עבודה').edits[-1]
+    assert f'task_done_cat_{work[0]}' in _buttons(markup)
+    assert f'task_delete_cat_{work[0]}' in _buttons(markup)
+
+    _, markup = _click(bot, 'list_all_tasks').edits[-1]
+    assert f'task_done_all_{work[0]}' in _buttons(markup)
+
+
+@pytest.mark.parametrize('action', ['done', 'delete'])
+def test_missing_view_refreshes_the_same_category(bot, action):
+    work, home = _fill(bot)
+    _click(bot, 'list_category_עבודה')
+    # מצב התצוגה אבד (למשל אחרי הפעלה מחדש)
+    bot.task_views.clear()
+
+    text, markup = _click(bot, f'task_{action}_cat_{work[0]}').edits[-1]
+
+    assert 'משימות בקטגוריה: עבודה' in text
+    assert 'בית 0' not in text
+    assert f'task_done_cat_{work[0]}' not in _buttons(markup)
+    assert f'task_done_cat_{work[1]}' in _buttons(markup)
+
+
+def test_missing_view_of_all_tasks_and_old_buttons(bot):
+    work, home = _fill(bot)
+    bot.task_views.clear()
+
+    text, _ = _click(bot, f'task_done_all_{work[0]}').edits[-1]
+    assert 'כל המשימות הפתוחות' in text and 'בית 0' in text
+
+    # כפתורים מהודעות שנשלחו לפני שהתחום נוסף לנתונים
+    bot.task_views.clear()
+    text, _ = _click(bot, f'task_delete_{home[0]}').edits[-1]
+    assert 'כל המשימות הפתוחות' in text and 'בית 0' not in text
+    assert bot.get_task(home[0], USER) is None